@@ -0,0 +1,276 @@
+# ajuste_texto.py
+# Ajuste de valores longos à caixa: reduz, quebra em linhas e, no limite, reticências
+# Larguras REAIS (avanços da fonte), memorizadas em LRU compartilhado
+# (texto, fonte, tamanho) → largura: usado pelos motores raster (PIL) e vetoriais (PyMuPDF)
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+from indice_fontes import FAMILIA_PADRAO, interpretar_nome_fonte, obter_indice
+
+
+# Medidas mantidas no LRU (valores repetidos entre contratos saem de graça)
+TAMANHO_CACHE_MEDIDAS = 8192
+
+# Menor tamanho aceito ao reduzir, relativo ao tamanho original
+FATOR_TAMANHO_MINIMO = 0.7
+
+# Margens da página quando nada limita a caixa antes delas (pt)
+MARGEM_PAGINA_PT = 36.0
+
+# Espaço mínimo entre o valor e o vizinho da linha, o de baixo ou a borda do painel (pt)
+FOLGA_VIZINHO_PT = 4.0
+
+RETICENCIAS = "…"
+
+Caixa = Tuple[float, float, float, float]  # x0, y0, x1, y1 em pontos PDF
+
+
+# ============================================================================
+# MEDIDORES (hasheáveis: fazem parte da chave do LRU)
+# ============================================================================
+
+@dataclass(frozen=True)
+class MedidorPIL:
+    """Largura em pixels com a ImageFont do índice (motores raster)"""
+    familia: str = FAMILIA_PADRAO
+    peso: int = 400
+    italico: bool = False
+    fonts_dir: Optional[str] = None
+
+    # Hinting em pixels: a largura não escala linearmente com o tamanho
+    escalavel = False
+
+    @classmethod
+    def do_span(cls, nome_fonte: str, fonts_dir: Optional[str] = None) -> "MedidorPIL":
+        familia, peso, italico = interpretar_nome_fonte(nome_fonte)
+        return cls(familia, peso, italico, fonts_dir)
+
+    def fonte(self, tamanho: float):
+        return obter_indice(self.fonts_dir).fonte_pil(
+            self.familia, self.peso, self.italico, int(round(tamanho)))
+
+    def medir(self, texto: str, tamanho: float) -> float:
+        return self.fonte(tamanho).getlength(texto)
+
+
+@dataclass(frozen=True)
+class MedidorFitz:
+    """Largura em pontos com a fitz.Font do índice (motores vetoriais)"""
+    familia: str = FAMILIA_PADRAO
+    peso: int = 400
+    italico: bool = False
+    fonts_dir: Optional[str] = None
+
+    escalavel = True
+
+    @classmethod
+    def do_span(cls, nome_fonte: str, fonts_dir: Optional[str] = None) -> "MedidorFitz":
+        familia, peso, italico = interpretar_nome_fonte(nome_fonte)
+        return cls(familia, peso, italico, fonts_dir)
+
+    def medir(self, texto: str, tamanho: float) -> float:
+        fonte = obter_indice(self.fonts_dir).fonte_fitz(self.familia, self.peso, self.italico)
+        return fonte.text_length(texto, fontsize=tamanho)
+
+
+@dataclass(frozen=True)
+class MedidorBase14:
+    """Largura em pontos de uma fonte embutida do PDF ("helv", "tiro"...)"""
+    nome: str = "helv"
+
+    escalavel = True
+
+    def medir(self, texto: str, tamanho: float) -> float:
+        import fitz  # PyMuPDF: importado aqui para os motores PIL não dependerem dele
+
+        return fitz.get_text_length(texto, fontname=self.nome, fontsize=tamanho)
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_MEDIDAS)
+def _largura_memorizada(texto: str, medidor, tamanho: float) -> float:
+    return float(medidor.medir(texto, tamanho))
+
+
+def largura_texto(texto: str, medidor, tamanho: float) -> float:
+    """
+    Largura do texto no tamanho pedido (LRU compartilhado por todos os motores)
+
+    Fontes vetoriais escalam linearmente: mede-se uma vez no tamanho 1, e
+    todos os tamanhos tentados na redução reaproveitam a mesma entrada.
+    """
+    if medidor.escalavel:
+        return _largura_memorizada(texto, medidor, 1.0) * tamanho
+    return _largura_memorizada(texto, medidor, float(int(round(tamanho))))
+
+
+def limpar_cache_medidas() -> None:
+    _largura_memorizada.cache_clear()
+
+
+# ============================================================================
+# QUEBRA E RETICÊNCIAS
+# ============================================================================
+
+def _maior_prefixo(texto: str, medidor, tamanho: float, largura_max: float,
+                   sufixo: str = "") -> int:
+    """Maior n tal que texto[:n] (+ sufixo) cabe na largura (busca binária)"""
+    baixo, alto = 0, len(texto)
+    while baixo < alto:
+        meio = (baixo + alto + 1) // 2
+        if largura_texto(texto[:meio].rstrip() + sufixo, medidor, tamanho) <= largura_max:
+            baixo = meio
+        else:
+            alto = meio - 1
+    return baixo
+
+
+def quebrar_linhas(texto: str, medidor, tamanho: float, largura_max: float) -> List[str]:
+    """Quebra por palavras com larguras reais; palavras maiores que a linha são partidas"""
+    linhas: List[str] = []
+    atual = ""
+    for palavra in texto.split():
+        candidata = f"{atual} {palavra}" if atual else palavra
+        if largura_texto(candidata, medidor, tamanho) <= largura_max:
+            atual = candidata
+            continue
+        if atual:
+            linhas.append(atual)
+        while len(palavra) > 1 and largura_texto(palavra, medidor, tamanho) > largura_max:
+            corte = max(1, _maior_prefixo(palavra, medidor, tamanho, largura_max))
+            linhas.append(palavra[:corte])
+            palavra = palavra[corte:]
+        atual = palavra
+    if atual:
+        linhas.append(atual)
+    return linhas
+
+
+def reticenciar(texto: str, medidor, tamanho: float, largura_max: float) -> str:
+    """Texto inteiro se couber; senão o maior prefixo seguido de reticências"""
+    if largura_texto(texto, medidor, tamanho) <= largura_max:
+        return texto
+    corte = _maior_prefixo(texto, medidor, tamanho, largura_max, RETICENCIAS)
+    return texto[:corte].rstrip() + RETICENCIAS
+
+
+# ============================================================================
+# AJUSTE À CAIXA
+# ============================================================================
+
+@dataclass
+class TextoAjustado:
+    """Resultado do ajuste: linhas prontas para desenhar no tamanho escolhido"""
+    linhas: List[str]
+    tamanho: float
+    altura_linha: float
+    truncado: bool = False
+
+    @property
+    def texto(self) -> str:
+        return " ".join(self.linhas)
+
+
+def _linhas_que_cabem(tamanho: float, altura_max: Optional[float],
+                      max_linhas: Optional[int], entrelinha: float) -> Optional[int]:
+    """Quantas linhas cabem na altura (None = sem limite)"""
+    if altura_max is None:
+        return max_linhas
+    cabem = max(1, int((altura_max - tamanho) // (tamanho * entrelinha)) + 1)
+    return cabem if max_linhas is None else min(cabem, max_linhas)
+
+
+def _tamanhos(tamanho: float, tamanho_min: float, passo: float) -> List[float]:
+    tamanhos = []
+    atual = tamanho
+    while atual > tamanho_min:
+        tamanhos.append(atual)
+        atual -= passo
+    tamanhos.append(tamanho_min)
+    return tamanhos
+
+
+def ajustar_texto(texto: str, medidor, largura_max: float, tamanho: float,
+                  tamanho_min: Optional[float] = None,
+                  altura_max: Optional[float] = None,
+                  max_linhas: Optional[int] = 1,
+                  entrelinha: float = 1.2,
+                  passo: Optional[float] = None) -> TextoAjustado:
+    """
+    Ajusta o texto à caixa (largura_max × altura_max, na unidade do medidor)
+
+    Para cada tamanho, do original até `tamanho_min`:
+    1. cabe em uma linha → pronto
+    2. cabe quebrado nas linhas disponíveis → pronto
+    No menor tamanho, o que sobra da última linha vira reticências.
+    """
+    texto = " ".join(texto.split())
+    tamanho_min = tamanho if tamanho_min is None else min(tamanho_min, tamanho)
+    passo = passo or (0.5 if medidor.escalavel else 1.0)
+
+    if not texto or largura_max <= 0:
+        return TextoAjustado([texto], tamanho, tamanho * entrelinha)
+
+    for atual in _tamanhos(tamanho, tamanho_min, passo):
+        if largura_texto(texto, medidor, atual) <= largura_max:
+            return TextoAjustado([texto], atual, atual * entrelinha)
+        cabem = _linhas_que_cabem(atual, altura_max, max_linhas, entrelinha)
+        if cabem is None or cabem > 1:
+            linhas = quebrar_linhas(texto, medidor, atual, largura_max)
+            if cabem is None or len(linhas) <= cabem:
+                return TextoAjustado(linhas, atual, atual * entrelinha)
+
+    cabem = _linhas_que_cabem(tamanho_min, altura_max, max_linhas, entrelinha) or 1
+    linhas = quebrar_linhas(texto, medidor, tamanho_min, largura_max) if cabem > 1 else [texto]
+    ultima = " ".join(linhas[cabem - 1:])
+    linhas = linhas[:cabem - 1] + [reticenciar(ultima, medidor, tamanho_min, largura_max)]
+    return TextoAjustado(linhas, tamanho_min, tamanho_min * entrelinha, truncado=True)
+
+
+def obstaculos_pagina(page) -> List[Caixa]:
+    """Caixas (pt) das palavras, imagens e desenhos de uma página do PyMuPDF"""
+    caixas = [tuple(palavra[:4]) for palavra in page.get_text("words")]
+    caixas.extend(tuple(info["bbox"]) for info in page.get_image_info())
+    caixas.extend(tuple(desenho["rect"]) for desenho in page.get_drawings())
+    return caixas
+
+
+def caixa_livre(bbox: Caixa, tamanho_pagina: Tuple[float, float],
+                obstaculos: Iterable[Caixa] = (),
+                margem: float = MARGEM_PAGINA_PT) -> Tuple[float, float]:
+    """
+    (largura, altura) disponíveis para o valor a partir do canto da caixa do placeholder
+
+    Largura: até a próxima palavra, imagem ou desenho da mesma linha, ou até
+    a borda do painel/célula que contém o placeholder, ou até a margem
+    direita. Altura: até o que estiver logo abaixo dessa largura (ou a borda
+    de baixo do painel, ou a margem inferior); com espaço livre abaixo,
+    valores longos quebram em linhas em vez de encolher. Obstáculos que só
+    cruzam a caixa (o próprio placeholder, sublinhados) não limitam nada.
+    """
+    x0, y0, x1, y1 = bbox
+    largura_pagina, altura_pagina = tamanho_pagina
+    tolerancia = (y1 - y0) * 0.25   # spans de linhas vizinhas se tocam na vertical
+
+    limite_x = largura_pagina - margem
+    limite_y = altura_pagina - margem
+    fora = []
+    for o in obstaculos:
+        if o[0] <= x0 and x1 <= o[2] and o[1] <= y0 - tolerancia and y1 + tolerancia <= o[3]:
+            # Painel, célula ou fundo que contém o placeholder (mais alto que a linha,
+            # ao contrário da palavra do próprio placeholder): o valor fica dentro dele
+            limite_x = min(limite_x, o[2] - FOLGA_VIZINHO_PT)
+            limite_y = min(limite_y, o[3] - FOLGA_VIZINHO_PT)
+        elif not (o[0] < x1 and x0 < o[2] and o[1] < y1 and y0 < o[3]):
+            fora.append(o)
+
+    for ox0, oy0, _, oy1 in fora:
+        if ox0 >= x1 and oy0 < y1 - tolerancia and y0 + tolerancia < oy1:
+            limite_x = min(limite_x, ox0 - FOLGA_VIZINHO_PT)
+    largura = max(x1 - x0, limite_x - x0)
+
+    for ox0, oy0, ox1, _ in fora:
+        if oy0 >= y1 - tolerancia and ox0 < x0 + largura and x0 < ox1:
+            limite_y = min(limite_y, oy0 - FOLGA_VIZINHO_PT)
+    return largura, max(y1 - y0, limite_y - y0)
@@ -0,0 +1,93 @@
+# analise_template.py
+# Análise do template dos pipelines v2, feita UMA vez por versão do template
+# - spans com placeholders {xxx} de cada página (texto, bbox, fonte, tamanho, cor)
+# - espaço livre de cada placeholder até o texto/imagem vizinho (ver ajuste_texto.caixa_livre)
+# - o que o DPI adaptativo lê da página: menor fonte e resolução das imagens
+# Persistida pelo cache_layout sob o hash do template: as chamadas seguintes
+# (inclusive acertos dos caches de camadas e de páginas) não extraem texto
+# nem abrem o PDF para escolher o DPI
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from ajuste_texto import caixa_livre, obstaculos_pagina
+from cache_layout import CacheLayout, hash_documento, obter_cache_layout
+from entrada_saida_pdf import Origem, abrir_pdf, normalizar_origem
+from pagina_raster import calcular_dpi, dpi_imagens_pagina, menor_fonte_pagina, spans_texto
+
+
+# Motor no cache_layout (a versão do formato é a VERSAO_LAYOUT de lá)
+MOTOR_ANALISE = "analise_v2"
+
+
+@dataclass
+class AnaliseTemplate:
+    """Placeholders e dados de DPI de um template, sem os valores de preenchimento"""
+    hash_template: str
+    paginas: int
+    spans: List[dict]                   # {"page", "text", "bbox", "font", "size", "color", "livre"}
+    menor_fonte: List[Optional[float]]  # por página (menor_fonte_pagina)
+    dpi_imagens: List[float]            # por página (dpi_imagens_pagina)
+
+    def spans_pagina(self, page_num: int) -> List[dict]:
+        return [span for span in self.spans if span["page"] == page_num]
+
+    def dpi_pagina(self, page_num: int, tamanhos_placeholders: Iterable[float] = (),
+                   dpi_max: int = 300) -> int:
+        """O mesmo DPI de escolher_dpi, sem abrir a página"""
+        return calcular_dpi(tamanhos_placeholders, self.menor_fonte[page_num],
+                            self.dpi_imagens[page_num], dpi_max)
+
+
+def _analisar(origem: Origem) -> dict:
+    spans = []
+    menor_fonte = []
+    dpi_imagens = []
+    with abrir_pdf(origem) as doc:
+        for page_num, page in enumerate(doc):
+            try:
+                da_pagina = spans_texto(page)
+            except Exception:
+                print(f"  ⚠️  Página {page_num+1}: erro ao extrair blocos")
+                da_pagina = []
+
+            obstaculos = None
+            for span in da_pagina:
+                texto = span["text"]
+                if "{" in texto and "}" in texto and re.search(r"{(.*?)}", texto):
+                    if obstaculos is None:
+                        obstaculos = obstaculos_pagina(page)
+                    spans.append({
+                        "page": page_num,
+                        "text": texto,
+                        "bbox": list(span["bbox"]),
+                        "font": span.get("font", "Arial"),
+                        "size": span.get("size", 12.0),
+                        "color": span.get("color", 0),
+                        "livre": list(caixa_livre(span["bbox"], (page.rect.width, page.rect.height),
+                                                  obstaculos)),
+                    })
+            menor_fonte.append(menor_fonte_pagina(page, spans=da_pagina))
+            dpi_imagens.append(dpi_imagens_pagina(page))
+
+        return {"paginas": len(doc), "spans": spans,
+                "menor_fonte": menor_fonte, "dpi_imagens": dpi_imagens}
+
+
+def analisar_template(origem: Origem, cache: Optional[CacheLayout] = None) -> AnaliseTemplate:
+    """
+    Análise do template, do cache quando já existe
+
+    Um hash do template por chamada; a extração de texto só roda na
+    primeira vez (por processo ou, com o JSON persistido, por máquina).
+    """
+    origem = normalizar_origem(origem)
+    hash_template = hash_documento(origem)
+    cache = cache or obter_cache_layout(motor=MOTOR_ANALISE)
+
+    registro = cache.obter(hash_template)
+    if registro is None:
+        registro = _analisar(origem)
+        cache.salvar(hash_template, registro)
+    return AnaliseTemplate(hash_template, **registro)
@@ -0,0 +1,94 @@
+# artefatos_debug.py
+# Destino dos artefatos de depuração dos pipelines raster (destaques, inpainting, final)
+# Nulo (padrão: nada é desenhado nem codificado) | memória | disco (PNGs em ./output)
+
+import os
+import numpy as np
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from pagina_raster import salvar_png
+
+
+class SinkArtefatos:
+    """
+    Destino de artefatos de depuração
+
+    `registrar` recebe um PRODUTOR (função sem argumentos que devolve os
+    pixels), e não os pixels: sobreposições e cópias só são feitas, e PNGs
+    só são codificados, quando o sink realmente consome o artefato.
+    """
+
+    consome = True
+
+    def registrar(self, nome: str, produtor: Callable[[], np.ndarray]) -> Optional[str]:
+        """Consome o artefato; retorna onde ficou guardado (ou None)"""
+        raise NotImplementedError
+
+
+class SinkNulo(SinkArtefatos):
+    """Descarta tudo sem chamar o produtor (padrão em produção)"""
+
+    consome = False
+
+    def registrar(self, nome: str, produtor: Callable[[], np.ndarray]) -> Optional[str]:
+        return None
+
+
+class SinkMemoria(SinkArtefatos):
+    """
+    Guarda os pixels em memória, sem codificar
+
+    Útil em testes e em serviços que só inspecionam artefatos sob demanda;
+    o PNG é gerado apenas em `como_png`.
+    """
+
+    def __init__(self):
+        self.artefatos: Dict[str, np.ndarray] = {}
+
+    def registrar(self, nome: str, produtor: Callable[[], np.ndarray]) -> Optional[str]:
+        # Cópia: o buffer da página continua sendo alterado pelas próximas etapas
+        self.artefatos[nome] = np.array(produtor(), copy=True)
+        return nome
+
+    def como_png(self, nome: str) -> bytes:
+        import cv2
+
+        pixels = self.artefatos[nome]
+        if pixels.ndim == 3:
+            pixels = cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR)
+        return cv2.imencode(".png", pixels)[1].tobytes()
+
+
+class SinkDisco(SinkArtefatos):
+    """Grava cada artefato como `<output_dir>/<nome>.png` (comportamento antigo)"""
+
+    def __init__(self, output_dir: str = "./output"):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+    def registrar(self, nome: str, produtor: Callable[[], np.ndarray]) -> Optional[str]:
+        caminho = os.path.join(self.output_dir, f"{nome}.png")
+        salvar_png(caminho, produtor())
+        return caminho
+
+
+SINK_NULO = SinkNulo()
+
+
+def obter_sink(sink: Optional[SinkArtefatos]) -> SinkArtefatos:
+    """Sink informado ou o nulo"""
+    return sink if sink is not None else SINK_NULO
+
+
+def sobrepor_retangulos(pixels: np.ndarray,
+                        retangulos: Iterable[Tuple[int, int, int, int]],
+                        cor: Tuple[int, int, int] = (255, 255, 0)) -> np.ndarray:
+    """Cópia da página com os retângulos desenhados (o buffer original não muda)"""
+    import cv2  # OpenCV: importado aqui, o sink nulo nunca chega a desenhar
+
+    copia = np.array(pixels, copy=True)
+    if copia.ndim == 2:
+        cor = int(0.299 * cor[0] + 0.587 * cor[1] + 0.114 * cor[2])
+    for x0, y0, x1, y1 in retangulos:
+        cv2.rectangle(copia, (x0, y0), (x1, y1), cor, 1)
+    return copia
@@ -0,0 +1,210 @@
+# atualizacao_incremental.py
+# Saída como ATUALIZAÇÃO INCREMENTAL do PDF: template intacto + alterações anexadas
+# - o preenchimento é gravado no fim dos bytes do template (objetos novos ou
+#   alterados, nova xref e trailer com /Prev): escrita e tamanho proporcionais
+#   ao que mudou, não ao template
+# - ArmazemDeltas guarda só o anexo + hash do template e remonta o PDF na leitura
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional, Tuple
+
+from entrada_saida_pdf import Origem, normalizar_origem
+
+
+# Diretório padrão: dados do usuário, fora do repositório (sobrescrito por ARMAZEM_DELTAS_DIR);
+# os deltas SÃO os contratos gerados, então não ficam no diretório de cache
+DIRETORIO_DELTAS = os.environ.get(
+    "ARMAZEM_DELTAS_DIR",
+    os.path.join(os.environ.get("XDG_DATA_HOME")
+                 or os.path.join(os.path.expanduser("~"), ".local", "share"),
+                 "pdf_placeholders", "deltas"),
+)
+
+# Muda quando o formato do arquivo .delta muda
+VERSAO_DELTA = 1
+
+
+def _bytes_da_origem(origem: Origem) -> bytes:
+    origem = normalizar_origem(origem)
+    if isinstance(origem, bytes):
+        return origem
+    with open(origem, "rb") as f:
+        return f.read()
+
+
+def _gravar_atomico(caminho: str, dados: bytes) -> None:
+    """Arquivo temporário + os.replace: leitores nunca veem um arquivo pela metade"""
+    diretorio = os.path.dirname(caminho)
+    os.makedirs(diretorio, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix=".tmp")
+    try:
+        with os.fdopen(descritor, "wb") as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+class DocumentoIncremental:
+    """
+    Template aberto para edição com gravação incremental
+
+    O PyMuPDF só grava incrementalmente no próprio arquivo de onde o
+    documento foi aberto: o template é copiado para um arquivo temporário
+    (o original nunca é alterado) e `finalizar` devolve template + anexo.
+
+    Uso:
+        with DocumentoIncremental(template) as edicao:
+            ...editar edicao.doc...
+            pdf = edicao.finalizar()
+    """
+
+    def __init__(self, origem: Origem):
+        import fitz  # PyMuPDF: importado aqui para este módulo não depender dele
+
+        self.template = _bytes_da_origem(origem)
+        descritor, self._caminho = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(descritor, "wb") as f:
+                f.write(self.template)
+            self.doc = fitz.open(self._caminho)
+        except BaseException:
+            # Template ilegível: a cópia temporária não fica para trás
+            if os.path.exists(self._caminho):
+                os.remove(self._caminho)
+            raise
+        self._fitz = fitz
+
+    def finalizar(self) -> bytes:
+        """
+        Grava as alterações e devolve o PDF completo (template + atualização)
+
+        Templates que o MuPDF precisou reparar ao abrir não aceitam gravação
+        incremental: nesse caso o PDF é gravado inteiro (aviso no log).
+        """
+        if self.doc.can_save_incrementally():
+            self.doc.save(self._caminho, incremental=True,
+                          encryption=self._fitz.PDF_ENCRYPT_KEEP)
+            self.doc.close()
+            with open(self._caminho, "rb") as f:
+                dados = f.read()
+        else:
+            print("  ⚠️  Template não aceita atualização incremental (reparado); PDF gravado inteiro")
+            dados = self.doc.tobytes(garbage=4, deflate=True)
+            self.doc.close()
+        self.fechar()
+        return dados
+
+    def fechar(self) -> None:
+        """Fecha o documento e remove o arquivo temporário (idempotente)"""
+        if not self.doc.is_closed:
+            self.doc.close()
+        if os.path.exists(self._caminho):
+            os.remove(self._caminho)
+
+    def __enter__(self) -> "DocumentoIncremental":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+
+def extrair_delta(pdf: bytes, template: bytes) -> bytes:
+    """Anexo incremental de `pdf` sobre `template` (ValueError se não for incremental)"""
+    if len(pdf) < len(template) or pdf[:len(template)] != template:
+        raise ValueError("PDF não é uma atualização incremental deste template")
+    return pdf[len(template):]
+
+
+def montar_pdf(template: bytes, delta: bytes) -> bytes:
+    """Inverso de extrair_delta"""
+    return template + delta
+
+
+class ArmazemDeltas:
+    """
+    PDFs preenchidos guardados como (hash do template, anexo incremental)
+
+    - templates/<sha256>.pdf: cada template uma única vez
+    - <nome>.delta: cabeçalho JSON numa linha + bytes do anexo
+
+    PDFs que não são atualização incremental do template (ex.: motores raster
+    que geram documentos novos) são guardados inteiros, sem template.
+    """
+
+    def __init__(self, diretorio: Optional[str] = None):
+        self.diretorio = diretorio or DIRETORIO_DELTAS
+
+    def _caminho_template(self, hash_template: str) -> str:
+        return os.path.join(self.diretorio, "templates", f"{hash_template}.pdf")
+
+    def _caminho_delta(self, nome: str) -> str:
+        """Arquivo do documento DENTRO do armazém (ValueError para nomes que saem dele)"""
+        separadores = {"/", "\\", os.sep, os.altsep} - {None}
+        if (not nome or nome in (".", "..") or "\0" in nome
+                or any(sep in nome for sep in separadores)):
+            raise ValueError(f"Nome de documento inválido no armazém: {nome!r}")
+        return os.path.join(self.diretorio, f"{nome}.delta")
+
+    def salvar(self, pdf: bytes, template: Origem, nome: Optional[str] = None) -> str:
+        """
+        Guarda o PDF; retorna o nome para `ler` (padrão: hash do conteúdo)
+
+        Args:
+            pdf: PDF completo gerado em modo incremental
+            template: template usado no preenchimento (caminho, bytes ou stream)
+            nome: identificador do documento (ex.: id do contrato); sem
+                  separadores de caminho nem '..' (ValueError)
+        """
+        template = _bytes_da_origem(template)
+        try:
+            delta = extrair_delta(pdf, template)
+            hash_template = hashlib.sha256(template).hexdigest()
+            caminho = self._caminho_template(hash_template)
+            if not os.path.exists(caminho):
+                _gravar_atomico(caminho, template)
+        except ValueError:
+            delta, hash_template = pdf, None
+
+        cabecalho = {"template": hash_template, "tamanho": len(delta), "versao": VERSAO_DELTA}
+        nome = nome or hashlib.sha256(delta).hexdigest()[:32]
+        _gravar_atomico(self._caminho_delta(nome),
+                        json.dumps(cabecalho, sort_keys=True).encode() + b"\n" + delta)
+        return nome
+
+    def _ler_delta(self, nome: str) -> Tuple[dict, bytes]:
+        with open(self._caminho_delta(nome), "rb") as f:
+            cabecalho = json.loads(f.readline())
+            delta = f.read()
+        if cabecalho.get("versao") != VERSAO_DELTA or len(delta) != cabecalho.get("tamanho"):
+            raise ValueError(f"Delta inválido ou truncado: {nome}")
+        return cabecalho, delta
+
+    def ler(self, nome: str) -> bytes:
+        """PDF completo remontado (template + anexo)"""
+        cabecalho, delta = self._ler_delta(nome)
+        hash_template = cabecalho["template"]
+        if hash_template is None:
+            return delta
+
+        with open(self._caminho_template(hash_template), "rb") as f:
+            template = f.read()
+        if hashlib.sha256(template).hexdigest() != hash_template:
+            raise ValueError(f"Template corrompido no armazém: {hash_template}")
+        return montar_pdf(template, delta)
+
+    def tamanho(self, nome: str) -> int:
+        """Bytes ocupados pelo documento (sem o template compartilhado)"""
+        return os.path.getsize(self._caminho_delta(nome))
+
+    def remover(self, nome: str) -> None:
+        """Remove o documento; o template fica (pode ser usado por outros)"""
+        try:
+            os.remove(self._caminho_delta(nome))
+        except FileNotFoundError:
+            pass
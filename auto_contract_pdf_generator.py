@@ -13,11 +13,15 @@ Como funciona:
 """
 
 from PIL import Image, ImageDraw, ImageFont
-import pytesseract  # OCR para detectar texto
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
 import re
 import logging
 import os
+from io import BytesIO
+
+from cache_layout import CacheLayout, hash_imagem, obter_cache_layout
+from entrada_saida_pdf import Origem, Destino, abrir_imagem, descrever_origem, persistir
+from indice_fontes import obter_indice
 
 logger = logging.getLogger(__name__)
 
@@ -28,39 +32,80 @@ logger = logging.getLogger(__name__)
 class AutoContractPDFGenerator:
     """Gera PDF automaticamente detectando placeholders na imagem"""
     
-    def __init__(self, image_path: str, use_ocr: bool = True):
+    def __init__(self, image_path: Origem, use_ocr: bool = True,
+                 layout_cache: Optional[CacheLayout] = None,
+                 use_layout_cache: bool = True):
         """
         Args:
-            image_path: Caminho para imagem JPG/PNG
+            image_path: Caminho, bytes ou stream da imagem JPG/PNG
             use_ocr: Se True, usa OCR para detectar texto (recomendado)
+            layout_cache: Cache de layouts (padrão: compartilhado, em ~/.cache/pdf_placeholders)
+            use_layout_cache: Se False, roda o OCR sempre e não persiste o layout
         """
         self.image_path = image_path
         self.image = None
         self.use_ocr = use_ocr
         self.detected_placeholders = {}
+        self.layout_cache = (layout_cache or obter_cache_layout()) if use_layout_cache else None
+        self._image_hash = None
         self.load_image()
     
     def load_image(self):
         """Carrega a imagem"""
         try:
-            self.image = Image.open(self.image_path)
-            logger.info(f"✓ Imagem carregada: {self.image_path}")
+            self.image = abrir_imagem(self.image_path)
+            self.image.load()  # decodifica já: o stream de origem pode ser fechado
+            logger.info(f"✓ Imagem carregada: {descrever_origem(self.image_path)}")
             logger.info(f"  Tamanho: {self.image.size[0]}x{self.image.size[1]} pixels")
         except Exception as e:
             logger.error(f"✗ Erro ao carregar imagem: {e}")
             raise
     
-    def detect_placeholders_with_ocr(self) -> Dict[str, Dict]:
+    @property
+    def image_hash(self) -> str:
+        """Hash dos pixels do template (chave do cache de layouts)"""
+        if self._image_hash is None:
+            self._image_hash = hash_imagem(self.image)
+        return self._image_hash
+    
+    def detect_placeholders_cached(self) -> Optional[Dict[str, Dict]]:
+        """
+        Layout salvo de uma detecção anterior deste template (ou None)
+        
+        Mesmo formato de detect_placeholders_simple: substitui a tabela manual
+        quando o template já passou pelo OCR uma vez.
+        """
+        if self.layout_cache is None:
+            return None
+        placeholders = self.layout_cache.obter(self.image_hash)
+        if placeholders is not None:
+            logger.info(f"\n💾 Layout em cache: {len(placeholders)} placeholders "
+                        f"(template {self.image_hash[:12]})")
+            self.detected_placeholders = placeholders
+        return placeholders
+    
+    def detect_placeholders_with_ocr(self, use_cache: bool = True) -> Dict[str, Dict]:
         """
         Detecta placeholders {xxx} na imagem usando OCR
         
+        O layout é persistido pelo hash da imagem: o OCR roda uma vez por
+        versão do template (use_cache=False força uma nova detecção).
+        
         Retorna: {'placeholder_name': {'x': x, 'y': y, 'width': w, 'height': h}, ...}
         """
+        if use_cache:
+            cached = self.detect_placeholders_cached()
+            if cached is not None:
+                return cached
+        
         try:
             logger.info("\n🔍 Detectando placeholders com OCR...")
             
             # Usar Tesseract para detectar texto com coordenadas
-            data = pytesseract.image_to_data(self.image, output_type=pytesseract.Output.DICT)
+            # (importado aqui: gerar PDFs com layout conhecido não depende dele;
+            # handle persistente do tesserocr quando instalado, ver motor_ocr)
+            from motor_ocr import obter_motor_ocr
+            data = obter_motor_ocr().image_to_data(self.image)
             
             placeholders = {}
             
@@ -86,13 +131,17 @@ class AutoContractPDFGenerator:
             
             if not placeholders:
                 logger.warning("⚠ Nenhum placeholder encontrado com OCR")
+            elif self.layout_cache is not None:
+                # Layout vazio não é salvo: pode ser falha de OCR, não do template
+                caminho = self.layout_cache.salvar(self.image_hash, placeholders)
+                logger.info(f"  💾 Layout salvo: {caminho}")
             
             self.detected_placeholders = placeholders
             return placeholders
         
         except ImportError:
             logger.error("✗ Tesseract não instalado!")
-            logger.error("  Instale: pip install pytesseract")
+            logger.error("  Instale: pip install tesserocr (ou pytesseract)")
             logger.error("  E também: apt-get install tesseract-ocr (Linux) ou baixe para Windows")
             raise
         except Exception as e:
@@ -165,14 +214,8 @@ class AutoContractPDFGenerator:
             if font_path:
                 font = ImageFont.truetype(font_path, 12)
             else:
-                # Tentar encontrar fonte padrão
-                try:
-                    font = ImageFont.truetype("/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf", 12)
-                except:
-                    try:
-                        font = ImageFont.truetype("C:\\Windows\\Fonts\\arial.ttf", 12)
-                    except:
-                        font = ImageFont.load_default()
+                # Índice de fontes compartilhado (Arial do sistema ou a família padrão)
+                font = obter_indice().fonte_pil("Arial", 400, False, 12)
         except:
             font = ImageFont.load_default()
         
@@ -194,7 +237,7 @@ class AutoContractPDFGenerator:
     def generate_pdf(
         self,
         data: Dict[str, str],
-        output_path: str,
+        output_path: Destino = None,
         auto_detect: bool = True,
         text_color: Tuple[int, int, int] = (0, 0, 0),
         debug: bool = False
@@ -204,8 +247,10 @@ class AutoContractPDFGenerator:
         
         Args:
             data: Dados para preencher
-            output_path: Onde salvar o PDF
-            auto_detect: Se True, detecta placeholders automaticamente
+            output_path: (opcional) caminho, stream ou função que recebe os bytes
+            auto_detect: Se True, detecta placeholders automaticamente (OCR só
+                na primeira vez por template; depois o layout vem do cache).
+                Se False, usa o layout em cache ou a tabela manual
             text_color: Cor do texto
             debug: Mostra logs
         
@@ -225,7 +270,10 @@ class AutoContractPDFGenerator:
                 logger.warning("⚠ OCR falhou, usando modo manual")
                 placeholders = self.detect_placeholders_simple()
         else:
-            placeholders = self.detect_placeholders_simple()
+            # Layout já detectado para este template substitui a tabela manual
+            placeholders = self.detect_placeholders_cached()
+            if placeholders is None:
+                placeholders = self.detect_placeholders_simple()
         
         # 2. Validar dados
         missing = [p for p in placeholders.keys() if p not in data]
@@ -246,12 +294,15 @@ class AutoContractPDFGenerator:
         if filled_image.mode != 'RGB':
             filled_image = filled_image.convert('RGB')
         
-        filled_image.save(output_path, 'PDF')
-        logger.info(f"✓ PDF salvo em: {output_path}")
+        # PDF gerado em memória; gravar é opcional
+        buffer = BytesIO()
+        filled_image.save(buffer, 'PDF')
+        pdf_bytes = buffer.getvalue()
         
-        # 5. Retornar bytes
-        with open(output_path, 'rb') as f:
-            pdf_bytes = f.read()
+        # 5. Persistir (se houver destino) e retornar bytes
+        persistir(pdf_bytes, output_path)
+        if isinstance(output_path, str):
+            logger.info(f"✓ PDF salvo em: {output_path}")
         
         logger.info(f"✓ Tamanho final: {len(pdf_bytes)/1024:.2f} KB")
         logger.info("="*80)
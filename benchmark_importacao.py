@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de importação: tempo de `import <módulo>` em um interpretador NOVO
+
+Cada módulo tem um orçamento (ms) e uma lista de dependências pesadas que
+NÃO podem ser carregadas só por importá-lo (elas são importadas no primeiro
+uso). Serve para CLI e cold start serverless: o caminho vetorial deve ficar
+bem abaixo de 100 ms.
+
+Uso:
+    python benchmark_importacao.py                    # todos os módulos
+    python benchmark_importacao.py pdf_replacer_pymupdf --repeticoes 10
+    python benchmark_importacao.py pdf_replacer --detalhar   # imports mais lentos
+
+Sai com código 1 se algum módulo estourar o orçamento ou carregar uma
+dependência pesada.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Dependências que nenhum módulo deve carregar no import
+PESADAS = ["cv2", "keras_ocr", "tensorflow", "pytesseract", "tesserocr", "pdf2image",
+           "img2pdf", "reportlab", "PyPDF2", "psycopg2"]
+
+# Caminho vetorial: nem PIL, nem NumPy, nem o próprio PyMuPDF (carregado no primeiro uso)
+PESADAS_VETORIAL = PESADAS + ["PIL", "numpy", "fitz", "pymupdf"]
+
+# módulo → (orçamento em ms, dependências proibidas no import)
+# Motores raster importam PyMuPDF + NumPy + PIL no topo (~250 ms com PyMuPDF 1.24+)
+ORCAMENTOS = {
+    "entrada_saida_pdf": (20, PESADAS_VETORIAL),
+    "indice_fontes": (40, PESADAS_VETORIAL),
+    "ajuste_texto": (50, PESADAS_VETORIAL),
+    "cache_layout": (50, PESADAS_VETORIAL),
+    "atualizacao_incremental": (50, PESADAS_VETORIAL),
+    "ocr_regioes": (250, PESADAS),
+    "servidor_keras_ocr": (250, PESADAS),
+    "motor_ocr": (250, PESADAS),
+    "deteccao_hibrida": (250, PESADAS),
+    "analise_template": (400, PESADAS),
+    "paginas_paralelas": (400, PESADAS),
+    "camadas_preenchimento": (400, PESADAS),
+    "cache_paginas": (400, PESADAS),
+    "pdf_replacer_pymupdf": (100, PESADAS_VETORIAL),
+    "pdf_replacer": (50, PESADAS_VETORIAL),
+    "formulario_acroform": (50, PESADAS_VETORIAL),
+    "auto_contract_pdf_generator": (200, PESADAS),
+    "processador_paginas_ocr": (250, PESADAS),
+    "pdf_placeholder_processor": (250, PESADAS),
+    "pdf_placeholder_processor_pytesseract": (250, PESADAS),
+    "pdf_placeholder_processor_pymupdf": (400, PESADAS),
+    "pdf_processor_v2_com_fonte_completo_CORRIGIDO": (400, PESADAS),
+    "pdf_processor_v2_com_fonte_inteligente_CORRIGIDO": (400, PESADAS),
+    "pdf_processor_v2_com_fonte_inteligente_IMG2PDF": (400, PESADAS),
+}
+
+CODIGO_FILHO = """
+import json, sys, time
+inicio = time.perf_counter()
+import {modulo}
+ms = (time.perf_counter() - inicio) * 1000
+print(json.dumps({{"ms": ms, "carregados": [m for m in {pesadas!r} if m in sys.modules]}}))
+"""
+
+
+def medir_uma_vez(modulo: str, pesadas: list) -> dict:
+    """Importa o módulo em um processo novo; retorna ms e dependências carregadas"""
+    resultado = subprocess.run(
+        [sys.executable, "-c", CODIGO_FILHO.format(modulo=modulo, pesadas=pesadas)],
+        cwd=DIRETORIO, capture_output=True, text=True,
+    )
+    if resultado.returncode != 0:
+        erro = resultado.stderr.strip().splitlines()
+        return {"erro": erro[-1] if erro else f"código {resultado.returncode}"}
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def medir(modulo: str, orcamento_ms: float, pesadas: list, repeticoes: int) -> dict:
+    """Mediana de `repeticoes` imports a frio"""
+    amostras = []
+    carregados = []
+    for _ in range(repeticoes):
+        medida = medir_uma_vez(modulo, pesadas)
+        if "erro" in medida:
+            return {"modulo": modulo, "erro": medida["erro"]}
+        amostras.append(medida["ms"])
+        carregados = medida["carregados"]
+
+    mediana = statistics.median(amostras)
+    return {
+        "modulo": modulo,
+        "ms": mediana,
+        "orcamento": orcamento_ms,
+        "carregados": carregados,
+        "ok": mediana <= orcamento_ms and not carregados,
+    }
+
+
+def detalhar(modulo: str, limite: int = 10) -> None:
+    """Imports mais lentos (tempo acumulado) segundo `python -X importtime`"""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=DIRETORIO, capture_output=True, text=True,
+    )
+    linhas = []
+    for linha in resultado.stderr.splitlines():
+        partes = linha.split("|")
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        linhas.append((int(partes[1]), partes[2].rstrip()))
+
+    print(f"\n  🔎 {modulo}: {limite} imports mais lentos (acumulado)")
+    for acumulado, nome in sorted(linhas, reverse=True)[:limite]:
+        print(f"     {acumulado / 1000:8.1f} ms  {nome.strip()}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Orçamento de tempo de importação")
+    parser.add_argument("modulos", nargs="*", help="módulos (padrão: todos)")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--detalhar", action="store_true",
+                        help="mostrar os imports mais lentos de cada módulo")
+    args = parser.parse_args()
+
+    modulos = args.modulos or list(ORCAMENTOS)
+
+    print("=" * 80)
+    print(f"BENCHMARK DE IMPORTAÇÃO ({args.repeticoes} repetições, mediana)")
+    print("=" * 80)
+
+    falhas = 0
+    for modulo in modulos:
+        orcamento, pesadas = ORCAMENTOS.get(modulo, (100, PESADAS))
+        r = medir(modulo, orcamento, pesadas, args.repeticoes)
+
+        if "erro" in r:
+            # Dependência do próprio módulo ausente neste ambiente: não conta
+            print(f"⚠️  {modulo:50s} não importável ({r['erro']})")
+            continue
+
+        icone = "✅" if r["ok"] else "❌"
+        print(f"{icone} {modulo:50s} {r['ms']:7.1f} ms  (orçamento {orcamento} ms)")
+        if r["carregados"]:
+            print(f"     carregou no import: {', '.join(r['carregados'])}")
+        if not r["ok"]:
+            falhas += 1
+        if args.detalhar:
+            detalhar(modulo)
+
+    print("=" * 80)
+    if falhas:
+        print(f"❌ {falhas} módulo(s) fora do orçamento")
+        return 1
+    print("✅ Todos os módulos importáveis dentro do orçamento")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# cache_layout.py
+# Layouts de placeholders detectados por OCR, persistidos em JSON
+# Chave: hash do template (pixels da imagem ou bytes do PDF) + motor + versão do formato
+# O OCR roda uma vez por versão do template; lotes e processos seguintes só leem o JSON
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from entrada_saida_pdf import Origem, normalizar_origem
+
+
+# Diretório padrão: cache do usuário, fora do repositório (sobrescrito por CACHE_LAYOUT_DIR)
+DIRETORIO_CACHE = os.environ.get(
+    "CACHE_LAYOUT_DIR",
+    os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                 "pdf_placeholders", "cache_layouts"),
+)
+
+# Muda quando o formato do layout ou a regra de detecção muda (invalida o cache)
+VERSAO_LAYOUT = 4
+
+
+def hash_imagem(imagem) -> str:
+    """
+    SHA-256 dos pixels decodificados (modo + tamanho + dados)
+
+    Independe do nome do arquivo e de metadados: o mesmo template renomeado,
+    vindo do banco ou reexportado sem mudanças visuais reaproveita o layout.
+    """
+    h = hashlib.sha256()
+    h.update(f"{imagem.mode}:{imagem.size[0]}x{imagem.size[1]}:".encode())
+    h.update(imagem.tobytes())
+    return h.hexdigest()
+
+
+# Caminho → (mtime_ns, tamanho, hash): arquivos só são relidos quando mudam
+_hashes_arquivos: Dict[str, Tuple[int, int, str]] = {}
+_trava_hashes = threading.Lock()
+
+
+def hash_documento(origem: Origem) -> str:
+    """
+    SHA-256 dos bytes de um documento (caminho lido em blocos, bytes ou stream)
+
+    Caminhos: o hash fica guardado no processo enquanto o mtime e o tamanho
+    do arquivo não mudam (template substituído no disco = hash novo).
+    """
+    origem = normalizar_origem(origem)
+    h = hashlib.sha256()
+    if isinstance(origem, bytes):
+        h.update(origem)
+        return h.hexdigest()
+
+    caminho = os.path.abspath(origem)
+    estado = os.stat(caminho)
+    with _trava_hashes:
+        guardado = _hashes_arquivos.get(caminho)
+    if guardado is not None and guardado[:2] == (estado.st_mtime_ns, estado.st_size):
+        return guardado[2]
+
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    with _trava_hashes:
+        _hashes_arquivos[caminho] = (estado.st_mtime_ns, estado.st_size, h.hexdigest())
+    return h.hexdigest()
+
+
+class CacheLayout:
+    """
+    Layouts por chave: memória do processo + arquivo JSON no disco
+
+    Gravação atômica (arquivo temporário + os.replace): processos paralelos
+    gerando o mesmo template nunca leem um JSON pela metade.
+    """
+
+    def __init__(self, diretorio: Optional[str] = None, motor: str = "tesseract"):
+        self.diretorio = diretorio or DIRETORIO_CACHE
+        self.motor = motor
+        self._memoria: Dict[str, Dict[str, Any]] = {}
+        self._trava = threading.Lock()
+
+    def chave(self, hash_template: str) -> str:
+        return f"{hash_template[:32]}-{self.motor}-v{VERSAO_LAYOUT}"
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.diretorio, f"{chave}.json")
+
+    def obter(self, hash_template: str) -> Optional[Dict[str, Any]]:
+        """Layout salvo para o template, ou None (JSON ausente ou corrompido)"""
+        chave = self.chave(hash_template)
+        with self._trava:
+            if chave in self._memoria:
+                return self._memoria[chave]
+
+        try:
+            with open(self._caminho(chave), "r", encoding="utf-8") as f:
+                registro = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if registro.get("hash") != hash_template or registro.get("versao") != VERSAO_LAYOUT:
+            return None
+
+        layout = registro["layout"]
+        with self._trava:
+            self._memoria[chave] = layout
+        return layout
+
+    def salvar(self, hash_template: str, layout: Dict[str, Any]) -> str:
+        """Persiste o layout (qualquer dicionário serializável em JSON); retorna o caminho"""
+        chave = self.chave(hash_template)
+        with self._trava:
+            self._memoria[chave] = layout
+
+        registro = {
+            "hash": hash_template,
+            "motor": self.motor,
+            "versao": VERSAO_LAYOUT,
+            "layout": layout,
+        }
+        os.makedirs(self.diretorio, exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        try:
+            with os.fdopen(descritor, "w", encoding="utf-8") as f:
+                json.dump(registro, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(temporario, self._caminho(chave))
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+        return self._caminho(chave)
+
+    def remover(self, hash_template: str) -> None:
+        """Descarta o layout (ex.: detecção revisada manualmente)"""
+        chave = self.chave(hash_template)
+        with self._trava:
+            self._memoria.pop(chave, None)
+        try:
+            os.remove(self._caminho(chave))
+        except FileNotFoundError:
+            pass
+
+
+_caches: Dict[tuple, CacheLayout] = {}
+_trava_caches = threading.Lock()
+
+
+def obter_cache_layout(diretorio: Optional[str] = None, motor: str = "tesseract") -> CacheLayout:
+    """Cache compartilhado no processo por (diretório, motor)"""
+    chave = (os.path.abspath(diretorio or DIRETORIO_CACHE), motor)
+    with _trava_caches:
+        if chave not in _caches:
+            _caches[chave] = CacheLayout(chave[0], motor)
+        return _caches[chave]
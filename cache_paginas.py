@@ -0,0 +1,150 @@
+# cache_paginas.py
+# Páginas prontas em cache, chaveadas pelos valores que CADA página usa
+# - mapa de dependências do template: página → placeholders que aparecem nela
+#   (spans e DPIs persistidos pela análise do template, ver analise_template)
+# - chave da página: template + DPI/perfil + (placeholder, valor, posição) daquela página
+# - aditivos e reemissões (um campo muda num contrato de cinco páginas) só
+#   renderizam e editam as páginas cujos valores mudaram
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from pagina_raster import PaginaRaster
+from paginas_paralelas import TarefaPagina
+
+
+# Memória máxima das páginas em cache (uma página A4 RGB a 300 DPI ocupa ~25 MB)
+MAXIMO_BYTES_PAGINAS = 512 * 1024 * 1024
+
+# Produz (page_num, página pronta), em ordem, só para as páginas pedidas
+ProdutorPaginas = Callable[[Set[int]], Iterator[Tuple[int, PaginaRaster]]]
+
+
+def mapa_dependencias(placeholders_info: list) -> Dict[int, List[str]]:
+    """Página → placeholders (texto do span) que ela usa, em ordem de página"""
+    mapa: Dict[int, List[str]] = {}
+    for ph in placeholders_info:
+        mapa.setdefault(ph.page, []).append(ph.nome)
+    return {pagina: sorted(nomes) for pagina, nomes in sorted(mapa.items())}
+
+
+def chave_pagina(hash_template: str, tarefa: TarefaPagina, placeholders_pagina: list,
+                 *opcoes) -> str:
+    """SHA-256 do que determina os pixels da página: só os valores que ela usa"""
+    descricao = {
+        "tarefa": list(tarefa),
+        "valores": sorted((p.nome, str(p.valor), [round(c, 2) for c in p.bbox])
+                          for p in placeholders_pagina),
+        "opcoes": [str(o) for o in opcoes],
+    }
+    h = hashlib.sha256(hash_template.encode())
+    h.update(json.dumps(descricao, ensure_ascii=False, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+class CachePaginas:
+    """
+    Páginas prontas por chave, em memória, limitadas pelo total de bytes
+
+    As páginas guardadas são somente leitura: o encoder só lê os pixels.
+    """
+
+    def __init__(self, maximo_bytes: int = MAXIMO_BYTES_PAGINAS):
+        self.maximo_bytes = maximo_bytes
+        self.bytes = 0
+        self._paginas: "OrderedDict[str, PaginaRaster]" = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave: str) -> Optional[PaginaRaster]:
+        with self._trava:
+            pagina = self._paginas.get(chave)
+            if pagina is not None:
+                self._paginas.move_to_end(chave)
+            return pagina
+
+    def salvar(self, chave: str, pagina: PaginaRaster) -> None:
+        tamanho = pagina.pixels.nbytes
+        if tamanho > self.maximo_bytes:
+            return
+        with self._trava:
+            anterior = self._paginas.pop(chave, None)
+            if anterior is not None:
+                self.bytes -= anterior.pixels.nbytes
+            self._paginas[chave] = pagina
+            self.bytes += tamanho
+            while self.bytes > self.maximo_bytes:
+                _, descartada = self._paginas.popitem(last=False)
+                self.bytes -= descartada.pixels.nbytes
+
+    def limpar(self) -> None:
+        with self._trava:
+            self._paginas.clear()
+            self.bytes = 0
+
+
+_cache = None
+_trava_cache = threading.Lock()
+
+
+def obter_cache_paginas() -> CachePaginas:
+    """Cache compartilhado no processo"""
+    global _cache
+    with _trava_cache:
+        if _cache is None:
+            _cache = CachePaginas()
+        return _cache
+
+
+def paginas_com_cache(hash_template: str, placeholders_info: list, tarefas: List[TarefaPagina],
+                      produzir: ProdutorPaginas, *opcoes,
+                      cache: Optional[CachePaginas] = None) -> Iterator[Tuple[int, PaginaRaster]]:
+    """
+    (page_num, página pronta) na ordem do PDF, renderizando só o que mudou
+
+    Páginas cuja chave (ver chave_pagina) já está no cache saem direto dele;
+    as demais são pedidas a `produzir` de uma vez (na ordem) e guardadas.
+    As páginas entregues são somente leitura.
+
+    Args:
+        hash_template: hash dos bytes do template (o da análise do template)
+        placeholders_info: todos os placeholders do template com os valores
+        tarefas: (page_num, dpi, perfil) de cada página com placeholders
+        produzir: páginas pedidas → (page_num, página pronta) em ordem
+        opcoes: o que mais muda os pixels (motor, fontes, camadas)
+        cache: padrão: o compartilhado do processo
+    """
+    cache = cache or obter_cache_paginas()
+
+    dependencias = mapa_dependencias(placeholders_info)
+    chaves = {
+        tarefa[0]: chave_pagina(hash_template, tarefa,
+                                [p for p in placeholders_info if p.page == tarefa[0]], *opcoes)
+        for tarefa in tarefas
+    }
+
+    # Referências guardadas agora: a página não some do cache no meio do PDF
+    prontas = {}
+    for page_num, chave in chaves.items():
+        pagina = cache.obter(chave)
+        if pagina is not None:
+            prontas[page_num] = pagina
+    faltando = set(chaves) - set(prontas)
+
+    for page_num in sorted(chaves):
+        estado = "cache" if page_num in prontas else "renderizar"
+        print(f"  🗂️  Pág {page_num+1}: {len(dependencias.get(page_num, []))} placeholder(s) → {estado}")
+    print(f"♻️  {len(prontas)} de {len(chaves)} página(s) sem mudanças reaproveitadas do cache\n")
+
+    novas = produzir(faltando) if faltando else iter(())
+    for page_num in sorted(chaves):
+        if page_num in prontas:
+            yield page_num, prontas[page_num]
+            continue
+        produzida, pagina = next(novas)
+        if produzida != page_num:
+            raise RuntimeError(f"Página {produzida+1} produzida no lugar da {page_num+1}")
+        cache.salvar(chaves[page_num], pagina)
+        yield page_num, pagina
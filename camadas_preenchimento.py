@@ -0,0 +1,160 @@
+# camadas_preenchimento.py
+# Preenchimento em CAMADAS nos pipelines v2
+# - camada fixa: campos que se repetem em milhares de contratos (dados da clínica),
+#   preenchidos UMA vez por (template, valores fixos) e guardados como páginas raster
+# - camada variável: paciente, datas e valores, preenchidos numa cópia da camada fixa
+# Quais campos são fixos é configurável (padrão: CAMPOS_CLINICA)
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from entrada_saida_pdf import Origem
+from pagina_raster import PaginaRaster
+from paginas_paralelas import EditorPagina, TarefaPagina, processar_em_paralelo
+
+
+# Campos iguais para todos os contratos de uma clínica
+CAMPOS_CLINICA = (
+    "nome_da_medica_ou_clinica",
+    "cpfcnpjmedicacli",
+    "celmedicacli",
+    "emailmedicacli",
+    "enderecomedical",
+    "enderecomedica2",
+)
+
+# Camadas guardadas no processo; cada página A4 RGB a 300 DPI ocupa ~25 MB
+MAXIMO_CAMADAS = 8
+
+CamadaFixa = Dict[int, PaginaRaster]
+
+
+def _nome_limpo(nome: str) -> str:
+    """'{ cpfcnpjmedicacli }' → 'cpfcnpjmedicacli' (mesma regra de obter_coordenadas)"""
+    match = re.search(r"{(.*?)}", nome)
+    return (match.group(1) if match else nome).strip().strip("{}")
+
+
+def e_campo_fixo(nome: str, campos_fixos: Sequence[str] = CAMPOS_CLINICA) -> bool:
+    """Placeholder (texto do span) pertence à camada fixa? Nome exato: {cpfcnpjmedicacli_testemunha} não"""
+    return _nome_limpo(nome) in {campo.strip().strip("{}") for campo in campos_fixos}
+
+
+def separar_camadas(placeholders_info: list, campos_fixos: Sequence[str] = CAMPOS_CLINICA
+                    ) -> Tuple[list, list]:
+    """PlaceholderInfo → (camada fixa, camada variável), na ordem original"""
+    fixos = [p for p in placeholders_info if e_campo_fixo(p.nome, campos_fixos)]
+    variaveis = [p for p in placeholders_info if not e_campo_fixo(p.nome, campos_fixos)]
+    return fixos, variaveis
+
+
+def chave_camada(hash_template: str, fixos: list, tarefas: List[TarefaPagina],
+                 *opcoes) -> str:
+    """
+    SHA-256 de tudo que determina os pixels da camada fixa
+
+    Template (hash dos bytes, o da análise do template), placeholders fixos
+    com valor e posição, DPI e perfil de cada página e as opções do motor
+    (módulo, diretório de fontes).
+    """
+    descricao = {
+        "fixos": [(p.nome, str(p.valor), p.page, [round(c, 2) for c in p.bbox]) for p in fixos],
+        "tarefas": [list(t) for t in tarefas],
+        "opcoes": [str(o) for o in opcoes],
+    }
+    h = hashlib.sha256(hash_template.encode())
+    h.update(json.dumps(descricao, ensure_ascii=False, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+class CacheCamadas:
+    """
+    Camadas fixas prontas por chave, em memória, descartando a menos usada
+
+    As páginas guardadas nunca são alteradas: quem edita recebe uma cópia.
+    """
+
+    def __init__(self, maximo: int = MAXIMO_CAMADAS):
+        self.maximo = maximo
+        self._camadas: "OrderedDict[str, CamadaFixa]" = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave: str) -> Optional[CamadaFixa]:
+        with self._trava:
+            camada = self._camadas.get(chave)
+            if camada is not None:
+                self._camadas.move_to_end(chave)
+            return camada
+
+    def salvar(self, chave: str, camada: CamadaFixa) -> None:
+        with self._trava:
+            self._camadas[chave] = camada
+            self._camadas.move_to_end(chave)
+            while len(self._camadas) > self.maximo:
+                self._camadas.popitem(last=False)
+
+    def limpar(self) -> None:
+        with self._trava:
+            self._camadas.clear()
+
+
+_cache = None
+_trava_cache = threading.Lock()
+
+
+def obter_cache_camadas() -> CacheCamadas:
+    """Cache compartilhado no processo"""
+    global _cache
+    with _trava_cache:
+        if _cache is None:
+            _cache = CacheCamadas()
+        return _cache
+
+
+def paginas_em_camadas(origem: Origem, tarefas: List[TarefaPagina],
+                       editor_fixo: EditorPagina,
+                       editor_variavel: Callable[[PaginaRaster], None],
+                       paginas_variaveis: Set[int], chave: str,
+                       workers: Optional[int] = 1,
+                       cache: Optional[CacheCamadas] = None,
+                       paginas: Optional[Set[int]] = None) -> Iterator[Tuple[int, PaginaRaster]]:
+    """
+    (page_num, página pronta) na ordem do PDF, a partir da camada fixa
+
+    A camada fixa (todas as páginas com placeholders, campos fixos já
+    preenchidos) é montada na primeira chamada com a chave e reaproveitada
+    nas seguintes. Páginas com campos variáveis são copiadas e editadas;
+    as demais saem direto do cache (o encoder só lê os pixels).
+
+    Args:
+        origem: template (caminho ou bytes)
+        tarefas: (page_num, dpi, perfil) de todas as páginas com placeholders
+        editor_fixo: funções 3 e 4 com os placeholders fixos (serializável)
+        editor_variavel: funções 3 e 4 com os placeholders variáveis
+        paginas_variaveis: páginas com ao menos um placeholder variável
+        chave: ver chave_camada
+        workers: processos montando a camada fixa (ver paginas_paralelas)
+        cache: padrão: o compartilhado do processo
+        paginas: só estas páginas (a camada fixa é montada inteira)
+    """
+    cache = cache or obter_cache_camadas()
+    camada = cache.obter(chave)
+    if camada is None:
+        print(f"🧱 Camada fixa: preenchendo {len(tarefas)} página(s) (uma vez por template e clínica)\n")
+        camada = dict(processar_em_paralelo(origem, tarefas, editor_fixo, workers))
+        cache.salvar(chave, camada)
+    else:
+        print(f"💾 Camada fixa em cache ({len(camada)} página(s)): só os campos variáveis\n")
+
+    for page_num in sorted(camada):
+        if paginas is not None and page_num not in paginas:
+            continue
+        pagina = camada[page_num]
+        if page_num in paginas_variaveis:
+            pagina = pagina.copia()
+            editor_variavel(pagina)
+        yield page_num, pagina
@@ -0,0 +1,298 @@
+# codificador_pdf.py
+# Codificação das páginas raster no PDF final, de acordo com o perfil de cor
+# RGB → Flate RGB | cinza → Flate cinza | 1 bit → CCITT G4 (fallback: Flate 1 bit)
+# Perfis de saída: sem perdas | JPEG | MRC (máscara CCITT G4 sobre fundo JPEG reduzido)
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+from io import BytesIO
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+import zlib
+
+from pagina_raster import (PaginaRaster, ImagemRaster, PERFIL_1BIT, LIMIAR_1BIT,
+                           obter_pixels, para_pixmap)
+
+
+# Perfis de saída (codificação das páginas no PDF final)
+SAIDA_SEM_PERDAS = "sem_perdas"
+SAIDA_JPEG = "jpeg"
+SAIDA_MRC = "mrc"
+PERFIS_SAIDA = (SAIDA_SEM_PERDAS, SAIDA_JPEG, SAIDA_MRC)
+
+QUALIDADE_JPEG = 80
+# MRC: fundo e cor do texto em resolução reduzida (o contorno vem da máscara)
+FATOR_FUNDO_MRC = 3
+FATOR_FRENTE_MRC = 6
+QUALIDADE_FUNDO_MRC = 60
+
+
+@dataclass
+class RelatorioCodificacao:
+    """Resultado da codificação de um PDF (tempo e tamanho por requisição)"""
+    perfil: str
+    paginas: int
+    tempo_codificacao: float  # segundos (páginas + gravação)
+    tamanho_bytes: int
+    dados: bytes = field(default=b"", repr=False)  # o PDF gerado
+
+    @property
+    def tamanho_mb(self) -> float:
+        return self.tamanho_bytes / 1024 / 1024
+
+    def resumo(self) -> str:
+        return (f"Perfil: {self.perfil} | {self.paginas} página(s) | "
+                f"{self.tamanho_mb:.2f} MB | {self.tempo_codificacao:.2f}s")
+
+
+def _imagem_1bit_pil(mascara: np.ndarray) -> Image.Image:
+    """Imagem PIL modo '1' a partir da máscara binária (True = branco)"""
+    return Image.fromarray(mascara.astype(np.uint8) * 255).convert("1")
+
+
+def codificar_ccitt_g4(mascara: np.ndarray) -> Optional[Tuple[bytes, bool]]:
+    """
+    Codifica a máscara em CCITT Group 4 (via libtiff do Pillow)
+
+    Returns:
+        (dados_g4, black_is_1) ou None quando o TIFF gerado tem mais de uma
+        faixa (strip) ou o Pillow não tem suporte a group4
+    """
+    buffer = BytesIO()
+    try:
+        _imagem_1bit_pil(mascara).save(buffer, format="TIFF", compression="group4")
+        tiff = Image.open(BytesIO(buffer.getvalue()))
+        offsets = tiff.tag_v2[273]
+        contagens = tiff.tag_v2[279]
+        fotometria = tiff.tag_v2.get(262, 0)
+    except Exception:
+        return None
+
+    if len(offsets) != 1:
+        return None
+
+    dados = buffer.getvalue()[offsets[0]:offsets[0] + contagens[0]]
+
+    # MinIsBlack (1): bits 0 são pretos, então o decodificador PDF precisa de BlackIs1
+    return dados, fotometria == 1
+
+
+def _adicionar_xobject(doc: fitz.Document, dicionario: str, dados: bytes,
+                       filtro: str, parametros: Optional[str] = None) -> int:
+    """Cria um XObject de imagem com stream já codificado e retorna seu xref"""
+    xref = doc.get_new_xref()
+    doc.update_object(xref, dicionario)
+    doc.update_stream(xref, dados, new=True, compress=False)
+
+    # update_stream sem compressão remove /Filter: definir depois do stream
+    doc.xref_set_key(xref, "Filter", filtro)
+    if parametros:
+        doc.xref_set_key(xref, "DecodeParms", parametros)
+
+    return xref
+
+
+def _codificar_mascara(mascara: np.ndarray) -> Tuple[bytes, str, Optional[str]]:
+    """Máscara 1 bit em CCITT G4 (fallback: Flate) → (dados, filtro, parâmetros)"""
+    altura, largura = mascara.shape
+
+    g4 = codificar_ccitt_g4(mascara)
+    if g4:
+        dados, black_is_1 = g4
+        return dados, "/CCITTFaxDecode", (
+            f"<</K -1/Columns {largura}/Rows {altura}"
+            f"/BlackIs1 {'true' if black_is_1 else 'false'}>>")
+
+    # Linhas empacotadas com padding de byte (bit 1 = branco em DeviceGray)
+    return zlib.compress(np.packbits(mascara, axis=1).tobytes(), 9), "/FlateDecode", None
+
+
+def _adicionar_imagem_1bit(doc: fitz.Document, mascara: np.ndarray) -> int:
+    """Cria um XObject de imagem 1 bit (CCITT G4 ou Flate) e retorna seu xref"""
+    altura, largura = mascara.shape
+    dados, filtro, parametros = _codificar_mascara(mascara)
+
+    return _adicionar_xobject(doc, (f"<</Type/XObject/Subtype/Image/Width {largura}"
+                                    f"/Height {altura}/ColorSpace/DeviceGray"
+                                    f"/BitsPerComponent 1>>"),
+                              dados, filtro, parametros)
+
+
+def _codificar_jpeg(pixels: np.ndarray, qualidade: int) -> bytes:
+    """JPEG (RGB ou cinza) a partir de um array de pixels"""
+    buffer = BytesIO()
+    Image.fromarray(np.ascontiguousarray(pixels)).save(
+        buffer, "JPEG", quality=qualidade, optimize=True)
+    return buffer.getvalue()
+
+
+def _pixels_da_pagina(imagem: ImagemRaster) -> np.ndarray:
+    return imagem.pixels if isinstance(imagem, PaginaRaster) else imagem
+
+
+def _reduzir(pixels: np.ndarray, fator: int) -> np.ndarray:
+    import cv2
+
+    altura, largura = pixels.shape[:2]
+    return cv2.resize(pixels, (max(1, largura // fator), max(1, altura // fator)),
+                      interpolation=cv2.INTER_AREA)
+
+
+def _inserir_mrc(doc: fitz.Document, page: fitz.Page, pixels: np.ndarray):
+    """
+    Mixed Raster Content em duas camadas sobre a página
+
+    - fundo: página reduzida (1/FATOR_FUNDO_MRC) com o texto escuro removido
+      por fechamento morfológico, em JPEG de baixa qualidade
+    - frente: cor do texto em resolução ainda menor (JPEG), recortada pela
+      máscara de texto em resolução cheia (CCITT G4) via /Mask explícita
+    """
+    import cv2  # OpenCV: importado aqui, só o perfil MRC precisa dele
+
+    cinza = pixels if pixels.ndim == 2 else cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+    mascara = cinza >= LIMIAR_1BIT  # True = fundo (mascarado), False = texto
+    altura, largura = mascara.shape
+
+    kernel = np.ones((3, 3), np.uint8)
+    fundo = cv2.morphologyEx(_reduzir(pixels, FATOR_FUNDO_MRC), cv2.MORPH_CLOSE, kernel)
+    page.insert_image(page.rect, stream=_codificar_jpeg(fundo, QUALIDADE_FUNDO_MRC))
+
+    if mascara.all():
+        return  # página sem texto: só o fundo
+
+    # Erosão espalha a cor dos traços: cada bloco reduzido fica com a cor do texto
+    frente = _reduzir(cv2.erode(pixels, kernel, iterations=2), FATOR_FRENTE_MRC)
+    dados_mascara, filtro, parametros = _codificar_mascara(mascara)
+    xref_mascara = _adicionar_xobject(
+        doc, (f"<</Type/XObject/Subtype/Image/Width {largura}/Height {altura}"
+              f"/ImageMask true/BitsPerComponent 1>>"),
+        dados_mascara, filtro, parametros)
+
+    espaco = "/DeviceGray" if frente.ndim == 2 else "/DeviceRGB"
+    xref_frente = _adicionar_xobject(
+        doc, (f"<</Type/XObject/Subtype/Image/Width {frente.shape[1]}"
+              f"/Height {frente.shape[0]}/ColorSpace{espaco}/BitsPerComponent 8"
+              f"/Mask {xref_mascara} 0 R>>"),
+        _codificar_jpeg(frente, QUALIDADE_FUNDO_MRC), "/DCTDecode")
+    page.insert_image(page.rect, xref=xref_frente)
+
+
+def inserir_pagina_raster(doc: fitz.Document, imagem: ImagemRaster,
+                          perfil_saida: str = SAIDA_SEM_PERDAS,
+                          qualidade_jpeg: int = QUALIDADE_JPEG) -> fitz.Page:
+    """
+    Cria uma página no documento com a imagem codificada conforme os perfis
+
+    Páginas vindas de um PaginaRaster mantêm o tamanho em pontos do PDF de
+    origem (pixels × 72 / DPI), mesmo com DPI diferente por página.
+
+    - PaginaRaster 1 bit → CCITT G4 (Flate 1 bit se o G4 não estiver disponível),
+      em qualquer perfil de saída
+    - sem_perdas → Pixmap com Flate no espaço de cor da página
+    - jpeg       → JPEG com `qualidade_jpeg`
+    - mrc        → máscara de texto CCITT G4 sobre fundo JPEG reduzido
+    """
+    if perfil_saida not in PERFIS_SAIDA:
+        raise ValueError(f"Perfil de saída inválido: {perfil_saida} "
+                         f"(use {', '.join(PERFIS_SAIDA)})")
+
+    if isinstance(imagem, str):
+        imagem = obter_pixels(imagem)
+
+    if isinstance(imagem, PaginaRaster):
+        # Tamanho original da página, qualquer que seja o DPI da renderização
+        largura, altura = imagem.tamanho_pt
+    else:
+        altura, largura = imagem.shape[:2]
+
+    page = doc.new_page(width=largura, height=altura)
+
+    if isinstance(imagem, PaginaRaster) and imagem.perfil == PERFIL_1BIT:
+        xref = _adicionar_imagem_1bit(doc, imagem.mascara_1bit())
+        page.insert_image(page.rect, xref=xref)
+    elif perfil_saida == SAIDA_JPEG:
+        page.insert_image(page.rect, stream=_codificar_jpeg(
+            _pixels_da_pagina(imagem), qualidade_jpeg))
+    elif perfil_saida == SAIDA_MRC:
+        _inserir_mrc(doc, page, _pixels_da_pagina(imagem))
+    else:
+        page.insert_image(page.rect, pixmap=para_pixmap(imagem))
+
+    return page
+
+
+def codificar_para_img2pdf(imagem: ImagemRaster, perfil_saida: str = SAIDA_SEM_PERDAS,
+                           qualidade_jpeg: int = QUALIDADE_JPEG) -> Tuple[bytes, str]:
+    """
+    Codifica a página em um formato que o img2pdf embute sem recomprimir
+
+    O img2pdf não compõe camadas: o perfil "mrc" é tratado como "jpeg".
+
+    O DPI do PaginaRaster vai nos metadados da imagem: o img2pdf usa esse
+    valor para manter o tamanho original da página.
+
+    Returns:
+        (bytes, extensão): TIFF G4 no perfil 1 bit; JPEG nos perfis de saída
+        "jpeg"/"mrc"; PNG (cinza ou RGB) no perfil sem perdas
+    """
+    if perfil_saida not in PERFIS_SAIDA:
+        raise ValueError(f"Perfil de saída inválido: {perfil_saida} "
+                         f"(use {', '.join(PERFIS_SAIDA)})")
+
+    if isinstance(imagem, str):
+        imagem = obter_pixels(imagem)
+
+    metadados = {}
+    if isinstance(imagem, PaginaRaster):
+        metadados["dpi"] = (imagem.dpi, imagem.dpi)
+        if imagem.perfil == PERFIL_1BIT:
+            buffer = BytesIO()
+            _imagem_1bit_pil(imagem.mascara_1bit()).save(
+                buffer, format="TIFF", compression="group4", **metadados)
+            return buffer.getvalue(), "tif"
+        img_pil = imagem.como_imagem_pil()
+    else:
+        img_pil = Image.fromarray(np.ascontiguousarray(imagem))
+
+    buffer = BytesIO()
+    if perfil_saida in (SAIDA_JPEG, SAIDA_MRC):
+        img_pil.save(buffer, "JPEG", quality=qualidade_jpeg, optimize=True, **metadados)
+        return buffer.getvalue(), "jpg"
+
+    img_pil.save(buffer, "PNG", **metadados)
+    return buffer.getvalue(), "png"
+
+
+def imagens_para_pdf(imagens: List[Image.Image], dpis: List[int],
+                     qualidade: int = 95) -> bytes:
+    """
+    PDF em memória a partir de imagens PIL (uma por página), cada uma com o próprio DPI
+
+    O writer de PDF do Pillow aplica uma única resolução a todas as páginas;
+    aqui cada página recebe o tamanho original (pixels × 72 / DPI), com a
+    mesma compressão JPEG que o Pillow usaria.
+    """
+    doc = fitz.open()
+    try:
+        for img, dpi in zip(imagens, dpis):
+            adicionar_pagina_jpeg(doc, img, dpi, qualidade)
+        return doc.tobytes(garbage=4, deflate=True)
+    finally:
+        doc.close()
+
+
+def adicionar_pagina_jpeg(doc: fitz.Document, imagem: Image.Image, dpi: int,
+                          qualidade: int = 95) -> fitz.Page:
+    """
+    Anexa uma imagem PIL como página JPEG com o tamanho original (pixels × 72 / DPI)
+
+    Usado pelos processadores em fluxo: cada página é codificada assim que
+    fica pronta e só o JPEG permanece em memória.
+    """
+    buffer = BytesIO()
+    imagem.convert("RGB").save(buffer, "JPEG", quality=qualidade)
+    page = doc.new_page(width=imagem.width * 72.0 / dpi,
+                        height=imagem.height * 72.0 / dpi)
+    page.insert_image(page.rect, stream=buffer.getvalue())
+    return page
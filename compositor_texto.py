@@ -0,0 +1,207 @@
+# compositor_texto.py
+# Composição de texto sobre o buffer NumPy da página com ATLAS de glifos
+# Cada glifo é rasterizado uma vez por (fonte, tamanho) e reaproveitado entre
+# placeholders e contratos; a string é montada por blits e misturada em UMA operação
+
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+
+# Glifos mantidos no atlas (≈ 40 glifos × 100 combinações de fonte/tamanho)
+CAPACIDADE_ATLAS = 4096
+
+Cor = Union[int, Tuple[int, int, int]]
+
+
+@dataclass(frozen=True)
+class Glifo:
+    """Máscara alfa de um glifo e suas métricas relativas à origem (linha de base)"""
+    mascara: np.ndarray  # (altura, largura) uint8
+    esquerda: int
+    topo: int
+    avanco: float
+
+
+class AtlasGlifos:
+    """
+    Cache limitado (LRU) de glifos, avanços e kerning por fonte
+
+    A chave é o próprio objeto de fonte (instâncias vêm do LRU do índice de
+    fontes, então a mesma família/peso/tamanho é sempre o mesmo objeto). O
+    atlas mantém a referência, o que impede reutilização de id por outra fonte.
+    """
+
+    def __init__(self, capacidade: int = CAPACIDADE_ATLAS):
+        self.capacidade = capacidade
+        self._glifos: "OrderedDict[tuple, Glifo]" = OrderedDict()
+        self._kerning: "OrderedDict[tuple, float]" = OrderedDict()
+        self._ascendentes: "OrderedDict[object, int]" = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def _lembrar(self, cache: OrderedDict, chave, valor) -> None:
+        with self._trava:
+            cache[chave] = valor
+            cache.move_to_end(chave)
+            while len(cache) > self.capacidade:
+                cache.popitem(last=False)
+
+    def _buscar(self, cache: OrderedDict, chave):
+        with self._trava:
+            valor = cache.get(chave)
+            if valor is not None:
+                cache.move_to_end(chave)
+            return valor
+
+    def glifo(self, fonte, caractere: str) -> Glifo:
+        chave = (fonte, caractere)
+        glifo = self._buscar(self._glifos, chave)
+        if glifo is not None:
+            self.acertos += 1
+            return glifo
+
+        self.faltas += 1
+        glifo = _rasterizar_glifo(fonte, caractere)
+        self._lembrar(self._glifos, chave, glifo)
+        return glifo
+
+    def kerning(self, fonte, anterior: str, caractere: str) -> float:
+        """Ajuste do par (avanço do par − avanços isolados)"""
+        chave = (fonte, anterior + caractere)
+        ajuste = self._buscar(self._kerning, chave)
+        if ajuste is None:
+            ajuste = (fonte.getlength(anterior + caractere)
+                      - self.glifo(fonte, anterior).avanco
+                      - self.glifo(fonte, caractere).avanco)
+            self._lembrar(self._kerning, chave, ajuste)
+        return ajuste
+
+    def ascendente(self, fonte) -> int:
+        """Distância do topo (âncora "la" do PIL) até a linha de base"""
+        ascendente = self._buscar(self._ascendentes, fonte)
+        if ascendente is None:
+            ascendente = fonte.getmetrics()[0]
+            self._lembrar(self._ascendentes, fonte, ascendente)
+        return ascendente
+
+    def limpar(self) -> None:
+        with self._trava:
+            self._glifos.clear()
+            self._kerning.clear()
+            self._ascendentes.clear()
+
+
+def _rasterizar_glifo(fonte, caractere: str) -> Glifo:
+    """Rasteriza UM glifo na origem da linha de base (âncora "ls")"""
+    esq, topo, dir, base = fonte.getbbox(caractere, anchor="ls")
+    avanco = fonte.getlength(caractere)
+    largura, altura = dir - esq, base - topo
+
+    if largura <= 0 or altura <= 0:
+        # Espaço e similares: só avanço
+        return Glifo(np.zeros((0, 0), dtype=np.uint8), 0, 0, avanco)
+
+    img = Image.new("L", (largura, altura), 0)
+    ImageDraw.Draw(img).text((-esq, -topo), caractere, fill=255, font=fonte, anchor="ls")
+    return Glifo(np.asarray(img), esq, topo, avanco)
+
+
+ATLAS_PADRAO = AtlasGlifos()
+
+
+def suporta_atlas(fonte, texto: str) -> bool:
+    """
+    Fontes FreeType e texto sem marcas combinantes
+
+    Fontes bitmap do PIL (load_default antigo) não têm âncoras, e marcas
+    combinantes dependem de posicionamento contextual: ambos vão pelo PIL.
+    """
+    if not hasattr(fonte, "getmetrics") or not hasattr(fonte, "getlength"):
+        return False
+    return not any(unicodedata.combining(c) for c in texto)
+
+
+def montar_texto(texto: str, fonte, atlas: Optional[AtlasGlifos] = None
+                 ) -> Tuple[Optional[np.ndarray], int, int]:
+    """
+    Máscara alfa da string inteira e sua posição relativa à âncora "la"
+
+    Retorna (máscara, dx, dy): a máscara começa em (x + dx, y + dy).
+    """
+    atlas = atlas or ATLAS_PADRAO
+    linha_base = atlas.ascendente(fonte)
+
+    pecas: List[Tuple[Glifo, int, int]] = []
+    caneta = 0.0
+    anterior = None
+    for caractere in texto:
+        if anterior is not None:
+            caneta += atlas.kerning(fonte, anterior, caractere)
+        glifo = atlas.glifo(fonte, caractere)
+        if glifo.mascara.size:
+            pecas.append((glifo, int(round(caneta)) + glifo.esquerda,
+                          linha_base + glifo.topo))
+        caneta += glifo.avanco
+        anterior = caractere
+
+    if not pecas:
+        return None, 0, 0
+
+    x0 = min(gx for _, gx, _ in pecas)
+    y0 = min(gy for _, _, gy in pecas)
+    x1 = max(gx + g.mascara.shape[1] for g, gx, _ in pecas)
+    y1 = max(gy + g.mascara.shape[0] for g, _, gy in pecas)
+
+    mascara = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+    for glifo, gx, gy in pecas:
+        altura, largura = glifo.mascara.shape
+        destino = mascara[gy - y0:gy - y0 + altura, gx - x0:gx - x0 + largura]
+        np.maximum(destino, glifo.mascara, out=destino)  # glifos sobrepostos (kerning)
+
+    return mascara, x0, y0
+
+
+def compor_texto(pixels: np.ndarray, posicao: Tuple[int, int], texto: str,
+                 fonte, cor: Cor, atlas: Optional[AtlasGlifos] = None) -> bool:
+    """
+    Mistura o texto NO LUGAR no buffer (RGB ou cinza) com os glifos do atlas
+
+    `posicao` segue a âncora padrão do PIL ("la": esquerda, topo do ascendente).
+    Retorna False quando a fonte/texto não é suportado (o chamador usa o PIL).
+    """
+    if not suporta_atlas(fonte, texto):
+        return False
+
+    mascara, dx, dy = montar_texto(texto, fonte, atlas)
+    if mascara is None:
+        return True
+
+    altura, largura = pixels.shape[:2]
+    x, y = int(posicao[0]) + dx, int(posicao[1]) + dy
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(largura, x + mascara.shape[1]), min(altura, y + mascara.shape[0])
+    if x1 <= x0 or y1 <= y0:
+        return True
+
+    alfa = mascara[y0 - y:y1 - y, x0 - x:x1 - x].astype(np.uint16)
+    roi = pixels[y0:y1, x0:x1]
+
+    if roi.ndim == 2:
+        if isinstance(cor, tuple):
+            # Composição no espaço da página: cor RGB → luminância
+            cor = int(round(0.299 * cor[0] + 0.587 * cor[1] + 0.114 * cor[2]))
+        tinta = np.uint16(cor)
+    else:
+        alfa = alfa[:, :, None]
+        tinta = np.asarray(cor if isinstance(cor, tuple) else (cor,) * 3, dtype=np.uint16)
+
+    # Uma única mistura alfa para a string inteira (arredondada, em uint16)
+    roi[...] = ((roi * (255 - alfa) + tinta * alfa + 127) // 255).astype(np.uint8)
+    return True
@@ -0,0 +1,269 @@
+# deteccao_hibrida.py
+# Detecção HÍBRIDA de placeholders {xxx} por página
+# - Página com camada de texto → spans de get_text("dict") (exatos, sem OCR)
+# - Página só imagem (escaneada) → OCR da página renderizada
+# - Texto + imagens grandes → spans + OCR só das imagens (placeholders "queimados" nelas)
+# A decisão de cada página e os placeholders ficam no cache junto com o template
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from cache_layout import CacheLayout, hash_documento, obter_cache_layout
+from entrada_saida_pdf import Origem, abrir_pdf, normalizar_origem
+from processador_paginas_ocr import workers_paginas
+
+
+MODO_TEXTO = "texto"   # só a camada de texto
+MODO_OCR = "ocr"       # página inteira por OCR
+MODO_MISTO = "misto"   # camada de texto + OCR das imagens
+
+# Menos caracteres que isso na camada de texto = página escaneada
+MINIMO_CARACTERES_TEXTO = 20
+
+# Imagens menores que esta fração da página (logos, ícones) não passam por OCR
+AREA_MINIMA_IMAGEM = 0.05
+
+# Altura da caixa do OCR → tamanho da fonte (as chaves vão do ascendente ao descendente)
+FATOR_ALTURA_FONTE = 0.85
+
+PADRAO_PLACEHOLDER = re.compile(r"\{[^{}\s]+\}")
+
+Caixa = Tuple[float, float, float, float]  # x0, y0, x1, y1 em pontos PDF
+
+# OCR plugável: imagem → [(texto, x, y, largura, altura)] em pixels da imagem
+OcrPixels = Callable[[Image.Image], List[Tuple[str, int, int, int, int]]]
+
+
+@dataclass
+class PlaceholderDetectado:
+    """Placeholder em coordenadas da página (pontos PDF), venha do texto ou do OCR"""
+    texto: str
+    pagina: int
+    bbox: Caixa
+    tamanho: float
+    fonte: Optional[str] = None   # None quando veio do OCR
+    cor: int = 0                  # sRGB inteiro, como em get_text("dict")
+    origem: str = MODO_TEXTO      # "texto" ou "ocr"
+
+    def em_pixels(self, dpi: float) -> Tuple[int, int, int, int]:
+        """(x, y, largura, altura) na página renderizada em `dpi`"""
+        escala = dpi / 72.0
+        x0, y0, x1, y1 = self.bbox
+        return (int(x0 * escala), int(y0 * escala),
+                int(round((x1 - x0) * escala)), int(round((y1 - y0) * escala)))
+
+    @property
+    def cor_rgb(self) -> Tuple[int, int, int]:
+        return ((self.cor >> 16) & 255, (self.cor >> 8) & 255, self.cor & 255)
+
+
+@dataclass
+class DecisaoPagina:
+    """Como a página é lida e quais áreas (pt) passam por OCR"""
+    pagina: int
+    modo: str
+    regioes_ocr: List[Caixa] = field(default_factory=list)
+
+
+# ============================================================================
+# CAMADA DE TEXTO E DECISÃO POR PÁGINA
+# ============================================================================
+
+def placeholders_camada_texto(page) -> List[PlaceholderDetectado]:
+    """Cada {xxx} da camada de texto: caixa só do placeholder, fonte, tamanho e cor do span"""
+    import fitz  # PyMuPDF: importado aqui para os motores PIL não dependerem dele
+    from pagina_raster import spans_texto  # sem decodificar as imagens da página
+
+    encontrados = []
+    for span in spans_texto(page):
+        vistos: Dict[str, int] = {}
+        for match in PADRAO_PLACEHOLDER.finditer(span["text"]):
+            # "Paciente: {nome_paciente}" → só "{nome_paciente}" (o rótulo fica na página)
+            ocorrencia = vistos.get(match.group(0), 0)
+            vistos[match.group(0)] = ocorrencia + 1
+            caixas = page.search_for(match.group(0), clip=fitz.Rect(span["bbox"]))
+            caixa = caixas[ocorrencia] if ocorrencia < len(caixas) else fitz.Rect(span["bbox"])
+            encontrados.append(PlaceholderDetectado(
+                texto=match.group(0),
+                pagina=page.number,
+                bbox=tuple(caixa),
+                tamanho=span.get("size", 12),
+                fonte=span.get("font", "Arial"),
+                cor=span.get("color", 0),
+            ))
+    return encontrados
+
+
+def decidir_pagina(page, minimo_caracteres: int = MINIMO_CARACTERES_TEXTO,
+                   area_minima: float = AREA_MINIMA_IMAGEM) -> DecisaoPagina:
+    """
+    Texto, OCR ou misto
+
+    Sem camada de texto → OCR da página inteira. Com texto, só as imagens
+    que cobrem ao menos `area_minima` da página passam por OCR.
+    """
+    retangulo = tuple(page.rect)
+    if len(page.get_text("text").strip()) < minimo_caracteres:
+        return DecisaoPagina(page.number, MODO_OCR, [retangulo])
+
+    area_pagina = page.rect.width * page.rect.height
+    regioes = []
+    for info in page.get_image_info(xrefs=True):
+        x0, y0, x1, y1 = info["bbox"]
+        if (x1 - x0) * (y1 - y0) >= area_minima * area_pagina:
+            regioes.append(tuple(info["bbox"]))
+
+    return DecisaoPagina(page.number, MODO_MISTO if regioes else MODO_TEXTO, regioes)
+
+
+def _sobrepoe(a: Caixa, b: Caixa) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+# ============================================================================
+# OCR
+# ============================================================================
+
+def ocr_tesseract(imagem: Image.Image, lang: Optional[str] = "por"
+                  ) -> List[Tuple[str, int, int, int, int]]:
+    """OCR padrão: chaves na imagem reduzida + Tesseract só nos recortes"""
+    from ocr_regioes import encontrar_regioes_candidatas, ocr_tesseract_regioes
+
+    dados = ocr_tesseract_regioes(imagem, encontrar_regioes_candidatas(imagem), lang=lang)
+    return [
+        (texto, dados["left"][i], dados["top"][i], dados["width"][i], dados["height"][i])
+        for i, texto in enumerate(dados["text"])
+        if PADRAO_PLACEHOLDER.search(str(texto))
+    ]
+
+
+def _imagem_da_regiao(doc, page, regiao: Caixa, dpi: int) -> Tuple[Image.Image, Caixa]:
+    """
+    Pixels de uma região para o OCR e a caixa (pt) que eles cobrem
+
+    Imagens embutidas são lidas do próprio XObject (sem o texto por cima,
+    que já veio da camada de texto); página inteira ou imagens inline são
+    renderizadas em `dpi`.
+    """
+    import fitz  # PyMuPDF: importado aqui para os motores PIL não dependerem dele
+
+    if regiao != tuple(page.rect):
+        for info in page.get_image_info(xrefs=True):
+            if tuple(info["bbox"]) == regiao and info.get("xref"):
+                pix = fitz.Pixmap(doc, info["xref"])
+                if pix.alpha:
+                    pix = fitz.Pixmap(pix, 0)
+                if pix.n not in (1, 3):
+                    pix = fitz.Pixmap(fitz.csRGB, pix)
+                modo = "L" if pix.n == 1 else "RGB"
+                return Image.frombytes(modo, (pix.width, pix.height), pix.samples), regiao
+
+    escala = dpi / 72.0
+    pix = page.get_pixmap(matrix=fitz.Matrix(escala, escala), clip=fitz.Rect(regiao),
+                          colorspace=fitz.csGRAY, alpha=False)
+    return Image.frombytes("L", (pix.width, pix.height), pix.samples), regiao
+
+
+# ============================================================================
+# DETECTOR
+# ============================================================================
+
+class DetectorHibrido:
+    """
+    Placeholders de um PDF lendo a camada de texto e fazendo OCR só onde falta
+
+    Resultado e decisões por página ficam no cache de layouts, chaveados pelo
+    hash do PDF: o template é analisado uma vez por versão.
+    """
+
+    def __init__(self, dpi_ocr: int = 300, ocr: Optional[OcrPixels] = None,
+                 nome_ocr: str = "tesseract", cache: Optional[CacheLayout] = None,
+                 usar_cache: bool = True, workers: Optional[int] = None):
+        """
+        Args:
+            dpi_ocr: resolução das páginas escaneadas renderizadas para o OCR
+            ocr: função imagem → [(texto, x, y, w, h)] (padrão: Tesseract em duas etapas)
+            nome_ocr: identifica o OCR na chave do cache
+            cache: cache de layouts (padrão: o compartilhado do processo)
+            usar_cache: False analisa o PDF sempre
+            workers: threads para as regiões de OCR (None = uma por núcleo)
+        """
+        self.dpi_ocr = dpi_ocr
+        self.ocr = ocr or ocr_tesseract
+        self.nome_ocr = nome_ocr
+        self.cache = (cache or obter_cache_layout(motor=f"hibrido-{nome_ocr}")) if usar_cache else None
+        self.workers = workers
+        self.decisoes: List[DecisaoPagina] = []
+
+    def _ocr_regiao(self, pagina: int, imagem: Image.Image, regiao: Caixa
+                    ) -> List[PlaceholderDetectado]:
+        x0, y0, x1, y1 = regiao
+        escala_x = (x1 - x0) / imagem.width
+        escala_y = (y1 - y0) / imagem.height
+
+        encontrados = []
+        for texto, x, y, w, h in self.ocr(imagem):
+            altura_pt = h * escala_y
+            encontrados.append(PlaceholderDetectado(
+                texto=texto,
+                pagina=pagina,
+                bbox=(x0 + x * escala_x, y0 + y * escala_y,
+                      x0 + (x + w) * escala_x, y0 + y * escala_y + altura_pt),
+                tamanho=round(altura_pt * FATOR_ALTURA_FONTE, 1),
+                origem=MODO_OCR,
+            ))
+        return encontrados
+
+    def _analisar(self, doc) -> List[List[PlaceholderDetectado]]:
+        self.decisoes = [decidir_pagina(page) for page in doc]
+        por_pagina = [placeholders_camada_texto(doc[d.pagina]) if d.modo != MODO_OCR else []
+                      for d in self.decisoes]
+
+        # Pixels extraídos em sequência: um fitz.Document não é thread-safe
+        tarefas = [(d.pagina, *_imagem_da_regiao(doc, doc[d.pagina], regiao, self.dpi_ocr))
+                   for d in self.decisoes for regiao in d.regioes_ocr]
+        if tarefas:
+            # Só o OCR nas threads: ele libera o GIL (processo do Tesseract / API C / TensorFlow)
+            with ThreadPoolExecutor(max_workers=workers_paginas(self.workers, len(tarefas))) as executor:
+                resultados = list(executor.map(lambda t: self._ocr_regiao(*t), tarefas))
+            for (pagina, _, _), encontrados in zip(tarefas, resultados):
+                do_texto = [p.bbox for p in por_pagina[pagina] if p.origem == MODO_TEXTO]
+                por_pagina[pagina].extend(
+                    p for p in encontrados if not any(_sobrepoe(p.bbox, b) for b in do_texto))
+
+        for decisao, encontrados in zip(self.decisoes, por_pagina):
+            ocr = f", OCR em {len(decisao.regioes_ocr)} região(ões)" if decisao.regioes_ocr else ""
+            print(f"  📑 Pág {decisao.pagina + 1}: {decisao.modo}{ocr} → {len(encontrados)} placeholder(s)")
+        return por_pagina
+
+    def detectar(self, origem: Origem) -> List[List[PlaceholderDetectado]]:
+        """Placeholders de cada página (lista por página, na ordem do PDF)"""
+        origem = normalizar_origem(origem)  # streams: lidos uma vez (hash e abertura)
+        chave = hash_documento(origem) if self.cache is not None else None
+        if chave is not None:
+            layout = self.cache.obter(chave)
+            if layout is not None:
+                self.decisoes = [DecisaoPagina(d["pagina"], d["modo"], [tuple(r) for r in d["regioes_ocr"]])
+                                 for d in layout["decisoes"]]
+                print(f"  💾 Layout do template em cache ({len(self.decisoes)} página(s))")
+                return [[PlaceholderDetectado(**{**p, "bbox": tuple(p["bbox"])}) for p in pagina]
+                        for pagina in layout["paginas"]]
+
+        with abrir_pdf(origem) as doc:
+            por_pagina = self._analisar(doc)
+
+        if chave is not None:
+            self.cache.salvar(chave, {
+                "decisoes": [asdict(d) for d in self.decisoes],
+                "paginas": [[asdict(p) for p in pagina] for pagina in por_pagina],
+            })
+        return por_pagina
+
+
+def detectar_placeholders(origem: Origem, **opcoes) -> List[List[PlaceholderDetectado]]:
+    """Atalho: DetectorHibrido(**opcoes).detectar(origem)"""
+    return DetectorHibrido(**opcoes).detectar(origem)
@@ -0,0 +1,95 @@
+# entrada_saida_pdf.py
+# Entrada e saída EM MEMÓRIA para todos os motores
+# Template: caminho, bytes ou stream | Resultado: bytes | Persistência: opcional (destino)
+
+import os
+from io import BytesIO
+from typing import Any, BinaryIO, Callable, Union
+
+
+# Template aceito pelos motores: caminho, bytes (bytes/bytearray/memoryview) ou stream
+Origem = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+# Destino do resultado: None (só bytes), caminho, stream gravável ou função(bytes)
+Destino = Union[None, str, os.PathLike, BinaryIO, Callable[[bytes], Any]]
+
+
+def normalizar_origem(origem: Origem) -> Union[str, bytes]:
+    """
+    Caminho (str) ou bytes: streams são lidos UMA vez
+
+    Motores que abrem o template mais de uma vez (extração + geração)
+    normalizam na entrada para não depender da posição do stream.
+    """
+    if isinstance(origem, os.PathLike):
+        return os.fspath(origem)
+    if isinstance(origem, str):
+        return origem
+    if isinstance(origem, (bytes, bytearray, memoryview)):
+        return bytes(origem)
+    if hasattr(origem, "read"):
+        return origem.read()
+    raise TypeError(f"Origem de documento não suportada: {type(origem).__name__}")
+
+
+def como_arquivo(origem: Origem) -> Union[str, BinaryIO]:
+    """Caminho ou BytesIO: formato aceito por PIL, PyPDF2 e img2pdf"""
+    origem = normalizar_origem(origem)
+    return origem if isinstance(origem, str) else BytesIO(origem)
+
+
+def abrir_binario(origem: Origem) -> BinaryIO:
+    """Arquivo binário aberto (caminho) ou BytesIO: usar com `with`"""
+    origem = normalizar_origem(origem)
+    return open(origem, "rb") if isinstance(origem, str) else BytesIO(origem)
+
+
+def descrever_origem(origem: Origem) -> str:
+    """Texto curto para logs (caminho ou tamanho em memória)"""
+    if isinstance(origem, (str, os.PathLike)):
+        return os.fspath(origem)
+    if isinstance(origem, (bytes, bytearray, memoryview)):
+        return f"<{len(origem) / 1024:.1f} KB em memória>"
+    return "<stream>"
+
+
+def abrir_pdf(origem: Origem):
+    """fitz.Document a partir de caminho, bytes ou stream (sem arquivo temporário)"""
+    import fitz  # PyMuPDF: importado aqui para os motores PIL/PyPDF2 não dependerem dele
+
+    origem = normalizar_origem(origem)
+    if isinstance(origem, str):
+        return fitz.open(origem)
+    return fitz.open(stream=origem, filetype="pdf")
+
+
+def abrir_imagem(origem: Origem):
+    """PIL.Image a partir de caminho, bytes ou stream"""
+    from PIL import Image
+
+    return Image.open(como_arquivo(origem))
+
+
+def persistir(dados: bytes, destino: Destino) -> None:
+    """
+    Entrega o resultado ao destino opcional
+
+    - None            → nada (o chamador usa os bytes retornados)
+    - caminho         → grava o arquivo (criando o diretório)
+    - stream gravável → write(dados)
+    - função          → destino(dados) (S3, banco, fila...)
+    """
+    if destino is None:
+        return
+    if isinstance(destino, (str, os.PathLike)):
+        diretorio = os.path.dirname(os.fspath(destino))
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        with open(destino, "wb") as f:
+            f.write(dados)
+    elif hasattr(destino, "write"):
+        destino.write(dados)
+    elif callable(destino):
+        destino(dados)
+    else:
+        raise TypeError(f"Destino não suportado: {type(destino).__name__}")
@@ -6,17 +6,14 @@ Passo a passo real com seu template de contrato
 import logging
 from auto_contract_pdf_generator import AutoContractPDFGenerator
 from typing import Dict, Tuple
-import psycopg2
 from datetime import datetime
 
+from entrada_saida_pdf import Origem, Destino, descrever_origem
+
 # ============================================================================
 # CONFIGURAÇÃO INICIAL
 # ============================================================================
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 # ============================================================================
@@ -96,8 +93,8 @@ DADOS_EXEMPLO_3 = {
 class PdfContractManager:
     """Manager para gerar PDFs com fácil integração"""
     
-    def __init__(self, template_path: str = 'Contrato_Medico-04_procedimentos.jpg'):
-        """Inicializa o gerenciador"""
+    def __init__(self, template_path: Origem = 'Contrato_Medico-04_procedimentos.jpg'):
+        """Inicializa o gerenciador (template: caminho, bytes ou stream)"""
         self.template_path = template_path
         self.generator = None
         self.load_template()
@@ -106,7 +103,7 @@ class PdfContractManager:
         """Carrega o template da imagem"""
         try:
             self.generator = AutoContractPDFGenerator(self.template_path)
-            logger.info(f"✓ Template carregado: {self.template_path}")
+            logger.info(f"✓ Template carregado: {descrever_origem(self.template_path)}")
         except Exception as e:
             logger.error(f"✗ Erro ao carregar template: {e}")
             raise
@@ -114,10 +111,10 @@ class PdfContractManager:
     def gerar_pdf_simples(
         self,
         dados: Dict,
-        output_path: str,
+        output_path: Destino,
         debug: bool = False
     ) -> Tuple[bool, str]:
-        """Gera PDF simples"""
+        """Gera PDF simples (output_path: caminho, stream, função ou None)"""
         try:
             logger.info(f"\n📄 Gerando PDF para: {dados.get('nome_paciente', 'Desconhecido')}")
             
@@ -130,7 +127,8 @@ class PdfContractManager:
             
             tamanho = len(pdf_bytes) / 1024
             logger.info(f"✓ PDF gerado com sucesso! ({tamanho:.2f} KB)")
-            logger.info(f"  Salvo em: {output_path}")
+            if isinstance(output_path, str):
+                logger.info(f"  Salvo em: {output_path}")
             
             return True, f"PDF gerado com sucesso! ({tamanho:.2f} KB)"
         
@@ -143,8 +141,19 @@ class PdfContractManager:
             logger.error(f"✗ {msg}")
             return False, msg
     
-    def gerar_pdf_do_banco(self, contract_id: int) -> Tuple[bool, bytes]:
-        """Gera PDF buscando dados do banco PostgreSQL"""
+    def gerar_pdf_do_banco(
+        self,
+        contract_id: int,
+        output_path: Destino = None
+    ) -> Tuple[bool, bytes]:
+        """
+        Gera PDF buscando dados do banco PostgreSQL
+        
+        O PDF volta em memória; output_path (caminho, stream ou função) é
+        opcional, para quem também quer persistir.
+        """
+        import psycopg2  # driver do banco: só a geração a partir do banco depende dele
+        
         try:
             logger.info(f"\n🔍 Buscando contrato ID: {contract_id}")
             
@@ -205,17 +214,15 @@ class PdfContractManager:
                 'valor': f"R$ {row[13]:,.2f}",
             }
             
-            # Gerar PDF
-            output_path = f'contratos/{contract_id}_contrato.pdf'
-            
-            sucesso, msg = self.gerar_pdf_simples(dados, output_path)
+            # Gerar PDF (bytes direto do gerador, sem gravar e reler)
+            pdf_bytes = self.generator.generate_pdf(
+                data=dados,
+                output_path=output_path,
+                auto_detect=True
+            )
+            logger.info(f"✓ PDF gerado: {len(pdf_bytes)/1024:.2f} KB")
             
-            if sucesso:
-                with open(output_path, 'rb') as f:
-                    pdf_bytes = f.read()
-                return True, pdf_bytes
-            else:
-                return False, b''
+            return True, pdf_bytes
         
         except psycopg2.Error as e:
             logger.error(f"✗ Erro no banco de dados: {e}")
@@ -278,6 +285,10 @@ class PdfContractManager:
 # ============================================================================
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
     
     # EXEMPLO 1: Um único PDF
     print("\n" + "="*80)
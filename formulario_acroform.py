@@ -0,0 +1,335 @@
+# formulario_acroform.py
+# Modo COMPILADO: placeholders viram campos AcroForm UMA vez por template
+# - compilar: cada {placeholder} da camada de texto → campo de texto com o nome dele,
+#   mesma caixa, tamanho e cor; o texto original sai por redação e a fonte do span
+#   fica embutida no template compilado
+# - preencher: só valores nos campos (+ achatamento opcional com a fonte original),
+#   sem busca de texto nem apagamento de glifos a cada contrato
+# - os nomes dos campos são o índice para validar os dados de entrada
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+from ajuste_texto import (MedidorBase14, MedidorFitz, ajustar_texto, caixa_livre,
+                          obstaculos_pagina, FATOR_TAMANHO_MINIMO)
+from atualizacao_incremental import DocumentoIncremental
+from cache_layout import CacheLayout, hash_documento, obter_cache_layout
+from entrada_saida_pdf import Origem, Destino, abrir_pdf, normalizar_origem, persistir
+from indice_fontes import interpretar_nome_fonte, obter_indice
+
+
+PADRAO_PLACEHOLDER = re.compile(r"\{([^{}]+)\}")
+
+# Motor no cache de layouts: índice de campos do template compilado
+MOTOR_CACHE = "acroform"
+
+# Fonte base 14 usada na aparência dos campos nos visualizadores (o
+# AcroForm só aceita Helv/TiRo/Cour/ZaDb); o achatamento usa a do span
+FONTE_APARENCIA = "Helv"
+
+Caixa = Tuple[float, float, float, float]
+
+
+@dataclass
+class CampoCompilado:
+    """Um campo AcroForm do template compilado"""
+    campo: str               # nome do campo (placeholder; "#2", "#3"... nas repetições)
+    placeholder: str         # nome do placeholder, sem chaves
+    pagina: int
+    bbox: Caixa              # caixa do placeholder original (pt)
+    linha_base: float        # y da linha de base do texto original (pt)
+    fonte: str               # fonte do span original
+    fonte_pdf: str           # recurso de fonte embutido na página ("helv" se não indexada)
+    tamanho: float
+    cor: int                 # sRGB inteiro, como em get_text("dict")
+    livre: Tuple[float, float]  # (largura, altura) livres para o valor, pt (caixa_livre)
+
+    @property
+    def cor_rgb(self) -> Tuple[float, float, float]:
+        return tuple(((self.cor >> s) & 255) / 255 for s in (16, 8, 0))
+
+
+def _limpar(nome: str) -> str:
+    return nome.strip().strip("{}").strip()
+
+
+# ============================================================================
+# COMPILAÇÃO
+# ============================================================================
+
+def _placeholders_da_pagina(page) -> List[Tuple[str, Caixa, float, dict]]:
+    """(nome, caixa exata, linha de base, span) de cada {placeholder} da página"""
+    import fitz  # PyMuPDF: importado aqui para o índice e a validação não dependerem dele
+
+    encontrados = []
+    # TEXTFLAGS_TEXT: sem decodificar as imagens da página (só o texto importa)
+    for bloco in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+        for linha in bloco.get("lines", []):
+            for span in linha["spans"]:
+                vistos: Dict[str, int] = {}
+                for match in PADRAO_PLACEHOLDER.finditer(span["text"]):
+                    # Caixa só do placeholder (o span pode ter texto antes ou depois)
+                    ocorrencia = vistos.get(match.group(0), 0)
+                    vistos[match.group(0)] = ocorrencia + 1
+                    caixas = page.search_for(match.group(0), clip=fitz.Rect(span["bbox"]))
+                    caixa = caixas[ocorrencia] if ocorrencia < len(caixas) else fitz.Rect(span["bbox"])
+                    encontrados.append((_limpar(match.group(1)), tuple(caixa),
+                                        span["origin"][1], span))
+    return encontrados
+
+
+def _embutir_fonte(page, nome_fonte: str, fonts_dir: Optional[str],
+                   aliases: Dict[str, str]) -> str:
+    """Fonte do span (face do índice) inserida na página; devolve o nome do recurso"""
+    familia, peso, italico = interpretar_nome_fonte(nome_fonte)
+    indice = obter_indice(fonts_dir)
+    face = indice.resolver(familia, peso, italico)
+    if face is None:
+        return "helv"
+
+    alias = aliases.setdefault(face.caminho, f"PH{len(aliases) + 1}")
+    page.insert_font(fontname=alias, fontbuffer=indice.dados_fonte(face.caminho))
+    return alias
+
+
+def compilar_pdf(origem: Origem, fonts_dir: Optional[str] = None) -> Tuple[bytes, List[CampoCompilado]]:
+    """
+    Template → (PDF com campos AcroForm, índice dos campos)
+
+    Os glifos dos placeholders são removidos por redação (só texto: imagens
+    e vetores do fundo ficam) e cada um vira um campo de texto na mesma caixa.
+    """
+    import fitz  # PyMuPDF
+
+    campos: List[CampoCompilado] = []
+    repeticoes: Dict[str, int] = {}
+    aliases: Dict[str, str] = {}
+
+    with abrir_pdf(origem) as doc:
+        for page in doc:
+            encontrados = _placeholders_da_pagina(page)
+            if not encontrados:
+                continue
+            # Vizinhos lidos antes da redação (o texto em volta dos placeholders fica)
+            obstaculos = obstaculos_pagina(page)
+
+            for _, caixa, _, _ in encontrados:
+                page.add_redact_annot(fitz.Rect(caixa), fill=False)
+            page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE,
+                                  graphics=fitz.PDF_REDACT_LINE_ART_NONE)
+
+            for nome, caixa, linha_base, span in encontrados:
+                repeticoes[nome] = repeticoes.get(nome, 0) + 1
+                campo = CampoCompilado(
+                    campo=nome if repeticoes[nome] == 1 else f"{nome}#{repeticoes[nome]}",
+                    placeholder=nome,
+                    pagina=page.number,
+                    bbox=caixa,
+                    linha_base=linha_base,
+                    fonte=span.get("font", "Arial"),
+                    fonte_pdf=_embutir_fonte(page, span.get("font", "Arial"), fonts_dir, aliases),
+                    tamanho=span.get("size", 12),
+                    cor=span.get("color", 0),
+                    livre=caixa_livre(caixa, (page.rect.width, page.rect.height), obstaculos),
+                )
+
+                widget = fitz.Widget()
+                widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+                widget.field_name = campo.campo
+                widget.rect = fitz.Rect(caixa)
+                widget.text_font = FONTE_APARENCIA
+                widget.text_fontsize = campo.tamanho
+                widget.text_color = campo.cor_rgb
+                widget.border_width = 0
+                page.add_widget(widget)
+
+                campos.append(campo)
+                print(f"  ✓ Pág {page.number+1}: {{{nome}}} → campo '{campo.campo}' "
+                      f"({campo.fonte}, {campo.tamanho:.1f}pt)")
+
+        dados = doc.tobytes(garbage=4, deflate=True)
+
+    return dados, campos
+
+
+# ============================================================================
+# TEMPLATE COMPILADO
+# ============================================================================
+
+class TemplateCompilado:
+    """PDF com os campos AcroForm + índice (nome do campo → placeholder, fonte, caixa)"""
+
+    def __init__(self, dados: bytes, campos: List[CampoCompilado], fonts_dir: Optional[str] = None):
+        self.dados = dados
+        self.campos = campos
+        self.fonts_dir = fonts_dir
+
+    @property
+    def placeholders(self) -> List[str]:
+        """Nomes dos placeholders do template (índice para validação)"""
+        return sorted({c.placeholder for c in self.campos})
+
+    def validar(self, valores: Dict[str, str]) -> Tuple[bool, List[str], List[str]]:
+        """(válido, faltando, extras) dos dados de entrada contra os campos"""
+        fornecidos = {_limpar(k) for k in valores}
+        esperados = set(self.placeholders)
+        faltando = sorted(esperados - fornecidos)
+        return not faltando, faltando, sorted(fornecidos - esperados)
+
+    def _medidor(self, campo: CampoCompilado):
+        if campo.fonte_pdf == "helv":
+            return MedidorBase14()
+        return MedidorFitz.do_span(campo.fonte, self.fonts_dir)
+
+    def preencher(self, valores: Dict[str, str], destino: Destino = None,
+                  achatar: bool = True, incremental: bool = False) -> bytes:
+        """
+        Preenche os campos; retorna os bytes do PDF
+
+        Args:
+            valores: {placeholder: valor} (com ou sem chaves)
+            destino: caminho, stream ou função que recebe os bytes (opcional)
+            achatar: True desenha os valores no conteúdo da página com a fonte
+                     original (valores longos reduzidos até caber) e remove os
+                     campos; False só define os valores (formulário editável)
+            incremental: grava como atualização incremental do template
+                         compilado (ver atualizacao_incremental)
+        """
+        valores = {_limpar(k): str(v) for k, v in valores.items()}
+        edicao = DocumentoIncremental(self.dados) if incremental else None
+        try:
+            doc = edicao.doc if edicao else abrir_pdf(self.dados)
+
+            for page_num in sorted({c.pagina for c in self.campos}):
+                page = doc[page_num]
+                widgets = {w.field_name: w for w in page.widgets()}
+
+                for campo in (c for c in self.campos if c.pagina == page_num):
+                    widget = widgets.get(campo.campo)
+                    valor = valores.get(campo.placeholder)
+                    if widget is None:
+                        continue
+
+                    if not achatar:
+                        if valor is not None:
+                            widget.field_value = valor
+                            widget.update()
+                        continue
+
+                    page.delete_widget(widget)
+                    if valor is None:
+                        continue
+                    largura_livre, altura_livre = campo.livre
+                    ajuste = ajustar_texto(
+                        valor, self._medidor(campo), largura_livre, campo.tamanho,
+                        tamanho_min=campo.tamanho * FATOR_TAMANHO_MINIMO,
+                        altura_max=altura_livre, max_linhas=None)
+                    for i, linha in enumerate(ajuste.linhas):
+                        page.insert_text((campo.bbox[0], campo.linha_base + i * ajuste.altura_linha),
+                                         linha, fontname=campo.fonte_pdf, fontsize=ajuste.tamanho,
+                                         color=campo.cor_rgb)
+
+            if edicao:
+                dados = edicao.finalizar()
+            else:
+                dados = doc.tobytes(garbage=1, deflate=True)
+                doc.close()
+        finally:
+            if edicao:
+                edicao.fechar()
+
+        persistir(dados, destino)
+        return dados
+
+
+# ============================================================================
+# CACHE DE TEMPLATES COMPILADOS
+# ============================================================================
+
+def _caminho_pdf(cache: CacheLayout, chave: str) -> str:
+    return os.path.join(cache.diretorio, f"{cache.chave(chave)}.pdf")
+
+
+def _gravar_pdf(caminho: str, dados: bytes) -> None:
+    """Gravação atômica, como os JSON do cache de layouts"""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix=".tmp")
+    try:
+        with os.fdopen(descritor, "wb") as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+_compilados: Dict[str, TemplateCompilado] = {}
+_trava_compilados = threading.Lock()
+
+
+def chave_compilacao(hash_template: str, fonts_dir: Optional[str] = None) -> str:
+    """Template + diretório de fontes: as fontes embutidas dependem dos dois"""
+    fontes = os.path.abspath(fonts_dir) if fonts_dir else ""
+    return hashlib.sha256(f"{hash_template}\0{fontes}".encode()).hexdigest()
+
+
+def compilar_template(origem: Origem, fonts_dir: Optional[str] = None,
+                      cache: Optional[CacheLayout] = None,
+                      usar_cache: bool = True) -> TemplateCompilado:
+    """
+    Template compilado, gerado uma vez por versão do template
+
+    O PDF compilado fica no diretório do cache de layouts, ao lado do JSON
+    com o índice dos campos, e em memória no processo. Chave: hash dos bytes
+    do template + diretório de fontes (ver chave_compilacao); template
+    alterado no disco = hash novo (hash_documento relê o arquivo quando o
+    mtime ou o tamanho mudam).
+    """
+    origem = normalizar_origem(origem)
+    cache = (cache or obter_cache_layout(motor=MOTOR_CACHE)) if usar_cache else None
+    chave = chave_compilacao(hash_documento(origem), fonts_dir) if cache is not None else None
+
+    if cache is not None:
+        with _trava_compilados:
+            compilado = _compilados.get(_caminho_pdf(cache, chave))
+        if compilado is not None:
+            return compilado
+
+        layout = cache.obter(chave)
+        if layout is not None:
+            try:
+                with open(_caminho_pdf(cache, chave), "rb") as f:
+                    dados = f.read()
+                campos = [CampoCompilado(**{**c, "bbox": tuple(c["bbox"]),
+                                                    "livre": tuple(c["livre"])}) for c in layout["campos"]]
+                print(f"  💾 Template compilado em cache ({len(campos)} campo(s))")
+                compilado = TemplateCompilado(dados, campos, fonts_dir)
+                with _trava_compilados:
+                    _compilados[_caminho_pdf(cache, chave)] = compilado
+                return compilado
+            except OSError:
+                pass  # PDF compilado ausente: compila de novo
+
+    print("🧩 Compilando template: placeholders → campos AcroForm")
+    dados, campos = compilar_pdf(origem, fonts_dir)
+    print(f"✅ {len(campos)} campo(s) criado(s)\n")
+
+    compilado = TemplateCompilado(dados, campos, fonts_dir)
+    if cache is not None:
+        _gravar_pdf(_caminho_pdf(cache, chave), dados)
+        cache.salvar(chave, {"campos": [asdict(c) for c in campos]})
+        with _trava_compilados:
+            _compilados[_caminho_pdf(cache, chave)] = compilado
+    return compilado
+
+
+def preencher_template(origem: Origem, valores: Dict[str, str], destino: Destino = None,
+                       achatar: bool = True, **opcoes) -> bytes:
+    """Atalho: compilar_template(origem, **opcoes).preencher(valores, destino, achatar)"""
+    return compilar_template(origem, **opcoes).preencher(valores, destino, achatar)
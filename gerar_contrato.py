@@ -1,7 +1,8 @@
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
+from PIL import Image, ImageDraw
 import os
 
+from ajuste_texto import MedidorPIL, ajustar_texto, largura_texto, FATOR_TAMANHO_MINIMO
+
 def gerar_contrato(dados, caminho_template, caminho_saida):
     # 1. Carregar a imagem base
     try:
@@ -12,18 +13,10 @@ def gerar_contrato(dados, caminho_template, caminho_saida):
         print(f"Erro: Arquivo {caminho_template} não encontrado.")
         return
 
-    # 2. Configuração de Fontes (Tente usar uma fonte TTF do sistema para ficar bonito)
-    # Se não tiver 'arial.ttf', substitua pelo caminho de uma fonte como Montserrat ou Roboto
-    try:
-        font_padrao = "arial.ttf" 
-        # Função auxiliar para carregar fonte com tamanho específico
-        def get_font(tamanho):
-            return ImageFont.truetype(font_padrao, size=tamanho)
-    except OSError:
-        # Fallback se não encontrar a fonte
-        print("Aviso: Fonte Arial não encontrada, usando padrão.")
-        def get_font(tamanho):
-            return ImageFont.load_default()
+    # 2. Configuração de Fontes: índice compartilhado (Arial do sistema ou a família
+    # padrão de ./fonts); o medidor também calcula larguras reais para o ajuste
+    def get_medidor(config):
+        return MedidorPIL("Arial", 700 if config.get('bold') else 400)
 
     # Cores (baseadas na imagem)
     cor_texto_escuro = (50, 50, 50)   # Cinza escuro/Preto
@@ -56,36 +49,42 @@ def gerar_contrato(dados, caminho_template, caminho_saida):
         'enderecopaciente2':{'pos':(330, 590), 'tamanho': 16, 'cor': cor_texto_escuro}, # Ícone pin
 
         # Procedimento 4 (Caixa Roxa Inferior Direita)
-        'procedimento_4':           {'pos': (530, 860), 'tamanho': 20, 'cor': cor_texto_branco, 'center': True, 'width': 400},
-        'procedimento_4_descricao': {'pos': (530, 940), 'tamanho': 14, 'cor': cor_texto_branco, 'center': True, 'width': 400},
+        # 'width'/'height': caixa do texto (reduz, quebra e, no limite, reticências)
+        'procedimento_4':           {'pos': (530, 860), 'tamanho': 20, 'cor': cor_texto_branco, 'center': True, 'width': 400, 'height': 50},
+        'procedimento_4_descricao': {'pos': (530, 940), 'tamanho': 14, 'cor': cor_texto_branco, 'center': True, 'width': 400, 'height': 60},
     }
 
     # 4. Iterar e desenhar textos
     for chave, config in mapa_campos.items():
         if chave in dados:
             texto = dados[chave]
-            fonte = get_font(config['tamanho'])
+            medidor = get_medidor(config)
             pos_x, pos_y = config['pos']
             cor = config['cor']
 
             # Verifica se precisa centralizar ou quebrar texto (wrap)
             if config.get('center'):
-                # Simples lógica de centralização baseada numa largura de caixa
                 largura_caixa = config.get('width', 300)
                 
-                # Quebrar texto se for longo
-                linhas = textwrap.wrap(texto, width=40) # Ajuste width conforme o tamanho da fonte
+                # Ajuste pela largura REAL do texto na fonte: quebra nas linhas
+                # que cabem na altura, reduz se preciso e, no limite, reticências
+                ajuste = ajustar_texto(
+                    texto, medidor, largura_caixa, config['tamanho'],
+                    tamanho_min=int(config['tamanho'] * FATOR_TAMANHO_MINIMO),
+                    altura_max=config.get('height'), max_linhas=None,
+                )
+                fonte = medidor.fonte(ajuste.tamanho)
                 
                 offset_y = 0
-                for linha in linhas:
-                    # Calcular largura da linha para centralizar
-                    bbox = draw.textbbox((0, 0), linha, font=fonte)
-                    largura_texto = bbox[2] - bbox[0]
-                    novo_x = pos_x + (largura_caixa - largura_texto) / 2
+                for linha in ajuste.linhas:
+                    # Centralizar pela largura medida (LRU compartilhado)
+                    largura_linha = largura_texto(linha, medidor, ajuste.tamanho)
+                    novo_x = pos_x + (largura_caixa - largura_linha) / 2
                     
                     draw.text((novo_x, pos_y + offset_y), linha, font=fonte, fill=cor)
-                    offset_y += config['tamanho'] + 5
+                    offset_y += ajuste.altura_linha
             else:
+                fonte = medidor.fonte(config['tamanho'])
                 draw.text((pos_x, pos_y), texto, font=fonte, fill=cor)
 
     # 5. Inserir Imagem do Procedimento (Overlay)
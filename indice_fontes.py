@@ -0,0 +1,370 @@
+# indice_fontes.py
+# Índice de fontes ÚNICO por processo: `fonts/` (e `fonts/static/`) lidos uma vez
+# Família, peso e estilo vêm das tabelas `name`, `OS/2` e `fvar` do próprio arquivo
+# (família, peso, itálico, tamanho) → ImageFont / fitz.Font em LRU compartilhado
+# Fontes variáveis: um arquivo por estilo, qualquer peso derivado pelo eixo `wght`
+
+import os
+import re
+import struct
+import threading
+from dataclasses import dataclass
+from io import BytesIO
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+# Diretório padrão: `fonts/` ao lado deste módulo (independe do cwd)
+DIRETORIO_FONTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+
+# Família usada quando o template pede uma fonte que não está no índice
+FAMILIA_PADRAO = "Plus Jakarta Sans"
+
+# Fontes do sistema indexadas como alternativa (antes sondadas a cada placeholder)
+FONTES_SISTEMA = [
+    "arial.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/System/Library/Fonts/Arial.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+# Objetos carregados mantidos no LRU (instâncias por família/peso/estilo/tamanho)
+TAMANHO_CACHE = 256
+
+# Nome de estilo → peso (usWeightClass); os mais específicos primeiro
+# ("SemiBold" e "ExtraBold" também contêm "Bold")
+PESOS_POR_NOME = [
+    ("extralight", 200), ("ultralight", 200),
+    ("semibold", 600), ("demibold", 600),
+    ("extrabold", 800), ("ultrabold", 800),
+    ("thin", 100), ("hairline", 100),
+    ("light", 300),
+    ("regular", 400), ("normal", 400), ("book", 400),
+    ("medium", 500),
+    ("bold", 700),
+    ("black", 900), ("heavy", 900),
+]
+
+_EXTENSOES = (".ttf", ".otf")
+
+
+@dataclass(frozen=True)
+class FaceFonte:
+    """Um arquivo de fonte indexado"""
+    caminho: str
+    familia: str
+    peso: int
+    italico: bool
+    # Fonte variável: (tag, mínimo, padrão, máximo) de cada eixo, na ordem do `fvar`
+    eixos: Tuple[Tuple[str, float, float, float], ...] = ()
+
+    @property
+    def variavel(self) -> bool:
+        return bool(self.eixos)
+
+    def valores_eixos(self, peso: int) -> List[float]:
+        """Coordenadas da instância: `wght` = peso (limitado ao eixo), demais no padrão"""
+        return [min(maximo, max(minimo, float(peso))) if tag == "wght" else padrao
+                for tag, minimo, padrao, maximo in self.eixos]
+
+
+# ============================================================================
+# LEITURA DAS TABELAS SFNT (sem dependências: só o cabeçalho é lido)
+# ============================================================================
+
+def _tabelas_sfnt(dados: bytes) -> Dict[bytes, Tuple[int, int]]:
+    """tag → (offset, tamanho) do diretório de tabelas"""
+    num_tabelas = struct.unpack_from(">H", dados, 4)[0]
+    tabelas = {}
+    for i in range(num_tabelas):
+        tag, _, offset, tamanho = struct.unpack_from(">4sIII", dados, 12 + 16 * i)
+        tabelas[tag] = (offset, tamanho)
+    return tabelas
+
+
+def _nomes(dados: bytes, offset: int) -> Dict[int, str]:
+    """nameID → texto (plataforma Windows/Unicode preferida à Mac)"""
+    _, quantidade, inicio_textos = struct.unpack_from(">HHH", dados, offset)
+    nomes: Dict[int, str] = {}
+    for i in range(quantidade):
+        plataforma, _, _, name_id, tamanho, pos = struct.unpack_from(
+            ">6H", dados, offset + 6 + 12 * i)
+        if name_id not in (1, 2, 16, 17):
+            continue
+        bruto = dados[offset + inicio_textos + pos:offset + inicio_textos + pos + tamanho]
+        if plataforma in (0, 3):
+            nomes[name_id] = bruto.decode("utf-16-be", errors="ignore")
+        elif plataforma == 1 and name_id not in nomes:
+            nomes[name_id] = bruto.decode("mac_roman", errors="ignore")
+    return nomes
+
+
+def _eixos(dados: bytes, offset: int) -> Tuple[Tuple[str, float, float, float], ...]:
+    """Eixos de variação da tabela `fvar` (valores Fixed 16.16)"""
+    _, _, inicio_eixos, _, quantidade, tamanho = struct.unpack_from(">6H", dados, offset)
+    eixos = []
+    for i in range(quantidade):
+        tag, minimo, padrao, maximo = struct.unpack_from(
+            ">4siii", dados, offset + inicio_eixos + i * tamanho)
+        eixos.append((tag.decode("latin-1"), minimo / 65536, padrao / 65536, maximo / 65536))
+    return tuple(eixos)
+
+
+def ler_face(caminho: str) -> Optional[FaceFonte]:
+    """Família, peso e estilo de um TTF/OTF (None se não for uma fonte legível)"""
+    try:
+        with open(caminho, "rb") as f:
+            cabecalho = f.read(12)
+            num_tabelas = struct.unpack_from(">H", cabecalho, 4)[0]
+            f.seek(0)
+            # Diretório + tabelas name/OS/2/fvar: lê o arquivo até o fim da última delas
+            diretorio = f.read(12 + 16 * num_tabelas)
+            tabelas = _tabelas_sfnt(diretorio)
+            if b"name" not in tabelas:
+                return None
+            fim = max(offset + tamanho for tag, (offset, tamanho) in tabelas.items()
+                      if tag in (b"name", b"OS/2", b"fvar"))
+            f.seek(0)
+            dados = f.read(fim)
+    except (OSError, struct.error):
+        return None
+
+    try:
+        nomes = _nomes(dados, tabelas[b"name"][0])
+        peso, italico = 400, False
+        if b"OS/2" in tabelas:
+            os2 = tabelas[b"OS/2"][0]
+            peso = struct.unpack_from(">H", dados, os2 + 4)[0]
+            italico = bool(struct.unpack_from(">H", dados, os2 + 62)[0] & 1)
+        eixos = _eixos(dados, tabelas[b"fvar"][0]) if b"fvar" in tabelas else ()
+    except struct.error:
+        return None
+
+    # Nome tipográfico (16/17) quando existe: "Plus Jakarta Sans" / "SemiBold"
+    familia = nomes.get(16) or nomes.get(1)
+    if not familia:
+        return None
+    estilo = (nomes.get(17) or nomes.get(2) or "").lower()
+    italico = italico or "italic" in estilo or "oblique" in estilo
+
+    return FaceFonte(caminho=caminho, familia=familia, peso=peso,
+                     italico=italico, eixos=eixos)
+
+
+# ============================================================================
+# NOMES DE FONTE DO PDF
+# ============================================================================
+
+def chave_familia(familia: str) -> str:
+    """Forma normalizada para comparação ("Plus Jakarta Sans" == "PlusJakartaSans")"""
+    return re.sub(r"[^a-z0-9]", "", familia.lower())
+
+
+def peso_do_estilo(estilo: str, padrao: int = 400) -> int:
+    """Peso a partir de um nome de estilo ("SemiBold", "BoldItalicMT"...)"""
+    estilo = estilo.lower()
+    for nome, peso in PESOS_POR_NOME:
+        if nome in estilo:
+            return peso
+    return padrao
+
+
+def interpretar_nome_fonte(nome_fonte: str) -> Tuple[str, int, bool]:
+    """
+    (família, peso, itálico) do nome de fonte de um span do PDF
+
+    "ABCDEF+PlusJakartaSans-SemiBold" → ("PlusJakartaSans", 600, False)
+    "Arial,BoldItalic"                → ("Arial", 700, True)
+    """
+    nome = nome_fonte.split("+", 1)[-1]
+    partes = re.split(r"[-,]", nome, maxsplit=1)
+    familia = partes[0]
+    estilo = partes[1] if len(partes) > 1 else ""
+    if not estilo:
+        # Sem separador: estilo colado ao nome ("ArialBold")
+        for chave, _ in PESOS_POR_NOME:
+            posicao = familia.lower().find(chave)
+            if posicao > 0:
+                familia, estilo = familia[:posicao], familia[posicao:]
+                break
+    italico = any(s in nome.lower() for s in ("italic", "oblique"))
+    return familia, peso_do_estilo(estilo), italico
+
+
+# ============================================================================
+# ÍNDICE
+# ============================================================================
+
+class FontIndex:
+    """
+    Índice de fontes construído UMA vez
+
+    Varre os diretórios (recursivo: inclui `fonts/static/`) e as fontes do
+    sistema, lendo família/peso/estilo de cada arquivo. As consultas
+    (família, peso, itálico, tamanho) resolvem a face mais próxima e devolvem
+    objetos carregados de um LRU compartilhado por todos os motores.
+
+    Quando a família tem fonte variável no estilo pedido, o ImageFont é uma
+    instância dela no peso exato (inclusive pesos sem arquivo estático). Os
+    bytes de cada arquivo são lidos uma vez e compartilhados pelas instâncias:
+    nenhum arquivo fica aberto e a memória é limitada pelo LRU.
+    """
+
+    def __init__(self, diretorios: Tuple[str, ...] = (DIRETORIO_FONTES,),
+                 fontes_sistema: Tuple[str, ...] = tuple(FONTES_SISTEMA),
+                 familia_padrao: str = FAMILIA_PADRAO,
+                 tamanho_cache: int = TAMANHO_CACHE,
+                 usar_variaveis: bool = True):
+        self.familia_padrao = familia_padrao
+        self.usar_variaveis = usar_variaveis
+        self.faces: Dict[str, List[FaceFonte]] = {}
+
+        for diretorio in diretorios:
+            self._indexar_diretorio(diretorio)
+        for caminho in fontes_sistema:
+            if os.path.isfile(caminho):
+                self._adicionar(caminho)
+
+        # Resolução e carregamento memorizados (thread-safe no CPython)
+        self.resolver = lru_cache(maxsize=1024)(self._resolver)
+        self.resolver_variavel = lru_cache(maxsize=1024)(self._resolver_variavel)
+        self.dados_fonte = lru_cache(maxsize=None)(self._ler_dados)
+        self.fonte_pil = lru_cache(maxsize=tamanho_cache)(self._carregar_pil)
+        self.fonte_fitz = lru_cache(maxsize=tamanho_cache)(self._carregar_fitz)
+
+    def _indexar_diretorio(self, diretorio: str) -> None:
+        if not os.path.isdir(diretorio):
+            return
+        # Ordenado: `fonts/X.ttf` vem antes de `fonts/static/X.ttf` (primeiro vence)
+        for raiz, subdirs, arquivos in os.walk(diretorio):
+            subdirs.sort()
+            for arquivo in sorted(arquivos):
+                if arquivo.lower().endswith(_EXTENSOES):
+                    self._adicionar(os.path.join(raiz, arquivo))
+
+    def _adicionar(self, caminho: str) -> None:
+        face = ler_face(caminho)
+        if face is None:
+            return
+        faces = self.faces.setdefault(chave_familia(face.familia), [])
+        repetida = any(f.peso == face.peso and f.italico == face.italico
+                       and f.variavel == face.variavel for f in faces)
+        if not repetida:
+            faces.append(face)
+
+    @property
+    def familias(self) -> List[str]:
+        return sorted({faces[0].familia for faces in self.faces.values()})
+
+    def _faces_da_familia(self, familia: str) -> List[FaceFonte]:
+        """Faces da família pedida ou, se ela não estiver indexada, da padrão"""
+        return (self.faces.get(chave_familia(familia))
+                or self.faces.get(chave_familia(self.familia_padrao))
+                or [])
+
+    def _resolver(self, familia: str, peso: int = 400,
+                  italico: bool = False) -> Optional[FaceFonte]:
+        """Face ESTÁTICA indexada mais próxima (família pedida → família padrão)"""
+        faces = self._faces_da_familia(familia)
+        if not faces:
+            return None
+        estaticas = [f for f in faces if not f.variavel] or faces
+
+        def distancia(face: FaceFonte) -> Tuple[int, int, int]:
+            # Estilo certo primeiro; depois peso mais próximo, preferindo o mais pesado
+            # em caso de empate (como na regra de correspondência do CSS acima de 500)
+            return (face.italico != italico, abs(face.peso - peso), -face.peso)
+
+        return min(estaticas, key=distancia)
+
+    def _resolver_variavel(self, familia: str, italico: bool = False) -> Optional[FaceFonte]:
+        """Fonte variável com eixo `wght` da família no estilo pedido (ou None)"""
+        for face in self._faces_da_familia(familia):
+            if (face.italico == italico
+                    and any(tag == "wght" for tag, *_ in face.eixos)):
+                return face
+        return None
+
+    def _ler_dados(self, caminho: str) -> bytes:
+        """Conteúdo do arquivo, lido uma vez por processo"""
+        with open(caminho, "rb") as f:
+            return f.read()
+
+    def _carregar_pil(self, familia: str, peso: int = 400,
+                      italico: bool = False, tamanho: int = 12):
+        """ImageFont no peso pedido (fonte padrão do PIL se nada for encontrado)"""
+        from PIL import ImageFont
+
+        if self.usar_variaveis:
+            variavel = self.resolver_variavel(familia, italico)
+            if variavel is not None:
+                try:
+                    # BytesIO sobre os bytes compartilhados: o PIL não copia nem
+                    # mantém arquivo aberto; a instância recebe o peso pelo eixo
+                    fonte = ImageFont.truetype(BytesIO(self.dados_fonte(variavel.caminho)),
+                                               tamanho)
+                    fonte.set_variation_by_axes(variavel.valores_eixos(peso))
+                    return fonte
+                except (OSError, AttributeError):
+                    # FreeType sem suporte a variações: cai para os estáticos
+                    pass
+
+        face = self.resolver(familia, peso, italico)
+        if face is not None:
+            try:
+                return ImageFont.truetype(BytesIO(self.dados_fonte(face.caminho)), tamanho)
+            except OSError:
+                pass
+        return ImageFont.load_default()
+
+    def _carregar_fitz(self, familia: str, peso: int = 400, italico: bool = False):
+        """
+        fitz.Font da face resolvida (Helvetica embutida se nada for encontrado)
+
+        O MuPDF não instancia eixos de variação: aqui vale sempre a face
+        estática mais próxima.
+        """
+        import fitz  # PyMuPDF: importado aqui para os motores PIL não dependerem dele
+
+        face = self.resolver(familia, peso, italico)
+        if face is not None:
+            return fitz.Font(fontbuffer=self.dados_fonte(face.caminho))
+        return fitz.Font("helv")
+
+    def fonte_para_span(self, nome_fonte: str, tamanho: int):
+        """ImageFont para o nome de fonte de um span do PDF"""
+        familia, peso, italico = interpretar_nome_fonte(nome_fonte)
+        return self.fonte_pil(familia, peso, italico, tamanho)
+
+    def limpar_cache(self) -> None:
+        self.resolver.cache_clear()
+        self.resolver_variavel.cache_clear()
+        self.fonte_pil.cache_clear()
+        self.fonte_fitz.cache_clear()
+        self.dados_fonte.cache_clear()
+
+
+# ============================================================================
+# ÍNDICE DO PROCESSO
+# ============================================================================
+
+_indices: Dict[str, FontIndex] = {}
+_trava = threading.Lock()
+
+
+def obter_indice(fonts_dir: Optional[str] = None) -> FontIndex:
+    """
+    Índice compartilhado do processo para `fonts_dir` (padrão: DIRETORIO_FONTES)
+
+    Construído na primeira chamada; chamadas seguintes (qualquer motor,
+    qualquer requisição) reutilizam o mesmo índice e o mesmo LRU.
+    """
+    diretorio = os.path.abspath(fonts_dir or DIRETORIO_FONTES)
+    indice = _indices.get(diretorio)
+    if indice is None:
+        with _trava:
+            indice = _indices.get(diretorio)
+            if indice is None:
+                indice = FontIndex(diretorios=(diretorio,))
+                _indices[diretorio] = indice
+    return indice
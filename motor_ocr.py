@@ -0,0 +1,161 @@
+# motor_ocr.py
+# Motor de OCR (Tesseract) com a mesma saída de `pytesseract.image_to_data(Output.DICT)`
+# - tesserocr: handle da API C do Tesseract VIVO por thread (idioma carregado uma vez,
+#   pixels entregues crus: sem processo novo nem PNG por chamada)
+# - pytesseract: subprocesso por chamada (alternativa quando o tesserocr não existe)
+# Escolha: MOTOR_OCR=tesserocr|pytesseract (padrão: tesserocr se instalado)
+
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+VARIAVEL_MOTOR = "MOTOR_OCR"
+
+# Resolução informada ao Tesseract quando a imagem não traz DPI
+RESOLUCAO_PADRAO = 300
+
+# Colunas do TSV do Tesseract (e chaves do Output.DICT do pytesseract)
+CAMPOS_TSV = ["level", "page_num", "block_num", "par_num", "line_num", "word_num",
+              "left", "top", "width", "height", "conf", "text"]
+
+_CAMPOS_INTEIROS = set(CAMPOS_TSV[:10])
+
+
+def para_cinza(imagem) -> np.ndarray:
+    """PIL.Image ou array (RGB/cinza) → array uint8 contíguo em cinza"""
+    if hasattr(imagem, "convert"):
+        return np.ascontiguousarray(np.asarray(imagem.convert("L")))
+    pixels = np.asarray(imagem)
+    if pixels.ndim == 3:
+        pixels = pixels[:, :, :3] @ np.array([0.299, 0.587, 0.114])
+    return np.ascontiguousarray(pixels.astype(np.uint8))
+
+
+def ler_tsv(tsv: str) -> Dict[str, list]:
+    """TSV do Tesseract → dicionário de listas (formato do pytesseract)"""
+    dados: Dict[str, list] = {campo: [] for campo in CAMPOS_TSV}
+    for linha in tsv.splitlines():
+        colunas = linha.split("\t")
+        if len(colunas) < len(CAMPOS_TSV) - 1 or colunas[0] == "level":
+            continue
+        colunas += [""] * (len(CAMPOS_TSV) - len(colunas))
+        for campo, valor in zip(CAMPOS_TSV, colunas):
+            if campo in _CAMPOS_INTEIROS:
+                dados[campo].append(int(valor))
+            elif campo == "conf":
+                dados[campo].append(float(valor))
+            else:
+                dados[campo].append(valor)
+    return dados
+
+
+class MotorTesserocr:
+    """
+    Um `PyTessBaseAPI` por (thread, idioma, psm), reaproveitado entre chamadas
+
+    O handle não é thread-safe: cada thread (e cada processo do pool) cria o
+    seu na primeira chamada e o mantém até `fechar()`.
+    """
+
+    nome = "tesserocr"
+
+    def __init__(self):
+        import tesserocr  # API C do Tesseract: importada só quando escolhida
+
+        self._tesserocr = tesserocr
+        self._local = threading.local()
+        self._handles: List[object] = []
+        self._trava = threading.Lock()
+
+    def _handle(self, lang: Optional[str], psm: Optional[int]):
+        handles = getattr(self._local, "handles", None)
+        if handles is None:
+            handles = self._local.handles = {}
+        chave = (lang or "eng", psm)
+        if chave not in handles:
+            opcoes = {"lang": chave[0]}
+            if psm is not None:
+                opcoes["psm"] = psm
+            handles[chave] = self._tesserocr.PyTessBaseAPI(**opcoes)
+            with self._trava:
+                self._handles.append(handles[chave])
+        return handles[chave]
+
+    def image_to_data(self, imagem, lang: Optional[str] = None,
+                      psm: Optional[int] = None) -> Dict[str, list]:
+        cinza = para_cinza(imagem)
+        altura, largura = cinza.shape
+        api = self._handle(lang, psm)
+        api.SetImageBytes(cinza.tobytes(), largura, altura, 1, largura)
+        api.SetSourceResolution(RESOLUCAO_PADRAO)
+        api.Recognize()
+        return ler_tsv(api.GetTSVText(0))
+
+    def fechar(self) -> None:
+        with self._trava:
+            for handle in self._handles:
+                handle.End()
+            self._handles.clear()
+        self._local = threading.local()
+
+
+class MotorPytesseract:
+    """Um processo `tesseract` por chamada (comportamento anterior)"""
+
+    nome = "pytesseract"
+
+    def __init__(self):
+        import pytesseract  # importado aqui: o motor tesserocr não depende dele
+
+        self._pytesseract = pytesseract
+
+    def image_to_data(self, imagem, lang: Optional[str] = None,
+                      psm: Optional[int] = None) -> Dict[str, list]:
+        opcoes = {"lang": lang} if lang else {}
+        if psm is not None:
+            opcoes["config"] = f"--psm {psm}"
+        return self._pytesseract.image_to_data(
+            imagem, output_type=self._pytesseract.Output.DICT, **opcoes)
+
+    def fechar(self) -> None:
+        pass
+
+
+MOTORES = {"tesserocr": MotorTesserocr, "pytesseract": MotorPytesseract}
+
+_motor = None
+_trava_motor = threading.Lock()
+
+
+def obter_motor_ocr(preferido: Optional[str] = None):
+    """
+    Motor do processo: o pedido (ou MOTOR_OCR), senão tesserocr, senão pytesseract
+
+    ImportError só quando nenhum dos dois está instalado.
+    """
+    global _motor
+    with _trava_motor:
+        if _motor is not None and preferido in (None, _motor.nome):
+            return _motor
+
+        preferido = preferido or os.environ.get(VARIAVEL_MOTOR)
+        ordem = [preferido] if preferido else ["tesserocr", "pytesseract"]
+        if "pytesseract" not in ordem:
+            ordem.append("pytesseract")
+
+        erro = None
+        for nome in ordem:
+            try:
+                _motor = MOTORES[nome]()
+                return _motor
+            except ImportError as e:
+                erro = e
+        raise ImportError(f"Nenhum motor de OCR disponível (tesserocr/pytesseract): {erro}")
+
+
+def image_to_data(imagem, lang: Optional[str] = None, psm: Optional[int] = None) -> Dict[str, list]:
+    """Atalho: `image_to_data` do motor do processo"""
+    return obter_motor_ocr().image_to_data(imagem, lang=lang, psm=psm)
@@ -0,0 +1,307 @@
+# ocr_regioes.py
+# OCR em DUAS ETAPAS para placeholders {xxx}
+# 1. Página reduzida em cinza: componentes conexos + correlação com o glifo da chave
+#    → pares "{" … "}" na mesma linha viram regiões candidatas
+# 2. OCR em resolução TOTAL só nos recortes (coordenadas devolvidas na página)
+# O custo do OCR passa a acompanhar o número de placeholders, não a área da página
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from indice_fontes import FAMILIA_PADRAO, obter_indice
+from motor_ocr import obter_motor_ocr, para_cinza
+
+
+# Altura da página na etapa de busca (≈ 200 DPI em A4): chaves de 7 pt ainda
+# têm ~20 px e não encostam nas letras vizinhas
+ALTURA_REDUZIDA = 2400
+
+# Correlação mínima de um componente com o glifo "{" ou "}"
+LIMIAR_CORRELACAO = 0.55
+
+# Tamanho (largura, altura) em que componente e glifo são comparados
+TAMANHO_MODELO = (12, 24)
+
+# Fontes usadas para desenhar os modelos das chaves
+FAMILIAS_MODELO = ("Arial", FAMILIA_PADRAO)
+
+# Maior distância entre "{" e "}", relativa à largura da página
+LARGURA_MAX_PLACEHOLDER = 0.6
+
+# Limiar local (janela em px da página reduzida, contraste mínimo em níveis de cinza):
+# texto escuro no fundo claro e texto claro em faixas escuras do template
+JANELA_LIMIAR = 31
+CONTRASTE_MINIMO = 15
+
+# Espaço branco entre recortes no mosaico enviado ao Tesseract (px)
+ESPACO_MOSAICO = 24
+
+Caixa = Tuple[int, int, int, int]  # x0, y0, x1, y1
+
+
+@dataclass(frozen=True)
+class RegiaoCandidata:
+    """Par de chaves na resolução total: da borda esquerda de "{" à direita de "}" """
+    x: int
+    y: int
+    largura: int
+    altura: int
+
+    def recorte(self, largura_pagina: int, altura_pagina: int,
+                margem: Optional[int] = None) -> Caixa:
+        """Caixa com margem (padrão: metade da altura) limitada à página"""
+        margem = self.altura // 2 if margem is None else margem
+        return (max(0, self.x - margem), max(0, self.y - margem),
+                min(largura_pagina, self.x + self.largura + margem),
+                min(altura_pagina, self.y + self.altura + margem))
+
+
+# ============================================================================
+# ETAPA 1: CHAVES NA PÁGINA REDUZIDA
+# ============================================================================
+
+def _normalizar(mascara: np.ndarray) -> Optional[np.ndarray]:
+    """Máscara binária → TAMANHO_MODELO, média zero e norma um (None se constante)"""
+    amostra = np.asarray(
+        Image.fromarray(mascara.astype(np.uint8) * 255).resize(TAMANHO_MODELO, Image.BILINEAR),
+        dtype=np.float32)
+    amostra -= amostra.mean()
+    norma = np.linalg.norm(amostra)
+    return amostra / norma if norma > 0 else None
+
+
+@lru_cache(maxsize=1)
+def _modelos_chaves() -> Dict[str, List[np.ndarray]]:
+    """Glifos "{" e "}" desenhados com as fontes do índice, já normalizados"""
+    modelos: Dict[str, List[np.ndarray]] = {"{": [], "}": []}
+    for familia in FAMILIAS_MODELO:
+        fonte = obter_indice().fonte_pil(familia, 400, False, 96)
+        for chave in modelos:
+            img = Image.new("L", (160, 160), 0)
+            ImageDraw.Draw(img).text((30, 10), chave, fill=255, font=fonte)
+            caixa = img.getbbox()
+            if caixa is None:
+                continue
+            modelo = _normalizar(np.asarray(img.crop(caixa)) > 127)
+            if modelo is not None:
+                modelos[chave].append(modelo)
+    return modelos
+
+
+def _classificar(mascara: np.ndarray, limiar: float) -> Optional[str]:
+    """'{', '}' ou None pela maior correlação com os modelos"""
+    amostra = _normalizar(mascara)
+    if amostra is None:
+        return None
+    melhor, escolhida = limiar, None
+    for chave, modelos in _modelos_chaves().items():
+        for modelo in modelos:
+            correlacao = float((amostra * modelo).sum())
+            if correlacao > melhor:
+                melhor, escolhida = correlacao, chave
+    return escolhida
+
+
+def encontrar_chaves(cinza: np.ndarray, altura_reduzida: int = ALTURA_REDUZIDA,
+                     limiar: float = LIMIAR_CORRELACAO) -> List[Tuple[str, Caixa]]:
+    """
+    Chaves da página: [(tipo, (x0, y0, x1, y1))] na resolução TOTAL
+
+    Só componentes com formato de chave (altos, estreitos e vazados) chegam à
+    correlação; o resto do texto é descartado pelas estatísticas do componente.
+    As duas polaridades são analisadas (limiar local): tinta escura e tinta clara.
+    """
+    import cv2  # OpenCV: importado aqui (ver benchmark_importacao)
+
+    escala = min(1.0, altura_reduzida / cinza.shape[0])
+    reduzida = cinza if escala == 1.0 else cv2.resize(
+        cinza, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+
+    altura_max = reduzida.shape[0] * 0.05
+    chaves = []
+    for polaridade, contraste in ((cv2.THRESH_BINARY_INV, CONTRASTE_MINIMO),
+                                  (cv2.THRESH_BINARY, -CONTRASTE_MINIMO)):
+        tinta = cv2.adaptiveThreshold(reduzida, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                      polaridade, JANELA_LIMIAR, contraste)
+        total, rotulos, estatisticas, _ = cv2.connectedComponentsWithStats(tinta, connectivity=8)
+
+        for i in range(1, total):
+            x, y, w, h, area = estatisticas[i]
+            if h < 6 or h > altura_max or h < 1.6 * w or area > 0.6 * w * h:
+                continue
+            tipo = _classificar(rotulos[y:y + h, x:x + w] == i, limiar)
+            if tipo is not None:
+                chaves.append((tipo, (int(x / escala), int(y / escala),
+                                      int(np.ceil((x + w) / escala)),
+                                      int(np.ceil((y + h) / escala)))))
+    return chaves
+
+
+def encontrar_regioes_candidatas(imagem, altura_reduzida: int = ALTURA_REDUZIDA,
+                                 limiar: float = LIMIAR_CORRELACAO) -> List[RegiaoCandidata]:
+    """
+    Pares "{" … "}" na mesma linha, em ordem de leitura
+
+    Cada "}" fica com a "{" mais à esquerda na mesma linha sem outra "}" entre
+    as duas: placeholders vizinhos não se misturam e um falso "{" no meio do
+    nome (letra parecida) não rouba o par.
+    """
+    cinza = para_cinza(imagem)
+    chaves = encontrar_chaves(cinza, altura_reduzida, limiar)
+    abertas = sorted((c for t, c in chaves if t == "{"), key=lambda c: c[0])
+    fechadas = sorted((c for t, c in chaves if t == "}"), key=lambda c: c[0])
+    distancia_max = cinza.shape[1] * LARGURA_MAX_PLACEHOLDER
+
+    def mesma_linha(a: Caixa, b: Caixa) -> bool:
+        altura = max(a[3] - a[1], b[3] - b[1])
+        return abs((a[1] + a[3]) - (b[1] + b[3])) / 2 < altura / 2
+
+    regioes = []
+    usadas = set()
+    for fecha in fechadas:
+        anterior = max((c[2] for c in fechadas
+                        if c[2] <= fecha[0] and mesma_linha(c, fecha)), default=-1)
+        opcoes = [j for j, a in enumerate(abertas)
+                  if j not in usadas and anterior <= a[0] and a[2] <= fecha[0]
+                  and fecha[0] - a[2] <= distancia_max and mesma_linha(a, fecha)]
+        if not opcoes:
+            continue
+        abre = abertas[opcoes[0]]  # ordenadas por x: a mais à esquerda
+        usadas.update(opcoes)
+        y0, y1 = min(abre[1], fecha[1]), max(abre[3], fecha[3])
+        regioes.append(RegiaoCandidata(abre[0], y0, fecha[2] - abre[0], y1 - y0))
+
+    return sorted(regioes, key=lambda r: (r.y, r.x))
+
+
+# ============================================================================
+# ETAPA 2: OCR NOS RECORTES (RESOLUÇÃO TOTAL)
+# ============================================================================
+
+def agrupar_recortes(regioes: Sequence[RegiaoCandidata], largura: int, altura: int,
+                     margem: Optional[int] = None) -> List[Caixa]:
+    """
+    Recortes das regiões; os que se sobrepõem viram um só (placeholders vizinhos)
+
+    Um grupo que cresce pode passar a sobrepor um grupo anterior: as passadas
+    se repetem até nenhum par se sobrepor (um recorte nunca entra duas vezes
+    no mosaico).
+    """
+    grupos = [list(c) for c in sorted(r.recorte(largura, altura, margem) for r in regioes)]
+    mesclou = True
+    while mesclou:
+        mesclou = False
+        restantes: List[List[int]] = []
+        for caixa in grupos:
+            for grupo in restantes:
+                if caixa[0] < grupo[2] and grupo[0] < caixa[2] and caixa[1] < grupo[3] and grupo[1] < caixa[3]:
+                    grupo[:] = [min(grupo[0], caixa[0]), min(grupo[1], caixa[1]),
+                                max(grupo[2], caixa[2]), max(grupo[3], caixa[3])]
+                    mesclou = True
+                    break
+            else:
+                restantes.append(caixa)
+        grupos = restantes
+    return [tuple(g) for g in grupos]
+
+
+def montar_mosaico(cinza: np.ndarray, recortes: Sequence[Caixa],
+                   espaco: int = ESPACO_MOSAICO) -> Tuple[np.ndarray, List[int]]:
+    """
+    Recortes empilhados em uma única imagem (fundo branco); retorna o topo de cada um
+
+    Recortes de fundo escuro são invertidos: todo o mosaico fica com texto
+    escuro sobre claro, como o Tesseract espera.
+    """
+    largura = max(x1 - x0 for x0, _, x1, _ in recortes) + 2 * espaco
+    altura = sum(y1 - y0 for _, y0, _, y1 in recortes) + espaco * (len(recortes) + 1)
+    mosaico = np.full((altura, largura), 255, dtype=np.uint8)
+
+    topos = []
+    y = espaco
+    for x0, y0, x1, y1 in recortes:
+        recorte = cinza[y0:y1, x0:x1]
+        if np.median(recorte) < 128:
+            recorte = 255 - recorte
+        mosaico[y:y + y1 - y0, espaco:espaco + x1 - x0] = recorte
+        topos.append(y)
+        y += y1 - y0 + espaco
+    return mosaico, topos
+
+
+def ocr_tesseract_regioes(imagem, regioes: Sequence[RegiaoCandidata],
+                          lang: Optional[str] = None,
+                          espaco: int = ESPACO_MOSAICO) -> Dict[str, list]:
+    """
+    `image_to_data` (formato Output.DICT do pytesseract) só dos recortes das regiões
+
+    Os recortes vão em UM mosaico (uma chamada ao Tesseract, uma linha por
+    recorte) e as caixas das palavras voltam às coordenadas da página.
+    Tesseract pelo motor do processo (ver motor_ocr).
+    """
+    cinza = para_cinza(imagem)
+    campos = ("text", "left", "top", "width", "height", "conf")
+    dados: Dict[str, list] = {campo: [] for campo in campos}
+    if not regioes:
+        return dados
+
+    recortes = agrupar_recortes(regioes, cinza.shape[1], cinza.shape[0])
+    mosaico, topos = montar_mosaico(cinza, recortes, espaco)
+
+    bruto = obter_motor_ocr().image_to_data(mosaico, lang=lang, psm=6)
+
+    for i, texto in enumerate(bruto["text"]):
+        if not str(texto).strip():
+            continue
+        centro = bruto["top"][i] + bruto["height"][i] / 2
+        for (x0, y0, _, y1), topo in zip(recortes, topos):
+            if topo <= centro < topo + (y1 - y0):
+                break
+        else:
+            continue
+        dados["text"].append(texto)
+        dados["left"].append(bruto["left"][i] - espaco + x0)
+        dados["top"].append(bruto["top"][i] - topo + y0)
+        dados["width"].append(bruto["width"][i])
+        dados["height"].append(bruto["height"][i])
+        dados["conf"].append(bruto["conf"][i])
+    return dados
+
+
+def reconhecer_keras_paginas(pipeline, imagens: Sequence,
+                             regioes_por_pagina: Sequence[Sequence[RegiaoCandidata]]
+                             ) -> List[List[Tuple[RegiaoCandidata, List[str]]]]:
+    """
+    keras-ocr em UM lote com os recortes de todas as páginas
+
+    Retorna, por página, [(região, palavras da esquerda p/ direita)].
+    O reconhecedor do keras-ocr não tem "{", "}" nem "_" no alfabeto: as chaves
+    já vêm da etapa 1 e o nome do placeholder é montado pelo chamador.
+    """
+    recortes = []
+    for imagem, regioes in zip(imagens, regioes_por_pagina):
+        pixels = np.asarray(imagem.convert("RGB") if isinstance(imagem, Image.Image) else imagem)
+        altura, largura = pixels.shape[:2]
+        for regiao in regioes:
+            x0, y0, x1, y1 = regiao.recorte(largura, altura)
+            recortes.append(pixels[y0:y1, x0:x1])
+
+    predicoes = iter(pipeline.recognize(recortes) if recortes else [])
+    resultado = []
+    for regioes in regioes_por_pagina:
+        pagina = []
+        for regiao in regioes:
+            ordenadas = sorted(next(predicoes), key=lambda p: float(np.min(p[1][:, 0])))
+            pagina.append((regiao, [texto for texto, _ in ordenadas]))
+        resultado.append(pagina)
+    return resultado
+
+
+def reconhecer_keras_regioes(pipeline, imagem, regioes: Sequence[RegiaoCandidata]
+                             ) -> List[Tuple[RegiaoCandidata, List[str]]]:
+    """keras-ocr em lote só nos recortes de uma página (ver reconhecer_keras_paginas)"""
+    return reconhecer_keras_paginas(pipeline, [imagem], [regioes])[0]
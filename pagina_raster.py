@@ -0,0 +1,444 @@
+# pagina_raster.py
+# Buffer ÚNICO por página para os pipelines raster (PyMuPDF → NumPy → PyMuPDF)
+# Sem cópias intermediárias: Pixmap, OpenCV e o encoder enxergam a mesma memória
+# (o PIL só em cinza: imagens PIL RGB são cópias, ver como_imagem_pil)
+# Perfis de cor: RGB, cinza (1/3 da memória) e 1 bit (codificado em CCITT G4)
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image, ImageDraw
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from entrada_saida_pdf import Origem, abrir_pdf
+from compositor_texto import compor_texto
+
+# OpenCV (~100 ms para importar) é carregado só nas funções que o usam
+
+
+# Perfis de cor aceitos pelos motores raster
+PERFIL_RGB = "rgb"
+PERFIL_CINZA = "cinza"
+PERFIL_1BIT = "1bit"
+PERFIS_COR = (PERFIL_RGB, PERFIL_CINZA, PERFIL_1BIT)
+
+# Limiar de binarização do perfil 1 bit (0-255)
+LIMIAR_1BIT = 128
+
+# DPI adaptativo: pixels por em exigidos para a menor fonte da página
+# (27 px/em → 14pt a 150 DPI, 10pt a 200 DPI, 8pt a 300 DPI)
+PIXELS_POR_EM = 27
+PASSOS_DPI = (100, 150, 200, 240, 300, 400, 600)
+DPI_MINIMO = 100
+DPI_MAX_IMAGENS = 200
+TAMANHO_MINIMO_TEXTO = 4.0  # ignora texto invisível/decorativo menor que isso
+
+
+class _AmostrasPixmap:
+    """
+    Amostras de um Pixmap expostas ao NumPy por ponteiro
+
+    O array criado a partir deste objeto o guarda como `base`, e ele guarda o
+    Pixmap: enquanto houver um array (ou fatia) sobre as amostras, o Pixmap
+    não é liberado, mesmo que o PaginaRaster já tenha sido descartado.
+    """
+
+    def __init__(self, pixmap: fitz.Pixmap, forma: tuple, passos: tuple):
+        self.pixmap = pixmap
+        self.__array_interface__ = {
+            "version": 3,
+            "shape": forma,
+            "strides": passos,
+            "typestr": "|u1",
+            "data": (pixmap.samples_ptr, False),
+        }
+
+
+class PaginaRaster:
+    """
+    Página renderizada com um único buffer compartilhado
+
+    `pixels` é uma view NumPy sobre as amostras do próprio Pixmap:
+    (altura, largura, 3) no perfil RGB e (altura, largura) nos perfis cinza
+    e 1 bit. Inpainting e inserção de texto alteram o Pixmap no lugar, e o
+    mesmo Pixmap é entregue ao PDF final (zero cópias de página inteira).
+    O array mantém o Pixmap vivo: pode ser usado sozinho, depois que a
+    página for descartada (ver _AmostrasPixmap).
+
+    O perfil 1 bit é processado em cinza e binarizado apenas na codificação.
+    """
+
+    def __init__(self, pixmap: fitz.Pixmap, page_num: int = 0, dpi: int = 300,
+                 perfil: str = PERFIL_RGB):
+        self.pixmap = pixmap
+        self.page_num = page_num
+        self.dpi = dpi
+        self.perfil = perfil
+        self.compartilhado = True
+
+        if pixmap.n == 1:
+            forma, passos = (pixmap.height, pixmap.width), (pixmap.stride, 1)
+        else:
+            forma = (pixmap.height, pixmap.width, pixmap.n)
+            passos = (pixmap.stride, pixmap.n, 1)
+
+        try:
+            self._buffer = pixmap.samples_mv
+            self.pixels = np.asarray(_AmostrasPixmap(pixmap, forma, passos))
+        except (AttributeError, TypeError, ValueError):
+            # PyMuPDF sem samples_mv gravável: UMA cópia, reaproveitada até o fim
+            self._buffer = bytearray(pixmap.samples)
+            self.pixels = np.ndarray(forma, dtype=np.uint8,
+                                     buffer=self._buffer, strides=passos)
+            self.compartilhado = False
+
+    @property
+    def largura(self) -> int:
+        return self.pixmap.width
+
+    @property
+    def altura(self) -> int:
+        return self.pixmap.height
+
+    @property
+    def colorido(self) -> bool:
+        return self.pixmap.n == 3
+
+    @property
+    def tamanho_pt(self) -> Tuple[float, float]:
+        """Tamanho da página em pontos PDF (independente do DPI usado)"""
+        return self.largura * 72.0 / self.dpi, self.altura * 72.0 / self.dpi
+
+    def para_pixmap(self) -> fitz.Pixmap:
+        """Pixmap com o conteúdo atual (o próprio Pixmap quando compartilhado)"""
+        if self.compartilhado:
+            return self.pixmap
+        espaco = fitz.csRGB if self.colorido else fitz.csGRAY
+        return fitz.Pixmap(espaco, self.largura, self.altura,
+                           self._buffer, False)
+
+    def copia(self) -> "PaginaRaster":
+        """Página independente (Pixmap novo): o original não é alterado pelas edições"""
+        espaco = fitz.csRGB if self.colorido else fitz.csGRAY
+        nova = PaginaRaster(fitz.Pixmap(espaco, fitz.IRect(0, 0, self.largura, self.altura), False),
+                            self.page_num, self.dpi, self.perfil)
+        nova.pixels[...] = self.pixels
+        return nova
+
+    def como_imagem_pil(self) -> Image.Image:
+        """
+        Imagem PIL com o conteúdo atual da página
+
+        Cinza: somente leitura, sobre o mesmo buffer (sem cópia; a imagem
+        mantém o Pixmap vivo). RGB: uma cópia, porque o PIL guarda RGB com
+        4 bytes por pixel e não consegue apontar para o buffer de 3 bytes.
+        """
+        return Image.fromarray(self.pixels)
+
+    def mascara_1bit(self) -> np.ndarray:
+        """Página binarizada (True = branco) para os codificadores de 1 bit"""
+        return self.pixels >= LIMIAR_1BIT
+
+
+ImagemRaster = Union[str, np.ndarray, PaginaRaster]
+
+
+def detectar_perfil_cor(page: fitz.Page, dpi_amostra: int = 36,
+                        tolerancia_croma: int = 12,
+                        max_meios_tons: float = 0.02) -> str:
+    """
+    Escolhe o perfil de cor de uma página a partir de uma miniatura
+
+    - algum pixel com croma acima da tolerância → RGB
+    - só tons de cinza, quase todos perto de preto ou branco → 1 bit
+    - demais casos → cinza
+
+    A miniatura (36 DPI por padrão) custa ~1/70 da renderização a 300 DPI.
+    """
+    escala = dpi_amostra / 72.0
+    pix = page.get_pixmap(matrix=fitz.Matrix(escala, escala), alpha=False)
+    amostra = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
+        pix.height, pix.stride)[:, :pix.width * pix.n].reshape(
+        pix.height, pix.width, pix.n).astype(np.int16)
+
+    croma = amostra.max(axis=2) - amostra.min(axis=2)
+    if croma.max() > tolerancia_croma:
+        return PERFIL_RGB
+
+    cinza = amostra[:, :, 0]
+    meios_tons = np.count_nonzero((cinza > 48) & (cinza < 208)) / cinza.size
+    return PERFIL_1BIT if meios_tons <= max_meios_tons else PERFIL_CINZA
+
+
+def spans_texto(page: fitz.Page) -> List[dict]:
+    """
+    Spans da camada de texto da página
+
+    TEXTFLAGS_TEXT: os blocos de imagem não são decodificados (o padrão do
+    modo "dict" decodifica cada imagem embutida: ~0,7 s por página com
+    fundo fotográfico, contra ~2 ms só com o texto).
+    """
+    return [
+        span
+        for bloco in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]
+        for linha in bloco.get("lines", [])
+        for span in linha["spans"]
+    ]
+
+
+def menor_fonte_pagina(page: fitz.Page,
+                       tamanho_minimo: float = TAMANHO_MINIMO_TEXTO,
+                       spans: Optional[List[dict]] = None) -> Optional[float]:
+    """Menor tamanho de fonte (pt) do texto vetorial da página, ou None"""
+    tamanhos = [
+        span["size"]
+        for span in (spans_texto(page) if spans is None else spans)
+        if span["text"].strip() and span["size"] >= tamanho_minimo
+    ]
+    return min(tamanhos) if tamanhos else None
+
+
+def dpi_imagens_pagina(page: fitz.Page, area_minima: float = 0.05) -> float:
+    """
+    Maior resolução efetiva das imagens relevantes da página (0 se não houver)
+
+    Imagens com menos de `area_minima` da página (ícones, logos) são ignoradas.
+    """
+    area_pagina = page.rect.width * page.rect.height
+    maior = 0.0
+
+    for info in page.get_image_info():
+        x0, y0, x1, y1 = info["bbox"]
+        largura_pt, altura_pt = x1 - x0, y1 - y0
+        if largura_pt <= 0 or largura_pt * altura_pt < area_minima * area_pagina:
+            continue
+        maior = max(maior, info["width"] * 72.0 / largura_pt)
+
+    return maior
+
+
+def escolher_dpi(page: fitz.Page, tamanhos_placeholders: Iterable[float] = (),
+                 dpi_max: int = 300, dpi_min: int = DPI_MINIMO,
+                 pixels_por_em: float = PIXELS_POR_EM,
+                 spans: Optional[List[dict]] = None) -> int:
+    """
+    Escolhe o DPI de renderização de UMA página
+
+    O DPI garante `pixels_por_em` pixels para a menor fonte relevante
+    (placeholders e texto vetorial da página) e não fica abaixo da resolução
+    das imagens de fundo (limitada a DPI_MAX_IMAGENS). O resultado é
+    arredondado para cima em PASSOS_DPI e nunca passa de `dpi_max`, o DPI
+    pedido pelo chamador. Ex.: menor texto de 14pt → 150 DPI.
+
+    Páginas sem texto vetorial (escaneadas) ficam com `dpi_max`. `spans`:
+    os de spans_texto, quando o chamador já os extraiu.
+    """
+    return calcular_dpi(tamanhos_placeholders, menor_fonte_pagina(page, spans=spans),
+                        dpi_imagens_pagina(page), dpi_max, dpi_min, pixels_por_em)
+
+
+def calcular_dpi(tamanhos_placeholders: Iterable[float], menor_texto: Optional[float],
+                 dpi_imagens: float, dpi_max: int = 300,
+                 dpi_min: int = DPI_MINIMO, pixels_por_em: float = PIXELS_POR_EM) -> int:
+    """
+    Regra de escolher_dpi sem abrir a página
+
+    `menor_texto` e `dpi_imagens`: os de menor_fonte_pagina e
+    dpi_imagens_pagina (ex.: guardados pela análise do template).
+    """
+    tamanhos = [t for t in tamanhos_placeholders if t]
+    if menor_texto:
+        tamanhos.append(menor_texto)
+
+    if not tamanhos:
+        return int(dpi_max)
+
+    dpi = pixels_por_em * 72.0 / min(tamanhos)
+    dpi = max(dpi, min(dpi_imagens, DPI_MAX_IMAGENS))
+
+    for passo in PASSOS_DPI:
+        if passo >= dpi:
+            dpi = passo
+            break
+
+    return int(min(dpi_max, max(dpi_min, dpi)))
+
+
+def dpi_por_pagina(origem: Origem, dpi_max: int = 300) -> List[int]:
+    """
+    DPI escolhido para cada página de um PDF a partir da camada de texto
+
+    Usado pelos processadores OCR antes da rasterização: os placeholders
+    presentes no texto vetorial entram no cálculo; páginas escaneadas
+    (sem texto) ficam com `dpi_max`. `origem`: caminho, bytes ou stream.
+    """
+    dpis = []
+    with abrir_pdf(origem) as doc:
+        for page in doc:
+            spans = spans_texto(page)
+            tamanhos = [span["size"] for span in spans if "{" in span["text"]]
+            dpis.append(escolher_dpi(page, tamanhos, dpi_max, spans=spans))
+    return dpis
+
+
+def renderizar_pagina(page: fitz.Page, dpi: int = 300,
+                      perfil: str = PERFIL_RGB) -> PaginaRaster:
+    """
+    Renderiza uma página do PDF direto para um PaginaRaster
+
+    perfil: "rgb", "cinza", "1bit" ou "auto" (detectar_perfil_cor)
+    """
+    if perfil == "auto":
+        perfil = detectar_perfil_cor(page)
+    if perfil not in PERFIS_COR:
+        raise ValueError(f"Perfil de cor inválido: {perfil}")
+
+    espaco = fitz.csRGB if perfil == PERFIL_RGB else fitz.csGRAY
+    dpi_scale = dpi / 72.0
+    mat = fitz.Matrix(dpi_scale, dpi_scale)
+    pix = page.get_pixmap(matrix=mat, colorspace=espaco, alpha=False)
+    return PaginaRaster(pix, page.number, dpi, perfil)
+
+
+def iterar_paginas(origem: Origem, dpis: Union[int, Sequence[int]] = 300,
+                   perfil: str = PERFIL_RGB) -> Iterator[PaginaRaster]:
+    """
+    Renderiza as páginas UMA POR VEZ, na ordem do PDF
+
+    Cada página só é renderizada quando o consumidor pede a próxima: quem
+    processa e descarta a página antes de avançar mantém uma página em
+    memória, qualquer que seja o tamanho do documento. `dpis`: um DPI para
+    todas as páginas ou um por página. `origem`: caminho, bytes ou stream.
+    """
+    with abrir_pdf(origem) as doc:
+        for page in doc:
+            dpi = dpis if isinstance(dpis, int) else dpis[page.number]
+            yield renderizar_pagina(page, dpi, perfil)
+
+
+def obter_pixels(imagem_input: ImagemRaster) -> np.ndarray:
+    """
+    Normaliza a entrada dos estágios do pipeline para um array de pixels
+
+    - PaginaRaster → view sobre o Pixmap (alterações vão direto para o PDF)
+    - np.ndarray   → o próprio array (alterado no lugar)
+    - str          → imagem lida do disco e convertida de BGR para RGB
+    """
+    if isinstance(imagem_input, PaginaRaster):
+        return imagem_input.pixels
+    if isinstance(imagem_input, str):
+        import cv2
+        return cv2.cvtColor(cv2.imread(imagem_input), cv2.COLOR_BGR2RGB)
+    return imagem_input
+
+
+def dpi_da_imagem(imagem_input: ImagemRaster, dpi: int) -> int:
+    """DPI efetivo de um estágio: o da própria página quando é um PaginaRaster"""
+    if isinstance(imagem_input, PaginaRaster):
+        return imagem_input.dpi
+    return dpi
+
+
+def para_pixmap(imagem: Union[np.ndarray, PaginaRaster]) -> fitz.Pixmap:
+    """Pixmap para inserir no PDF (sem cópia quando vem de um PaginaRaster)"""
+    if isinstance(imagem, PaginaRaster):
+        return imagem.para_pixmap()
+    altura, largura = imagem.shape[:2]
+    espaco = fitz.csGRAY if imagem.ndim == 2 else fitz.csRGB
+    return fitz.Pixmap(espaco, largura, altura,
+                       np.ascontiguousarray(imagem).tobytes(), False)
+
+
+def cor_media_rgb(regiao: np.ndarray) -> Tuple[int, int, int]:
+    """Cor média de uma região em RGB (regiões em cinza viram (v, v, v))"""
+    if regiao.size == 0:
+        return (0, 0, 0)
+    if regiao.ndim == 2:
+        valor = int(regiao.mean())
+        return (valor, valor, valor)
+    return tuple(int(c) for c in regiao.reshape(-1, regiao.shape[-1]).mean(axis=0)[:3])
+
+
+def luminancia_media(regiao: np.ndarray) -> float:
+    """Brilho médio (0-255) pela luminância relativa Y = 0.299R + 0.587G + 0.114B"""
+    if regiao.ndim == 2:
+        return float(regiao.mean())
+    r, g, b = (regiao[..., i] for i in range(3))
+    return float(np.mean(0.299 * r + 0.587 * g + 0.114 * b))
+
+
+def inpaint_regioes(pixels: np.ndarray,
+                    retangulos: Iterable[Tuple[int, int, int, int]],
+                    raio: int = 3) -> np.ndarray:
+    """
+    Inpainting Telea NO LUGAR, apenas em volta de cada retângulo
+
+    Cada região é recortada com uma borda de contexto, reconstruída e
+    copiada de volta ao buffer; o resto da página nunca é copiado.
+    """
+    import cv2
+
+    altura, largura = pixels.shape[:2]
+    borda = raio * 3
+
+    for x0, y0, x1, y1 in retangulos:
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(largura, x1), min(altura, y1)
+        if x1 <= x0 or y1 <= y0:
+            continue
+
+        rx0, ry0 = max(0, x0 - borda), max(0, y0 - borda)
+        rx1, ry1 = min(largura, x1 + borda), min(altura, y1 + borda)
+
+        roi = pixels[ry0:ry1, rx0:rx1]
+        mask = np.zeros(roi.shape[:2], dtype=np.uint8)
+        mask[y0 - ry0:y1 - ry0, x0 - rx0:x1 - rx0] = 255
+
+        roi[...] = cv2.inpaint(np.ascontiguousarray(roi), mask, raio, cv2.INPAINT_TELEA)
+
+    return pixels
+
+
+def desenhar_texto(pixels: np.ndarray, posicao: Tuple[int, int], texto: str,
+                   fonte, cor) -> None:
+    """
+    Desenha texto NO LUGAR no buffer da página
+
+    Caminho normal: glifos do atlas compartilhado, misturados de uma vez
+    (ver compositor_texto). Fontes/textos que o atlas não cobre vão pelo PIL,
+    copiando apenas o retângulo ocupado pelo texto: PIL não desenha sobre
+    memória externa, então só essa região passa por uma Image temporária.
+    """
+    if not texto:
+        return
+
+    if compor_texto(pixels, posicao, texto, fonte, cor):
+        return
+
+    altura, largura = pixels.shape[:2]
+    x, y = posicao
+    esq, topo, dir, base = fonte.getbbox(texto)
+
+    x0, y0 = max(0, int(x + esq)), max(0, int(y + topo))
+    x1, y1 = min(largura, int(x + dir) + 1), min(altura, int(y + base) + 1)
+
+    if x1 <= x0 or y1 <= y0:
+        return
+
+    if pixels.ndim == 2 and isinstance(cor, tuple):
+        # Composição no espaço da página: cor RGB → luminância
+        cor = int(round(0.299 * cor[0] + 0.587 * cor[1] + 0.114 * cor[2]))
+
+    roi = pixels[y0:y1, x0:x1]
+    img_roi = Image.fromarray(np.ascontiguousarray(roi))
+    ImageDraw.Draw(img_roi).text((x - x0, y - y0), texto, fill=cor, font=fonte)
+    roi[...] = np.asarray(img_roi)
+
+
+def salvar_png(caminho: str, pixels: np.ndarray) -> None:
+    """Salva o buffer como PNG (OpenCV grava em BGR; cinza vai direto)"""
+    import cv2
+
+    if pixels.ndim == 2:
+        cv2.imwrite(caminho, pixels)
+    else:
+        cv2.imwrite(caminho, cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR))
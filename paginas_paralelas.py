@@ -0,0 +1,176 @@
+# paginas_paralelas.py
+# Páginas de UM documento editadas em processos paralelos (pipelines v2)
+# - cada worker abre o PDF uma vez, renderiza e edita as páginas que recebe
+# - os pixels voltam por multiprocessing.shared_memory (o array não passa por pickle)
+# - o processo principal entrega as páginas prontas NA ORDEM do PDF, com no
+#   máximo PAGINAS_POR_WORKER × workers páginas em voo (memória limitada)
+
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from analise_template import AnaliseTemplate, analisar_template
+from entrada_saida_pdf import Origem, abrir_pdf, normalizar_origem
+from pagina_raster import PaginaRaster, renderizar_pagina
+
+
+# Edita a página no lugar (funções 3 e 4); precisa ser serializável (função de módulo/partial)
+EditorPagina = Callable[[PaginaRaster], None]
+
+# (page_num, dpi, perfil de cor)
+TarefaPagina = Tuple[int, int, str]
+
+# Páginas em voo por worker: uma sendo editada, outra pronta esperando a vez
+PAGINAS_POR_WORKER = 2
+
+_doc_worker = None  # PDF aberto em cada processo do pool
+
+
+def _iniciar_worker(origem: Origem) -> None:
+    """Abre o PDF uma vez por processo; o paralelismo vem das páginas, não do OpenMP"""
+    global _doc_worker
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    _doc_worker = abrir_pdf(origem)
+
+
+def montar_tarefas(origem: Origem, placeholders_info: list, dpi: int = 300,
+                   perfil_cor: str = "rgb", dpi_adaptativo: bool = True,
+                   analise: Optional[AnaliseTemplate] = None) -> List[TarefaPagina]:
+    """
+    Uma tarefa por página com placeholders, com o DPI que iterar_imagens usaria
+
+    O DPI sai da análise do template (ver analise_template): o PDF não é
+    aberto. `analise`: a do chamador, quando já a tem (sem novo hash).
+    """
+    if dpi_adaptativo:
+        analise = analise or analisar_template(origem)
+    tarefas = []
+    for page_num in sorted({p.page for p in placeholders_info}):
+        tamanhos = [p.size for p in placeholders_info if p.page == page_num]
+        dpi_pagina = analise.dpi_pagina(page_num, tamanhos, dpi) if dpi_adaptativo else dpi
+        tarefas.append((page_num, dpi_pagina, perfil_cor))
+    return tarefas
+
+
+def _renderizar_e_editar(doc: fitz.Document, tarefa: TarefaPagina,
+                         editor: EditorPagina) -> PaginaRaster:
+    page_num, dpi, perfil = tarefa
+    pagina = renderizar_pagina(doc[page_num], dpi, perfil)
+    editor(pagina)
+    return pagina
+
+
+def _processar_no_worker(tarefa: TarefaPagina, editor: EditorPagina) -> Tuple[str, tuple, int, str]:
+    """Renderiza e edita a página; devolve só o nome do bloco compartilhado e a forma"""
+    pagina = _renderizar_e_editar(_doc_worker, tarefa, editor)
+    pixels = pagina.pixels
+
+    bloco = shared_memory.SharedMemory(create=True, size=max(1, pixels.nbytes))
+    try:
+        np.ndarray(pixels.shape, dtype=np.uint8, buffer=bloco.buf)[...] = pixels
+    finally:
+        bloco.close()  # o bloco continua existindo até o processo principal removê-lo
+    return bloco.name, pixels.shape, pagina.dpi, pagina.perfil
+
+
+def _receber_pagina(page_num: int, nome: str, forma: tuple, dpi: int,
+                    perfil: str) -> PaginaRaster:
+    """Copia o bloco compartilhado para um Pixmap novo (uma cópia) e remove o bloco"""
+    bloco = shared_memory.SharedMemory(name=nome)
+    try:
+        altura, largura = forma[:2]
+        espaco = fitz.csRGB if len(forma) == 3 else fitz.csGRAY
+        pagina = PaginaRaster(fitz.Pixmap(espaco, fitz.IRect(0, 0, largura, altura), False),
+                              page_num, dpi, perfil)
+        pagina.pixels[...] = np.ndarray(forma, dtype=np.uint8, buffer=bloco.buf)
+        return pagina
+    finally:
+        bloco.close()
+        bloco.unlink()
+
+
+def _descartar(futuro: Future) -> None:
+    """Remove o bloco de uma página que não será consumida (erro ou gerador fechado)"""
+    if futuro.cancelled() or futuro.exception() is not None:
+        return
+    nome = futuro.result()[0]
+    try:
+        bloco = shared_memory.SharedMemory(name=nome)
+        bloco.close()
+        bloco.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def processar_em_sequencia(origem: Origem, tarefas: List[TarefaPagina],
+                           editor: EditorPagina) -> Iterator[Tuple[int, PaginaRaster]]:
+    """Mesmo resultado de processar_em_paralelo, no processo atual"""
+    with abrir_pdf(origem) as doc:
+        for tarefa in tarefas:
+            yield tarefa[0], _renderizar_e_editar(doc, tarefa, editor)
+
+
+def processar_em_paralelo(origem: Origem, tarefas: List[TarefaPagina],
+                          editor: EditorPagina, workers: Optional[int] = None
+                          ) -> Iterator[Tuple[int, PaginaRaster]]:
+    """
+    (page_num, página editada) na ordem de `tarefas`, editadas em `workers` processos
+
+    No máximo PAGINAS_POR_WORKER × workers páginas ficam em voo: o consumidor
+    codifica uma página enquanto as seguintes são editadas. Sem pool de
+    processos (ambientes sem fork/semáforos) ou se ele cair, as páginas
+    restantes seguem no processo atual.
+
+    Args:
+        origem: caminho ou bytes do PDF (cada worker abre o seu)
+        tarefas: (page_num, dpi, perfil) em ordem de página
+        editor: função de módulo (ou partial) que edita a página no lugar
+        workers: processos (None = um por núcleo)
+    """
+    origem = normalizar_origem(origem)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tarefas)))
+    if workers == 1:
+        yield from processar_em_sequencia(origem, tarefas, editor)
+        return
+
+    try:
+        # Rastreador de recursos do pai herdado pelos workers: os blocos criados
+        # lá e removidos aqui são registrados no mesmo lugar (sem avisos de vazamento)
+        resource_tracker.ensure_running()
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker,
+                                       initargs=(origem,))
+    except OSError as e:
+        print(f"  ⚠️  Pool de processos indisponível ({e}); processando em sequência")
+        yield from processar_em_sequencia(origem, tarefas, editor)
+        return
+
+    print(f"  ⚡ {len(tarefas)} página(s) em {workers} processo(s)")
+    pendentes = deque()  # (page_num, futuro) na ordem das páginas
+    entregues = 0
+    try:
+        for tarefa in tarefas:
+            pendentes.append((tarefa[0], executor.submit(_processar_no_worker, tarefa, editor)))
+            while len(pendentes) >= PAGINAS_POR_WORKER * workers:
+                page_num, futuro = pendentes.popleft()
+                yield page_num, _receber_pagina(page_num, *futuro.result())
+                entregues += 1
+
+        while pendentes:
+            page_num, futuro = pendentes.popleft()
+            yield page_num, _receber_pagina(page_num, *futuro.result())
+            entregues += 1
+    except BrokenProcessPool as e:
+        print(f"  ⚠️  Pool de processos caiu ({e}); páginas restantes em sequência")
+        executor.shutdown(cancel_futures=True)
+        yield from processar_em_sequencia(origem, tarefas[entregues:], editor)
+    finally:
+        # Páginas já editadas que não serão consumidas: blocos removidos
+        executor.shutdown(cancel_futures=True)
+        for _, futuro in pendentes:
+            _descartar(futuro)
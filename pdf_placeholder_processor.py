@@ -3,101 +3,54 @@
 # Usa keras-ocr para melhor detecção de texto
 
 # ```python
-import cv2
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from keras_ocr import pipeline
-from pdf2image import convert_from_path
-from PIL import Image, ImageDraw, ImageFont
-import os
-from pathlib import Path
-from typing import Dict, List, Tuple, Optional
-import json
+from PIL import Image
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
-class PlaceholderMetadata:
-    """Armazena metadados de um placeholder detectado"""
-    def __init__(self, text: str, x: int, y: int, width: int, height: int, 
-                 font_size: int, color: Tuple[int,int,int], confidence: float):
-        self.text = text
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.font_size = font_size
-        self.color = color
-        self.confidence = confidence
-    
-    def to_dict(self):
-        return {
-            'text': self.text,
-            'x': self.x,
-            'y': self.y,
-            'width': self.width,
-            'height': self.height,
-            'font_size': self.font_size,
-            'color': self.color,
-            'confidence': self.confidence
-        }
+from entrada_saida_pdf import Origem, Destino
+from processador_paginas_ocr import PlaceholderMetadata, ProcessadorPaginasOCR, workers_paginas
+
+# keras-ocr (TensorFlow), PyMuPDF (pagina_raster) e OpenCV são importados no primeiro uso:
+# importar este módulo não carrega nenhum deles (ver benchmark_importacao)
 
 
-class PDFPlaceholderProcessor:
+class PDFPlaceholderProcessor(ProcessadorPaginasOCR):
     """
     Processa PDF para encontrar, remover e reinserer placeholders
     Usa keras-ocr para melhor detecção de texto
     
-    Fluxo:
-    1. Converte PDF em imagens
+    Fluxo (uma página por vez, ver processar_em_fluxo):
+    1. Renderiza a página (PyMuPDF)
     2. Detecta placeholders {xxx} com keras-ocr
     3. Armazena posição, fonte, cor
     4. Remove texto
     5. Reinsere valores novos
-    6. Reconstrói PDF
+    6. Codifica a página no PDF de saída
     """
     
-    def __init__(self, pdf_path: str, dpi: int = 300):
+    def __init__(self, pdf_path: Origem, dpi: int = 300, dpi_adaptativo: bool = True,
+                 ocr_duas_etapas: bool = True, deteccao_hibrida: bool = True):
         """
-        Args:
-            pdf_path: caminho do PDF de entrada
-            dpi: resolução para conversão (300 = alta qualidade)
+        Parâmetros em ProcessadorPaginasOCR; com deteccao_hibrida, o keras-ocr
+        roda só nas páginas escaneadas/imagens (ver deteccao_hibrida)
         """
-        self.pdf_path = pdf_path
-        self.dpi = dpi
-        self.pages_images = []  # Lista de PIL Images
-        self.pages_metadata = []  # Lista com metadados de cada página
-        self.ocr_pipeline = None  # Pipeline keras-ocr (carregado sob demanda)
+        super().__init__(pdf_path, dpi, dpi_adaptativo, ocr_duas_etapas, deteccao_hibrida)
+        self.ocr_pipeline = None  # keras-ocr compartilhado (obtido sob demanda)
         
     def carregar_ocr_pipeline(self):
-        """Carrega o pipeline keras-ocr na primeira necessidade"""
-        if self.ocr_pipeline is None:
-            print("📚 Carregando pipeline keras-ocr (primeira vez demora ~30s)...")
-            self.ocr_pipeline = pipeline.Pipeline()
-            print("✅ Pipeline carregado")
-        return self.ocr_pipeline
-    
-    def converter_pdf_para_imagens(self) -> List[Image.Image]:
         """
-        Converte todas as páginas do PDF em imagens PIL
+        Pipeline keras-ocr COMPARTILHADO (ver servidor_keras_ocr)
         
-        Returns:
-            Lista de imagens PIL (RGB)
+        O modelo é carregado uma vez por processo (ou pelo daemon apontado
+        por KERAS_OCR_SOCKET), não uma vez por processador/PDF.
         """
-        print(f"📄 Convertendo PDF para imagens... DPI={self.dpi}")
-        
-        try:
-            images = convert_from_path(
-                self.pdf_path, 
-                dpi=self.dpi,
-                first_page=None,
-                last_page=None
-            )
-            
-            self.pages_images = images
-            print(f"✅ {len(images)} página(s) convertida(s)")
-            return images
-            
-        except Exception as e:
-            print(f"❌ Erro ao converter PDF: {e}")
-            return []
+        if self.ocr_pipeline is None:
+            from servidor_keras_ocr import pipeline_compartilhado
+            self.ocr_pipeline = pipeline_compartilhado()
+        return self.ocr_pipeline
     
     def detectar_placeholders_keras_ocr(self, pil_image: Image.Image) -> List[PlaceholderMetadata]:
         """
@@ -109,84 +62,124 @@ class PDFPlaceholderProcessor:
         Returns:
             Lista de PlaceholderMetadata
         """
+        return self.detectar_placeholders_keras_ocr_lote([pil_image])[0]
+    
+    def detectar_placeholders_keras_ocr_lote(self, imagens: List[Image.Image],
+                                             workers: Optional[int] = None
+                                             ) -> List[List[PlaceholderMetadata]]:
+        """
+        Detecta placeholders de VÁRIAS páginas com uma única chamada a
+        `pipeline.recognize([...])` (o keras-ocr processa a lista em lote)
+        
+        Args:
+            imagens: Páginas (PIL)
+            workers: threads para a busca de chaves por página (None = automático)
+            
+        Returns:
+            Uma lista de PlaceholderMetadata por página, na ordem das páginas
+        """
         ocr_pipeline = self.carregar_ocr_pipeline()
         
-        # Converter PIL para numpy array para keras-ocr
-        img_array = np.array(pil_image)
+        if self.ocr_duas_etapas:
+            return self._detectar_keras_duas_etapas(ocr_pipeline, imagens, workers)
+        
+        # Página inteira: todas as páginas em um lote
+        print(f"  🔍 Executando OCR com keras-ocr ({len(imagens)} página(s) em lote)...")
+        predicoes = ocr_pipeline.recognize([np.array(img) for img in imagens])
         
-        # Executar OCR
-        print("  🔍 Executando OCR com keras-ocr...")
-        results = ocr_pipeline.recognize([img_array])
+        resultado = []
+        for pil_image, palavras in zip(imagens, predicoes):
+            placeholders = []
+            
+            # Cada predição é (texto, caixa 4x2 em pixels)
+            for texto, box in palavras:
+                # Filtrar apenas placeholders {xxx}
+                if '{' not in texto or '}' not in texto:
+                    continue
+                
+                x_coords = [point[0] for point in box]
+                y_coords = [point[1] for point in box]
+                x = int(min(x_coords))
+                y = int(min(y_coords))
+                w = int(max(x_coords) - x)
+                h = int(max(y_coords) - y)
+                
+                placeholders.append(self._metadados_keras(pil_image, texto, x, y, w, h))
+            
+            if not placeholders:
+                print("  ⚠️  Nenhum placeholder encontrado")
+            resultado.append(placeholders)
         
-        placeholders = []
+        return resultado
+    
+    def _metadados_keras(self, pil_image: Image.Image, texto: str,
+                         x: int, y: int, w: int, h: int) -> PlaceholderMetadata:
+        """Metadados de um placeholder: fonte estimada pela altura, cor pela região"""
+        # Estimar tamanho da fonte baseado na altura
+        font_size = max(8, int(h * 0.7))
         
-        if results and len(results) > 0:
-            images, texts = results
+        # Detectar cor dominante da região
+        try:
+            roi = np.array(pil_image.crop((
+                max(0, x-5), 
+                max(0, y-5),
+                min(pil_image.width, x+w+5),
+                min(pil_image.height, y+h+5)
+            )))
             
-            # texts é lista de (texto, caixa_delimitadora)
-            for text_data in texts:
-                if len(text_data) >= 1:
-                    texto = text_data[0]
-                    
-                    # Filtrar apenas placeholders {xxx}
-                    if '{' in texto and '}' in texto:
-                        # Extrair coordenadas da bounding box
-                        # keras-ocr retorna coordenadas normalizadas
-                        if len(text_data) > 1:
-                            box = text_data[1]
-                            
-                            # Converter coordenadas para pixels
-                            x_coords = [point[0] for point in box]
-                            y_coords = [point[1] for point in box]
-                            
-                            x = int(min(x_coords))
-                            y = int(min(y_coords))
-                            w = int(max(x_coords) - x)
-                            h = int(max(y_coords) - y)
-                        else:
-                            x, y, w, h = 0, 0, 50, 20
-                        
-                        # Estimar tamanho da fonte baseado na altura
-                        font_size = max(8, int(h * 0.7))
-                        
-                        # Detectar cor dominante da região
-                        try:
-                            roi = np.array(pil_image.crop((
-                                max(0, x-5), 
-                                max(0, y-5),
-                                min(pil_image.width, x+w+5),
-                                min(pil_image.height, y+h+5)
-                            )))
-                            
-                            if roi.size > 0:
-                                if len(roi.shape) == 3:
-                                    color_value = int(np.mean(roi[:,:,0]))
-                                else:
-                                    color_value = int(np.mean(roi))
-                            else:
-                                color_value = 0
-                        except:
-                            color_value = 0
-                        
-                        color = (color_value, color_value, color_value)
-                        confidence = 0.95  # keras-ocr não retorna confiança por padrão
-                        
-                        placeholder = PlaceholderMetadata(
-                            text=texto,
-                            x=x, y=y,
-                            width=w, height=h,
-                            font_size=font_size,
-                            color=color,
-                            confidence=confidence
-                        )
-                        
-                        placeholders.append(placeholder)
-                        print(f"  ✓ Encontrado: '{texto}' em ({x}, {y})")
+            if roi.size > 0:
+                if len(roi.shape) == 3:
+                    color_value = int(np.mean(roi[:,:,0]))
+                else:
+                    color_value = int(np.mean(roi))
+            else:
+                color_value = 0
+        except:
+            color_value = 0
+        
+        color = (color_value, color_value, color_value)
+        
+        print(f"  ✓ Encontrado: '{texto}' em ({x}, {y})")
+        return PlaceholderMetadata(
+            text=texto,
+            x=x, y=y,
+            width=w, height=h,
+            font_size=font_size,
+            color=color,
+            confidence=0.95  # keras-ocr não retorna confiança por padrão
+        )
+    
+    def _detectar_keras_duas_etapas(self, ocr_pipeline, imagens: List[Image.Image],
+                                    workers: Optional[int] = None
+                                    ) -> List[List[PlaceholderMetadata]]:
+        """
+        Chaves na página reduzida + keras-ocr em lote só nos recortes
         
-        if not placeholders:
-            print("  ⚠️  Nenhum placeholder encontrado")
+        A busca de chaves roda em threads (OpenCV libera o GIL) e os recortes
+        de todas as páginas vão em UMA chamada ao reconhecedor. O alfabeto do
+        keras-ocr não tem "{", "}" nem "_": a caixa vem do par de chaves e o
+        nome é montado com as palavras lidas unidas por "_".
+        """
+        from ocr_regioes import encontrar_regioes_candidatas, reconhecer_keras_paginas
+        
+        print(f"  🔍 Localizando chaves em {len(imagens)} página(s) reduzida(s)...")
+        with ThreadPoolExecutor(max_workers=workers_paginas(workers, len(imagens))) as executor:
+            regioes_por_pagina = list(executor.map(encontrar_regioes_candidatas, imagens))
+        print(f"  🔍 keras-ocr em {sum(map(len, regioes_por_pagina))} recorte(s), um lote só...")
+        
+        resultado = []
+        for pil_image, lidas in zip(imagens, reconhecer_keras_paginas(
+                ocr_pipeline, imagens, regioes_por_pagina)):
+            placeholders = [
+                self._metadados_keras(pil_image, "{" + "_".join(palavras) + "}",
+                                      regiao.x, regiao.y, regiao.largura, regiao.altura)
+                for regiao, palavras in lidas if palavras
+            ]
+            if not placeholders:
+                print("  ⚠️  Nenhum placeholder encontrado")
+            resultado.append(placeholders)
         
-        return placeholders
+        return resultado
     
     def remover_placeholder_em_imagem(self, pil_image: Image.Image, 
                                      metadata: PlaceholderMetadata,
@@ -202,6 +195,8 @@ class PDFPlaceholderProcessor:
         Returns:
             Imagem PIL com placeholder removido
         """
+        import cv2
+        
         # Converter para OpenCV
         cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
         
@@ -225,6 +220,33 @@ class PDFPlaceholderProcessor:
         
         return resultado_pil
     
+    def detectar_hibrido(self) -> Optional[List[List[PlaceholderMetadata]]]:
+        """
+        Placeholders de todas as páginas pela camada de texto, com keras-ocr
+        só nas páginas escaneadas e imagens grandes; None se indisponível
+        """
+        def ocr_keras(imagem: Image.Image):
+            return [(p.text, p.x, p.y, p.width, p.height)
+                    for p in self.detectar_placeholders_keras_ocr(imagem)]
+        
+        try:
+            from deteccao_hibrida import DetectorHibrido
+            detector = DetectorHibrido(dpi_ocr=self.dpi, ocr=ocr_keras, nome_ocr="keras")
+            por_pagina = detector.detectar(self.pdf_path)
+        except Exception as e:
+            print(f"  ⚠️  Detecção híbrida indisponível ({e}); keras-ocr em todas as páginas")
+            return None
+        
+        return self.metadados_hibridos(por_pagina, 1.0)
+    
+    def remover_placeholders(self, pil_image: Image.Image,
+                             placeholders: List[PlaceholderMetadata]) -> Image.Image:
+        """Remove todos os placeholders de uma página (cópia; original intacta)"""
+        imagem_limpa = pil_image.copy()
+        for placeholder in placeholders:
+            imagem_limpa = self.remover_placeholder_em_imagem(imagem_limpa, placeholder)
+        return imagem_limpa
+    
     def processar_pagina(self, page_num: int) -> Tuple[Image.Image, List[PlaceholderMetadata]]:
         """
         Processa uma página completa:
@@ -246,31 +268,38 @@ class PDFPlaceholderProcessor:
         print("  🔍 Detectando placeholders com keras-ocr...")
         placeholders = self.detectar_placeholders_keras_ocr(pil_image)
         
+        # 3. Armazenar metadados (também sem placeholders: reinserer_valores pareia por página)
+        self.pages_metadata.append({
+            'page': page_num,
+            'placeholders': [p.to_dict() for p in placeholders]
+        })
+        
         if not placeholders:
             print("  ⚠️  Nenhum placeholder encontrado nesta página")
             return pil_image, []
         
         # 2. Remover cada um
         print(f"  ✂️  Removendo {len(placeholders)} placeholder(s)...")
-        imagem_limpa = pil_image.copy()
-        
-        for placeholder in placeholders:
-            imagem_limpa = self.remover_placeholder_em_imagem(imagem_limpa, placeholder)
-        
-        # 3. Armazenar metadados
-        self.pages_metadata.append({
-            'page': page_num,
-            'placeholders': [p.to_dict() for p in placeholders]
-        })
+        imagem_limpa = self.remover_placeholders(pil_image, placeholders)
         
         print(f"  ✅ Página {page_num + 1} processada com {len(placeholders)} placeholder(s) removido(s)")
         
         return imagem_limpa, placeholders
     
-    def processar_todas_paginas(self) -> List[Image.Image]:
+    def processar_todas_paginas(self, workers: Optional[int] = None) -> List[Image.Image]:
         """
         Processa todas as páginas do PDF
         
+        Com detecção híbrida, a camada de texto dá os placeholders e o
+        keras-ocr roda só nas páginas sem ela (chamadas simultâneas viram lotes
+        no hospedeiro do modelo). Sem ela, a detecção de todas as páginas vai
+        em um lote do keras-ocr. A remoção
+        (inpainting do OpenCV, que libera o GIL) roda em threads; resultados e
+        metadados ficam na ordem das páginas.
+        
+        Args:
+            workers: threads para busca de chaves e remoção (None = uma por núcleo)
+        
         Returns:
             Lista de imagens processadas
         """
@@ -278,135 +307,76 @@ class PDFPlaceholderProcessor:
         print("PROCESSANDO TODAS AS PÁGINAS")
         print("="*60)
         
-        imagens_processadas = []
+        if not self.pages_images:
+            return []
         
-        for i in range(len(self.pages_images)):
-            imagem_limpa, _ = self.processar_pagina(i)
-            imagens_processadas.append(imagem_limpa)
+        placeholders_por_pagina = self.detectar_hibrido() if self.deteccao_hibrida else None
+        if placeholders_por_pagina is None:
+            placeholders_por_pagina = self.detectar_placeholders_keras_ocr_lote(self.pages_images, workers)
         
-        return imagens_processadas
-    
-    def reinserer_valores(self, imagens_limpas: List[Image.Image],
-                         placeholders_valores: Dict[str, str]) -> List[Image.Image]:
-        """
-        Reinsere os valores nos placeholders removidos
+        with ThreadPoolExecutor(max_workers=workers_paginas(workers, len(self.pages_images))) as executor:
+            imagens_processadas = list(executor.map(
+                self.remover_placeholders, self.pages_images, placeholders_por_pagina))
         
-        Args:
-            imagens_limpas: Lista de imagens sem placeholders
-            placeholders_valores: Dict {"{placeholder}": "valor"}
-            
-        Returns:
-            Lista de imagens com valores inseridos
-        """
-        print("\n" + "="*60)
-        print("REINSERINDO VALORES")
-        print("="*60)
+        self.pages_metadata = [
+            {'page': i, 'placeholders': [p.to_dict() for p in placeholders]}
+            for i, placeholders in enumerate(placeholders_por_pagina)
+        ]
         
-        imagens_finais = []
+        for i, placeholders in enumerate(placeholders_por_pagina):
+            print(f"  ✅ Página {i + 1}: {len(placeholders)} placeholder(s) removido(s)")
         
-        for page_num, (imagem_limpa, metadata_page) in enumerate(
-            zip(imagens_limpas, self.pages_metadata)):
-            
-            print(f"\n📝 Página {page_num + 1}: Inserindo valores...")
-            
-            imagem_final = imagem_limpa.copy()
-            draw = ImageDraw.Draw(imagem_final)
-            
-            for placeholder_info in metadata_page['placeholders']:
-                placeholder_key = placeholder_info['text']
-                
-                # Procurar o valor
-                if placeholder_key in placeholders_valores:
-                    valor = placeholders_valores[placeholder_key]
-                    
-                    x = placeholder_info['x']
-                    y = placeholder_info['y']
-                    font_size = placeholder_info['font_size']
-                    color = tuple(placeholder_info['color'])
-                    
-                    # Tentar usar fonte True Type (fallback para default)
-                    try:
-                        # Tenta diferentes caminhos possíveis para Arial
-                        font_paths = [
-                            "arial.ttf",
-                            "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-                            "/System/Library/Fonts/Arial.ttf",
-                            "C:\\Windows\\Fonts\\arial.ttf",
-                        ]
-                        
-                        fonte = None
-                        for font_path in font_paths:
-                            if os.path.exists(font_path):
-                                fonte = ImageFont.truetype(font_path, font_size)
-                                break
-                        
-                        if fonte is None:
-                            fonte = ImageFont.load_default()
-                    except:
-                        fonte = ImageFont.load_default()
-                    
-                    # Desenhar texto
-                    draw.text(
-                        (x, y),
-                        valor,
-                        fill=color,
-                        font=fonte
-                    )
-                    
-                    print(f"  ✓ {placeholder_key} → '{valor}'")
-                else:
-                    print(f"  ⚠️  Valor não informado para {placeholder_key}")
-            
-            imagens_finais.append(imagem_final)
-        
-        return imagens_finais
+        return imagens_processadas
     
-    def salvar_pdf(self, imagens: List[Image.Image], caminho_saida: str):
+    def limpar_pagina(self, pil_image: Image.Image,
+                      placeholders: Optional[List[PlaceholderMetadata]] = None
+                      ) -> Tuple[Image.Image, List[PlaceholderMetadata]]:
+        """Detecta (se `placeholders` não vier pronto) e remove os placeholders de uma página"""
+        if placeholders is None:
+            placeholders = self.detectar_placeholders_keras_ocr(pil_image)
+        if not placeholders:
+            return pil_image, []
+        return self.remover_placeholders(pil_image, placeholders), placeholders
+    
+    def limpar_em_fluxo(self, detectados: Optional[List[List[PlaceholderMetadata]]] = None,
+                        workers: int = 1
+                        ) -> Iterator[Tuple[Image.Image, List[PlaceholderMetadata]]]:
         """
-        Reconstrói PDF a partir das imagens
+        (imagem limpa, placeholders) de cada página, na ordem das páginas
+        
+        A próxima página só é renderizada quando há vaga: no máximo `workers`
+        páginas em processamento, mais a entregue ao consumidor. Páginas
+        simultâneas sem detecção pronta viram um lote no hospedeiro do keras-ocr.
         
         Args:
-            imagens: Lista de imagens PIL
-            caminho_saida: Caminho do PDF de saída
+            detectados: placeholders por página (None = keras-ocr em cada página)
+            workers: páginas processadas ao mesmo tempo (1 = sequencial)
         """
-        print("\n" + "="*60)
-        print("RECONSTRUINDO PDF")
-        print("="*60)
-        
-        try:
-            # Converter para RGB se necessário
-            imagens_rgb = [
-                img.convert('RGB') if img.mode != 'RGB' else img 
-                for img in imagens
-            ]
-            
-            # Salvar como PDF
-            imagens_rgb[0].save(
-                caminho_saida,
-                save_all=True,
-                append_images=imagens_rgb[1:] if len(imagens_rgb) > 1 else [],
-                quality=95
-            )
+        pendentes = deque()  # futuros na ordem das páginas
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for i, imagem in self.iterar_paginas():
+                placeholders = detectados[i] if detectados else None
+                pendentes.append(executor.submit(self.limpar_pagina, imagem, placeholders))
+                while len(pendentes) >= workers:
+                    yield pendentes.popleft().result()
             
-            tamanho_mb = os.path.getsize(caminho_saida) / 1024 / 1024
-            print(f"✅ PDF salvo: {caminho_saida}")
-            print(f"   Tamanho: {tamanho_mb:.2f} MB")
-            
-        except Exception as e:
-            print(f"❌ Erro ao salvar PDF: {e}")
+            while pendentes:
+                yield pendentes.popleft().result()
     
     def processar_completo(self, placeholders_valores: Dict[str, str], 
-                          caminho_saida: str):
+                          caminho_saida: Destino = None,
+                          workers: Optional[int] = None) -> Optional[bytes]:
         """
-        Executa o fluxo completo:
-        A. PDF → Imagens
-        B. Detectar, remover placeholders
-        C. Reinserer valores
-        D. Salvar PDF
+        Executa o fluxo completo, uma página por vez (ver processar_em_fluxo):
+        renderizar → detectar e remover placeholders → reinserir valores → codificar
         
         Args:
             placeholders_valores: Dict {"{placeholder}": "valor"}
-            caminho_saida: Caminho do PDF de saída
+            caminho_saida: destino opcional (caminho, stream ou função)
+            workers: páginas processadas ao mesmo tempo (None = uma por núcleo)
+        
+        Returns:
+            bytes do PDF gerado, ou None em caso de erro
         """
         tempo_inicio = datetime.now()
         
@@ -414,21 +384,7 @@ class PDFPlaceholderProcessor:
         print("INICIANDO PROCESSAMENTO COMPLETO")
         print("🚀 "*30 + "\n")
         
-        # PASSO A: Converter PDF para imagens
-        self.converter_pdf_para_imagens()
-        
-        if not self.pages_images:
-            print("❌ Erro: Nenhuma imagem convertida")
-            return False
-        
-        # PASSO B: Processar (detectar e remover)
-        imagens_limpas = self.processar_todas_paginas()
-        
-        # PASSO C: Reinserer valores
-        imagens_finais = self.reinserer_valores(imagens_limpas, placeholders_valores)
-        
-        # PASSO D: Salvar PDF
-        self.salvar_pdf(imagens_finais, caminho_saida)
+        pdf_bytes = self.processar_em_fluxo(placeholders_valores, caminho_saida, workers)
         
         tempo_total = (datetime.now() - tempo_inicio).total_seconds()
         
@@ -437,7 +393,7 @@ class PDFPlaceholderProcessor:
         print(f"⏱️  Tempo total: {tempo_total:.2f}s")
         print("✅ "*30)
         
-        return True
+        return pdf_bytes
 # ```
 
 # ---
@@ -473,7 +429,7 @@ class PDFPlaceholderProcessor:
 # ## 📦 Dependências Necessárias
 
 # ```bash
-# pip install keras-ocr pdf2image pillow opencv-python
+# pip install keras-ocr pymupdf pillow opencv-python
 # ```
 
 # ---
@@ -1,15 +1,21 @@
 # pdf_placeholder_processor_pymupdf.py
 # VERSÃO FINAL: PyMuPDF para leitura precisa de coordenadas
-# Sem OCR, sem Poppler, sem compilação, 100% preciso
+# Sem Poppler, sem compilação; OCR só em páginas escaneadas (deteccao_hibrida)
 
 import fitz  # PyMuPDF
-import cv2
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
-import os
-from typing import Dict, List, Tuple
+from PIL import Image, ImageDraw
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+from pagina_raster import escolher_dpi
+from deteccao_hibrida import DetectorHibrido, placeholders_camada_texto
+from entrada_saida_pdf import (Origem, Destino, abrir_pdf, normalizar_origem,
+                               descrever_origem, persistir)
+from ajuste_texto import (MedidorPIL, ajustar_texto, caixa_livre, obstaculos_pagina,
+                          FATOR_TAMANHO_MINIMO)
+from atualizacao_incremental import DocumentoIncremental
+
 
 class PlaceholderMetadata:
     """Armazena metadados de um placeholder detectado pelo PyMuPDF"""
@@ -46,24 +52,32 @@ class PDFPlaceholderProcessorPyMuPDF:
     6. Salva PDF modificado
     """
     
-    def __init__(self, pdf_path: str, dpi: int = 300):
+    def __init__(self, pdf_path: Origem, dpi: int = 300, dpi_adaptativo: bool = True):
         """
         Args:
-            pdf_path: caminho do PDF
+            pdf_path: caminho, bytes ou stream do PDF
             dpi: resolução (300 = padrão, 600 = alta qualidade)
+            dpi_adaptativo: escolhe o DPI de cada página pela menor fonte
+                            relevante; `dpi` passa a ser o limite superior
         """
-        self.pdf_path = pdf_path
+        self.pdf_path = normalizar_origem(pdf_path)
         self.dpi = dpi
+        self.dpi_adaptativo = dpi_adaptativo
         self.doc = None
+        self.edicao = None  # DocumentoIncremental no modo incremental
         self.placeholders = []
         self.pages_metadata = []
         self.dpi_scale = dpi / 72  # Converter pontos PDF para pixels
         
-    def abrir_pdf(self) -> bool:
-        """Abre PDF com PyMuPDF"""
+    def abrir_pdf(self, incremental: bool = False) -> bool:
+        """Abre PDF com PyMuPDF (incremental: numa cópia gravada por atualização incremental)"""
         try:
-            self.doc = fitz.open(self.pdf_path)
-            print(f"✅ PDF aberto: {len(self.doc)} página(s)")
+            if incremental:
+                self.edicao = DocumentoIncremental(self.pdf_path)
+                self.doc = self.edicao.doc
+            else:
+                self.doc = abrir_pdf(self.pdf_path)
+            print(f"✅ PDF aberto: {descrever_origem(self.pdf_path)} ({len(self.doc)} página(s))")
             return True
         except Exception as e:
             print(f"❌ Erro ao abrir PDF: {e}")
@@ -72,56 +86,46 @@ class PDFPlaceholderProcessorPyMuPDF:
     def extrair_placeholders(self) -> List[PlaceholderMetadata]:
         """
         Extrai TODOS os placeholders com coordenadas exatas
-        PyMuPDF lê direto do PDF (100% preciso)
+        
+        Páginas com camada de texto: PyMuPDF lê direto do PDF (100% preciso).
+        Páginas escaneadas e imagens grandes: OCR só nelas (ver deteccao_hibrida);
+        a decisão por página fica em cache com o template.
         """
         if not self.doc:
             return []
         
-        placeholders = []
+        print("\n🔍 Extraindo placeholders (camada de texto + OCR onde faltar)...")
+        
+        try:
+            por_pagina = DetectorHibrido(dpi_ocr=self.dpi).detectar(self.pdf_path)
+        except Exception as e:
+            # Sem Tesseract/OpenCV: só a camada de texto (páginas escaneadas ficam sem placeholders)
+            print(f"  ⚠️  OCR indisponível ({e}); usando só a camada de texto")
+            por_pagina = [placeholders_camada_texto(page) for page in self.doc]
         
-        print("\n🔍 Extraindo placeholders com PyMuPDF...")
+        placeholders = []
+        self.pages_metadata = []
         
-        for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
+        for page_num, detectados in enumerate(por_pagina):
+            page_placeholders = [
+                PlaceholderMetadata(
+                    text=p.texto,
+                    page=page_num,
+                    bbox=p.bbox,  # (x0, y0, x1, y1)
+                    font=p.fonte or "Arial",
+                    size=p.tamanho,
+                    color=p.cor  # 0 = preto
+                )
+                for p in detectados
+            ]
             
-            # Extrair todos os blocos de texto (sem OCR, direto do PDF)
-            try:
-                blocos = page.get_text("dict")["blocks"]
-            except:
-                print(f"  ⚠️  Página {page_num+1}: erro ao extrair blocos")
-                continue
+            for ph in page_placeholders:
+                x0, y0, x1, y1 = ph.bbox
+                print(f"  ✓ Pág {page_num+1}: '{ph.text}' em ({x0:.1f},{y0:.1f})")
             
-            for bloco in blocos:
-                if "lines" not in bloco:
-                    continue
-                
-                for linha in bloco["lines"]:
-                    for span in linha["spans"]:
-                        texto = span["text"].strip()
-                        
-                        # Filtrar apenas placeholders {xxx}
-                        if '{' in texto and '}' in texto:
-                            bbox = span["bbox"]  # (x0, y0, x1, y1)
-                            font = span.get("font", "Arial")
-                            size = span.get("size", 12)
-                            color = span.get("color", 0)  # 0 = preto
-                            
-                            placeholder = PlaceholderMetadata(
-                                text=texto,
-                                page=page_num,
-                                bbox=bbox,
-                                font=font,
-                                size=size,
-                                color=color
-                            )
-                            
-                            placeholders.append(placeholder)
-                            
-                            x0, y0, x1, y1 = bbox
-                            print(f"  ✓ Pág {page_num+1}: '{texto}' em ({x0:.1f},{y0:.1f})")
+            placeholders.extend(page_placeholders)
             
             # Armazenar metadados
-            page_placeholders = [p for p in placeholders if p.page == page_num]
             self.pages_metadata.append({
                 'page': page_num,
                 'placeholders': [p.to_dict() for p in page_placeholders]
@@ -143,14 +147,6 @@ class PDFPlaceholderProcessorPyMuPDF:
         
         page = self.doc[page_num]
         
-        # 1. Renderizar página (DPI configurável)
-        mat = fitz.Matrix(self.dpi_scale, self.dpi_scale)
-        pix = page.get_pixmap(matrix=mat, alpha=False)
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        
-        # 2. Preparar para desenho
-        draw = ImageDraw.Draw(img)
-        
         # Filtrar placeholders dessa página
         page_placeholders = [p for p in self.placeholders if p.page == page_num]
         
@@ -158,16 +154,33 @@ class PDFPlaceholderProcessorPyMuPDF:
             print(f"  ⚠️  Nenhum placeholder nesta página")
             return True
         
+        # 1. Renderizar página (DPI da própria página, limitado por self.dpi)
+        dpi_scale = self.dpi_scale
+        if self.dpi_adaptativo:
+            dpi_pagina = escolher_dpi(page, [p.size for p in page_placeholders], self.dpi)
+            dpi_scale = dpi_pagina / 72
+            print(f"  🎯 DPI da página: {dpi_pagina}")
+        
+        # Palavras e imagens vizinhas: limitam o espaço de cada valor
+        obstaculos = obstaculos_pagina(page)
+        
+        mat = fitz.Matrix(dpi_scale, dpi_scale)
+        pix = page.get_pixmap(matrix=mat, alpha=False)
+        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        
+        # 2. Preparar para desenho
+        draw = ImageDraw.Draw(img)
+        
         print(f"  ✂️  Removendo {len(page_placeholders)} placeholder(s)...")
         
         # 3. Remover e reinserer cada placeholder
         for ph in page_placeholders:
             # Converter coordenadas PDF → pixels
             x0, y0, x1, y1 = ph.bbox
-            x0_px = int(x0 * self.dpi_scale)
-            y0_px = int(y0 * self.dpi_scale)
-            x1_px = int(x1 * self.dpi_scale)
-            y1_px = int(y1 * self.dpi_scale)
+            x0_px = int(x0 * dpi_scale)
+            y0_px = int(y0 * dpi_scale)
+            x1_px = int(x1 * dpi_scale)
+            y1_px = int(y1 * dpi_scale)
             
             # Remover (preencher com branco)
             draw.rectangle(
@@ -180,27 +193,18 @@ class PDFPlaceholderProcessorPyMuPDF:
             if ph.text in placeholders_valores:
                 valor = placeholders_valores[ph.text]
                 
-                # Carregar fonte (tamanho proporcional)
-                font_size = int(ph.size * self.dpi_scale * 0.8)
+                # Fonte do span original, pelo índice compartilhado (tamanho proporcional)
+                font_size = max(8, int(ph.size * dpi_scale * 0.8))
                 
-                try:
-                    font_paths = [
-                        "arial.ttf",
-                        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-                        "/System/Library/Fonts/Arial.ttf",
-                        "C:\\Windows\\Fonts\\arial.ttf",
-                    ]
-                    
-                    fonte = None
-                    for font_path in font_paths:
-                        if os.path.exists(font_path):
-                            fonte = ImageFont.truetype(font_path, max(8, font_size))
-                            break
-                    
-                    if fonte is None:
-                        fonte = ImageFont.load_default()
-                except:
-                    fonte = ImageFont.load_default()
+                # Valor ajustado ao espaço livre até o texto/imagem vizinho
+                # (quebra se houver espaço abaixo, senão reduz)
+                medidor = MedidorPIL.do_span(ph.font)
+                largura_livre, altura_livre = caixa_livre(
+                    ph.bbox, (page.rect.width, page.rect.height), obstaculos)
+                ajuste = ajustar_texto(valor, medidor, largura_livre * dpi_scale, font_size,
+                                       tamanho_min=max(8, int(font_size * FATOR_TAMANHO_MINIMO)),
+                                       altura_max=altura_livre * dpi_scale, max_linhas=None)
+                fonte = medidor.fonte(ajuste.tamanho)
                 
                 # Cores (converter de int para RGB se necessário)
                 if isinstance(ph.color, int):
@@ -209,12 +213,13 @@ class PDFPlaceholderProcessorPyMuPDF:
                     cor_rgb = ph.color if isinstance(ph.color, tuple) else (0, 0, 0)
                 
                 # Desenhar texto
-                draw.text(
-                    (x0_px, y0_px),
-                    valor,
-                    fill=cor_rgb,
-                    font=fonte
-                )
+                for i, linha in enumerate(ajuste.linhas):
+                    draw.text(
+                        (x0_px, y0_px + int(i * ajuste.altura_linha)),
+                        linha,
+                        fill=cor_rgb,
+                        font=fonte
+                    )
                 
                 print(f"  ✓ {ph.text} → '{valor}'")
             else:
@@ -232,10 +237,29 @@ class PDFPlaceholderProcessorPyMuPDF:
         
         return True
     
+    def _fechar(self) -> None:
+        if self.edicao:
+            self.edicao.fechar()
+            self.edicao = None
+        elif self.doc is not None and not self.doc.is_closed:
+            self.doc.close()
+    
     def processar_completo(self, placeholders_valores: Dict[str, str], 
-                          caminho_saida: str) -> bool:
+                          caminho_saida: Destino = None,
+                          incremental: bool = False) -> Optional[bytes]:
         """
         Executa fluxo completo
+        
+        Args:
+            placeholders_valores: Dict {"{placeholder}": "valor"}
+            caminho_saida: destino opcional (caminho, stream ou função);
+                           None = resultado só em memória
+            incremental: páginas editadas anexadas como atualização incremental
+                         aos bytes intactos do template (ver
+                         atualizacao_incremental.ArmazemDeltas)
+        
+        Returns:
+            bytes do PDF gerado, ou None em caso de erro
         """
         tempo_inicio = datetime.now()
         
@@ -244,24 +268,28 @@ class PDFPlaceholderProcessorPyMuPDF:
         print("🚀 "*30)
         
         # 1. Abrir PDF
-        if not self.abrir_pdf():
-            return False
+        if not self.abrir_pdf(incremental):
+            return None
         
         # 2. Extrair placeholders
         placeholders = self.extrair_placeholders()
         
         if not placeholders:
             print("\n⚠️  Nenhum placeholder encontrado!")
-            self.doc.close()
-            return False
+            self._fechar()
+            return None
         
         # 3. Processar cada página
         print("\n" + "="*60)
         print("REMOVENDO E REINSERINDO PLACEHOLDERS")
         print("="*60)
         
-        for page_num in range(len(self.doc)):
-            self.processar_pagina(page_num, placeholders_valores)
+        try:
+            for page_num in range(len(self.doc)):
+                self.processar_pagina(page_num, placeholders_valores)
+        except BaseException:
+            self._fechar()  # remove a cópia temporária do modo incremental
+            raise
         
         # 4. Salvar
         print("\n" + "="*60)
@@ -269,16 +297,27 @@ class PDFPlaceholderProcessorPyMuPDF:
         print("="*60)
         
         try:
-            self.doc.save(caminho_saida, garbage=4, deflate=True)
-            self.doc.close()
+            if self.edicao:
+                pdf_bytes = self.edicao.finalizar()
+                print(f"   Atualização incremental: {len(pdf_bytes) - len(self.edicao.template)} bytes "
+                      f"sobre o template")
+            else:
+                pdf_bytes = self.doc.tobytes(garbage=4, deflate=True)
+                self.doc.close()
+            persistir(pdf_bytes, caminho_saida)
             
-            tamanho_mb = os.path.getsize(caminho_saida) / 1024 / 1024
-            print(f"✅ PDF salvo: {caminho_saida}")
+            tamanho_mb = len(pdf_bytes) / 1024 / 1024
+            if isinstance(caminho_saida, str):
+                print(f"✅ PDF salvo: {caminho_saida}")
+            else:
+                print(f"✅ PDF gerado em memória")
             print(f"   Tamanho: {tamanho_mb:.2f} MB")
             
         except Exception as e:
             print(f"❌ Erro ao salvar: {e}")
-            return False
+            return None
+        finally:
+            self._fechar()
         
         tempo_total = (datetime.now() - tempo_inicio).total_seconds()
         
@@ -287,7 +326,7 @@ class PDFPlaceholderProcessorPyMuPDF:
         print(f"⏱️  Tempo total: {tempo_total:.2f}s")
         print("✅ "*30)
         
-        return True
+        return pdf_bytes
 # ```
 
 # ---
@@ -3,81 +3,54 @@
 # Usa pytesseract para detecção de texto
 
 # ```python
-import cv2
-import numpy as np
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import Image, ImageDraw, ImageFont
 import os
-from typing import Dict, List, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from PIL import Image
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
-class PlaceholderMetadata:
-    """Armazena metadados de um placeholder detectado"""
-    def __init__(self, text: str, x: int, y: int, width: int, height: int, 
-                 font_size: int, color: Tuple[int,int,int], confidence: float):
-        self.text = text
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.font_size = font_size
-        self.color = color
-        self.confidence = confidence
-    
-    def to_dict(self):
-        return {
-            'text': self.text,
-            'x': self.x,
-            'y': self.y,
-            'width': self.width,
-            'height': self.height,
-            'font_size': self.font_size,
-            'color': self.color,
-            'confidence': self.confidence
-        }
+from entrada_saida_pdf import Destino
+from processador_paginas_ocr import PlaceholderMetadata, ProcessadorPaginasOCR, workers_paginas
+
+# Tesseract (motor_ocr), PyMuPDF (pagina_raster) e OpenCV são importados no primeiro uso
+# (ver benchmark_importacao)
+
 
+def _iniciar_processo_ocr() -> None:
+    """Um thread OpenMP por Tesseract: o paralelismo vem das páginas"""
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
 
-class PDFPlaceholderProcessor:
+
+def _limpar_pagina_em_processo(pil_image: Image.Image, ocr_duas_etapas: bool,
+                               placeholders: Optional[List[PlaceholderMetadata]] = None):
+    """Executado no pool: processador sem PDF, só para detectar (se preciso) e remover"""
+    processador = PDFPlaceholderProcessor(b"", dpi_adaptativo=False,
+                                          ocr_duas_etapas=ocr_duas_etapas)
+    return processador.limpar_pagina(pil_image, placeholders)
+
+
+class PDFPlaceholderProcessor(ProcessadorPaginasOCR):
     """
     Processa PDF para encontrar, remover e reinserer placeholders
     Versão com pytesseract (sem keras-ocr)
     
-    Fluxo:
-    1. Converte PDF em imagens
+    Fluxo (uma página por vez, ver processar_em_fluxo):
+    1. Renderiza a página (PyMuPDF)
     2. Detecta placeholders {xxx} com pytesseract
     3. Armazena posição, fonte, cor
     4. Remove texto
     5. Reinsere valores novos
-    6. Reconstrói PDF
+    6. Codifica a página no PDF de saída
     """
     
-    def __init__(self, pdf_path: str, dpi: int = 300):
-        """
-        Args:
-            pdf_path: caminho do PDF de entrada
-            dpi: resolução para conversão (300 = alta qualidade)
-        """
-        self.pdf_path = pdf_path
-        self.dpi = dpi
-        self.pages_images = []
-        self.pages_metadata = []
-    
-    def converter_pdf_para_imagens(self) -> List[Image.Image]:
-        """Converte PDF em imagens PIL"""
-        print(f"📄 Convertendo PDF para imagens... DPI={self.dpi}")
-        
-        try:
-            images = convert_from_path(self.pdf_path, dpi=self.dpi)
-            self.pages_images = images
-            print(f"✅ {len(images)} página(s) convertida(s)")
-            return images
-        except Exception as e:
-            print(f"❌ Erro ao converter PDF: {e}")
-            return []
-    
     def detectar_placeholders_pytesseract(self, pil_image: Image.Image) -> List[PlaceholderMetadata]:
-        """Detecta placeholders com pytesseract"""
+        """Detecta placeholders com Tesseract (handle persistente ou pytesseract, ver motor_ocr)"""
+        import cv2
+        from motor_ocr import obter_motor_ocr
+        
         # Converter PIL para OpenCV
         cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
         gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
@@ -86,11 +59,14 @@ class PDFPlaceholderProcessor:
         print("  🔍 Detectando placeholders com pytesseract...")
         
         try:
-            dados = pytesseract.image_to_data(
-                gray, 
-                output_type=pytesseract.Output.DICT,
-                lang='por'
-            )
+            if self.ocr_duas_etapas:
+                # Chaves na página reduzida; Tesseract só nos recortes
+                from ocr_regioes import encontrar_regioes_candidatas, ocr_tesseract_regioes
+                regioes = encontrar_regioes_candidatas(gray)
+                print(f"  🔍 {len(regioes)} região(ões) candidata(s)")
+                dados = ocr_tesseract_regioes(gray, regioes, lang='por')
+            else:
+                dados = obter_motor_ocr().image_to_data(gray, lang='por')
         except Exception as e:
             print(f"  ⚠️  Erro no OCR: {e}")
             return []
@@ -104,7 +80,7 @@ class PDFPlaceholderProcessor:
                 y = dados['top'][i]
                 w = dados['width'][i]
                 h = dados['height'][i]
-                conf = dados['confidence'][i]
+                conf = float(dados['conf'][i])
                 
                 if conf < 10:  # Confiança muito baixa
                     continue
@@ -139,6 +115,8 @@ class PDFPlaceholderProcessor:
                                      metadata: PlaceholderMetadata,
                                      margem: int = 5) -> Image.Image:
         """Remove placeholder usando inpainting"""
+        import cv2
+        
         cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
         
         # Criar máscara
@@ -161,14 +139,30 @@ class PDFPlaceholderProcessor:
         
         return resultado_pil
     
-    def processar_pagina(self, page_num: int) -> Tuple[Image.Image, List[PlaceholderMetadata]]:
-        """Processa uma página"""
-        print(f"\n📖 Processando página {page_num + 1}...")
-        
-        pil_image = self.pages_images[page_num]
+    def detectar_hibrido(self) -> Optional[List[List[PlaceholderMetadata]]]:
+        """
+        Placeholders de todas as páginas pela camada de texto, com OCR (Tesseract)
+        só nas páginas escaneadas e imagens grandes; None se indisponível
+        """
+        try:
+            from deteccao_hibrida import DetectorHibrido
+            por_pagina = DetectorHibrido(dpi_ocr=self.dpi).detectar(self.pdf_path)
+        except Exception as e:
+            print(f"  ⚠️  Detecção híbrida indisponível ({e}); OCR em todas as páginas")
+            return None
         
+        return self.metadados_hibridos(por_pagina, 100.0)
+    
+    def limpar_pagina(self, pil_image: Image.Image,
+                      placeholders: Optional[List[PlaceholderMetadata]] = None
+                      ) -> Tuple[Image.Image, List[PlaceholderMetadata]]:
+        """
+        Detecta (se `placeholders` não vier pronto) e remove os placeholders de
+        uma imagem (sem estado: roda em outro processo)
+        """
         # Detectar
-        placeholders = self.detectar_placeholders_pytesseract(pil_image)
+        if placeholders is None:
+            placeholders = self.detectar_placeholders_pytesseract(pil_image)
         
         if not placeholders:
             return pil_image, []
@@ -180,7 +174,15 @@ class PDFPlaceholderProcessor:
         for placeholder in placeholders:
             imagem_limpa = self.remover_placeholder_em_imagem(imagem_limpa, placeholder)
         
-        # Armazenar metadados
+        return imagem_limpa, placeholders
+    
+    def processar_pagina(self, page_num: int) -> Tuple[Image.Image, List[PlaceholderMetadata]]:
+        """Processa uma página"""
+        print(f"\n📖 Processando página {page_num + 1}...")
+        
+        imagem_limpa, placeholders = self.limpar_pagina(self.pages_images[page_num])
+        
+        # Armazenar metadados (também sem placeholders: reinserer_valores pareia por página)
         self.pages_metadata.append({
             'page': page_num,
             'placeholders': [p.to_dict() for p in placeholders]
@@ -190,129 +192,123 @@ class PDFPlaceholderProcessor:
         
         return imagem_limpa, placeholders
     
-    def processar_todas_paginas(self) -> List[Image.Image]:
-        """Processa todas as páginas"""
-        print("\n" + "="*60)
-        print("PROCESSANDO TODAS AS PÁGINAS")
-        print("="*60)
-        
-        imagens_processadas = []
+    def processar_todas_paginas(self, workers: Optional[int] = None) -> List[Image.Image]:
+        """
+        Processa todas as páginas
         
-        for i in range(len(self.pages_images)):
-            imagem_limpa, _ = self.processar_pagina(i)
-            imagens_processadas.append(imagem_limpa)
+        Com detecção híbrida, a camada de texto dá os placeholders e o OCR
+        roda só nas páginas sem ela. Cada página vai para um processo do pool
+        (Tesseract, se preciso, e inpainting em paralelo); resultados e
+        metadados voltam na ordem das páginas.
         
-        return imagens_processadas
-    
-    def reinserer_valores(self, imagens_limpas: List[Image.Image],
-                         placeholders_valores: Dict[str, str]) -> List[Image.Image]:
-        """Reinsere valores"""
+        Args:
+            workers: processos do pool (None = um por núcleo; 1 = sequencial)
+        """
         print("\n" + "="*60)
-        print("REINSERINDO VALORES")
+        print("PROCESSANDO TODAS AS PÁGINAS")
         print("="*60)
         
-        imagens_finais = []
+        detectados = self.detectar_hibrido() if self.deteccao_hibrida else None
+        if detectados is None:
+            detectados = [None] * len(self.pages_images)  # OCR em cada página
+        
+        workers = workers_paginas(workers, len(self.pages_images))
+        resultados = None
+        
+        if workers > 1:
+            print(f"  ⚡ {len(self.pages_images)} página(s) em {workers} processo(s)")
+            try:
+                with ProcessPoolExecutor(max_workers=workers,
+                                         initializer=_iniciar_processo_ocr) as executor:
+                    resultados = list(executor.map(
+                        _limpar_pagina_em_processo,
+                        self.pages_images,
+                        [self.ocr_duas_etapas] * len(self.pages_images),
+                        detectados))
+            except (OSError, BrokenProcessPool) as e:
+                # Ambientes sem fork/semáforos (alguns serverless): segue sequencial
+                print(f"  ⚠️  Pool de processos indisponível ({e}); processando em sequência")
+        
+        if resultados is None:
+            resultados = [self.limpar_pagina(img, ph) for img, ph in zip(self.pages_images, detectados)]
+        
+        self.pages_metadata = [
+            {'page': i, 'placeholders': [p.to_dict() for p in placeholders]}
+            for i, (_, placeholders) in enumerate(resultados)
+        ]
+        
+        return [imagem_limpa for imagem_limpa, _ in resultados]
+    
+    def limpar_em_fluxo(self, detectados: Optional[List[List[PlaceholderMetadata]]] = None,
+                        workers: int = 1
+                        ) -> Iterator[Tuple[Image.Image, List[PlaceholderMetadata]]]:
+        """
+        (imagem limpa, placeholders) de cada página, na ordem das páginas
         
-        for page_num, (imagem_limpa, metadata_page) in enumerate(
-            zip(imagens_limpas, self.pages_metadata)):
-            
-            print(f"\n📝 Página {page_num + 1}: Inserindo valores...")
-            
-            imagem_final = imagem_limpa.copy()
-            draw = ImageDraw.Draw(imagem_final)
-            
-            for placeholder_info in metadata_page['placeholders']:
-                placeholder_key = placeholder_info['text']
-                
-                if placeholder_key in placeholders_valores:
-                    valor = placeholders_valores[placeholder_key]
-                    
-                    x = placeholder_info['x']
-                    y = placeholder_info['y']
-                    font_size = placeholder_info['font_size']
-                    color = tuple(placeholder_info['color'])
-                    
-                    # Carregar fonte
-                    try:
-                        font_paths = [
-                            "arial.ttf",
-                            "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-                            "/System/Library/Fonts/Arial.ttf",
-                            "C:\\Windows\\Fonts\\arial.ttf",
-                        ]
-                        
-                        fonte = None
-                        for font_path in font_paths:
-                            if os.path.exists(font_path):
-                                fonte = ImageFont.truetype(font_path, font_size)
-                                break
-                        
-                        if fonte is None:
-                            fonte = ImageFont.load_default()
-                    except:
-                        fonte = ImageFont.load_default()
-                    
-                    # Desenhar
-                    draw.text((x, y), valor, fill=color, font=fonte)
-                    
-                    print(f"  ✓ {placeholder_key} → '{valor}'")
-                else:
-                    print(f"  ⚠️  Valor não informado para {placeholder_key}")
-            
-            imagens_finais.append(imagem_final)
+        A próxima página só é renderizada quando há vaga no pool: no máximo
+        `workers` páginas em processamento, mais a entregue ao consumidor.
+        Se o pool de processos falhar, as páginas seguem em sequência.
         
-        return imagens_finais
-    
-    def salvar_pdf(self, imagens: List[Image.Image], caminho_saida: str):
-        """Salva PDF"""
-        print("\n" + "="*60)
-        print("RECONSTRUINDO PDF")
-        print("="*60)
+        Args:
+            detectados: placeholders por página (None = OCR em cada página)
+            workers: páginas processadas ao mesmo tempo (1 = sequencial)
+        """
+        executor = None
+        if workers > 1:
+            try:
+                executor = ProcessPoolExecutor(max_workers=workers,
+                                               initializer=_iniciar_processo_ocr)
+                print(f"  ⚡ Até {workers} página(s) em {workers} processo(s)")
+            except OSError as e:
+                # Ambientes sem fork/semáforos (alguns serverless): segue sequencial
+                print(f"  ⚠️  Pool de processos indisponível ({e}); processando em sequência")
+        
+        pendentes = deque()  # (imagem, placeholders, futuro) na ordem das páginas
+        
+        def proxima():
+            imagem, placeholders, futuro = pendentes.popleft()
+            if futuro is not None:
+                try:
+                    return futuro.result()
+                except BrokenProcessPool:
+                    pass  # pool caiu: a página é refeita neste processo
+            return self.limpar_pagina(imagem, placeholders)
         
         try:
-            imagens_rgb = [
-                img.convert('RGB') if img.mode != 'RGB' else img
-                for img in imagens
-            ]
-            
-            imagens_rgb[0].save(
-                caminho_saida,
-                save_all=True,
-                append_images=imagens_rgb[1:] if len(imagens_rgb) > 1 else [],
-                quality=95
-            )
-            
-            tamanho_mb = os.path.getsize(caminho_saida) / 1024 / 1024
-            print(f"✅ PDF salvo: {caminho_saida}")
-            print(f"   Tamanho: {tamanho_mb:.2f} MB")
+            for i, imagem in self.iterar_paginas():
+                placeholders = detectados[i] if detectados else None
+                futuro = None
+                if executor is not None:
+                    try:
+                        futuro = executor.submit(_limpar_pagina_em_processo, imagem,
+                                                 self.ocr_duas_etapas, placeholders)
+                    except (OSError, BrokenProcessPool) as e:
+                        print(f"  ⚠️  Pool de processos indisponível ({e}); processando em sequência")
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        executor = None
+                pendentes.append((imagem, placeholders, futuro))
+                
+                while len(pendentes) >= (workers if executor is not None else 1):
+                    yield proxima()
             
-        except Exception as e:
-            print(f"❌ Erro ao salvar PDF: {e}")
+            while pendentes:
+                yield proxima()
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
     
     def processar_completo(self, placeholders_valores: Dict[str, str],
-                          caminho_saida: str):
-        """Executa fluxo completo"""
+                          caminho_saida: Destino = None,
+                          workers: Optional[int] = None) -> Optional[bytes]:
+        """Executa fluxo completo; retorna os bytes do PDF (None em caso de erro)"""
         tempo_inicio = datetime.now()
         
         print("\n" + "🚀 "*30)
         print("PROCESSAMENTO COMPLETO - PYTESSERACT")
         print("🚀 "*30 + "\n")
         
-        # A. Converter
-        self.converter_pdf_para_imagens()
-        
-        if not self.pages_images:
-            print("❌ Erro: Nenhuma imagem convertida")
-            return False
-        
-        # B. Processar
-        imagens_limpas = self.processar_todas_paginas()
-        
-        # C. Reinserer
-        imagens_finais = self.reinserer_valores(imagens_limpas, placeholders_valores)
-        
-        # D. Salvar
-        self.salvar_pdf(imagens_finais, caminho_saida)
+        # Renderizar, processar e codificar uma página por vez
+        pdf_bytes = self.processar_em_fluxo(placeholders_valores, caminho_saida, workers)
         
         tempo_total = (datetime.now() - tempo_inicio).total_seconds()
         
@@ -321,7 +317,7 @@ class PDFPlaceholderProcessor:
         print(f"⏱️  Tempo total: {tempo_total:.2f}s")
         print("✅ "*30)
         
-        return True
+        return pdf_bytes
 # ```
 
 # ---
@@ -349,7 +345,7 @@ class PDFPlaceholderProcessor:
 # ## 📦 Dependências (MÍNIMAS)
 
 # ```bash
-# pip install pdf2image pillow opencv-python pytesseract
+# pip install pymupdf pillow opencv-python pytesseract
 # ```
 
 # ---
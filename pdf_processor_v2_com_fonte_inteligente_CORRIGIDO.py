@@ -2,13 +2,27 @@
 # VERSÃO INTELIGENTE CORRIGIDA - Pixmap compatível com PyMuPDF 1.24+
 
 import fitz  # PyMuPDF
-import cv2
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
-import os
 import re
-from typing import Dict, List, Tuple
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 from dataclasses import dataclass
+from functools import partial
+
+from pagina_raster import (PaginaRaster, ImagemRaster, renderizar_pagina, escolher_dpi,
+                           obter_pixels, dpi_da_imagem,
+                           cor_media_rgb, luminancia_media, inpaint_regioes,
+                           desenhar_texto)
+from entrada_saida_pdf import (Origem, Destino, abrir_pdf, normalizar_origem,
+                               descrever_origem, persistir)
+from artefatos_debug import SinkArtefatos, obter_sink, sobrepor_retangulos
+from ajuste_texto import MedidorPIL, ajustar_texto, FATOR_TAMANHO_MINIMO
+from analise_template import AnaliseTemplate, analisar_template
+from paginas_paralelas import TarefaPagina, processar_em_paralelo, montar_tarefas
+from camadas_preenchimento import separar_camadas, chave_camada, paginas_em_camadas
+from cache_paginas import paginas_com_cache
+from codificador_pdf import (inserir_pagina_raster, RelatorioCodificacao,
+                             SAIDA_SEM_PERDAS)
 
 
 @dataclass
@@ -21,13 +35,14 @@ class PlaceholderInfo:
     font: str
     size: float
     color: tuple
+    livre: Tuple[float, float]   # (largura, altura) livres para o valor, em pt (caixa_livre)
 
 
 # ============================================================================
 # FUNÇÃO AUXILIAR: DETECTAR BRILHO DO FUNDO
 # ============================================================================
 
-def detectar_brilho_fundo(imagem_bgr: np.ndarray, bbox: Tuple[float, float, float, float], 
+def detectar_brilho_fundo(imagem_rgb: np.ndarray, bbox: Tuple[float, float, float, float], 
                          dpi_scale: float) -> Tuple[float, str]:
     """
     Detecta o brilho do fundo em uma região e retorna:
@@ -41,27 +56,16 @@ def detectar_brilho_fundo(imagem_bgr: np.ndarray, bbox: Tuple[float, float, floa
     
     x0_px = max(0, int(x0 * dpi_scale) - 5)
     y0_px = max(0, int(y0 * dpi_scale) - 5)
-    x1_px = min(imagem_bgr.shape[1], int(x1 * dpi_scale) + 5)
-    y1_px = min(imagem_bgr.shape[0], int(y1 * dpi_scale) + 5)
+    x1_px = min(imagem_rgb.shape[1], int(x1 * dpi_scale) + 5)
+    y1_px = min(imagem_rgb.shape[0], int(y1 * dpi_scale) + 5)
     
-    regiao = imagem_bgr[y0_px:y1_px, x0_px:x1_px]
+    regiao = imagem_rgb[y0_px:y1_px, x0_px:x1_px]
     
     if regiao.size == 0:
         return 128, 'preto'
     
-    # Extrair canais BGR
-    b, g, r = cv2.split(regiao)
-    
-    # Calcular luminância (converter para escala 0-1 para cálculo)
-    r_norm = r.astype(float) / 255.0
-    g_norm = g.astype(float) / 255.0
-    b_norm = b.astype(float) / 255.0
-    
-    # Fórmula de luminância relativa (RGB)
-    luminancia = 0.299 * r_norm + 0.587 * g_norm + 0.114 * b_norm
-    
-    # Brilho médio (0-255)
-    brilho_medio = np.mean(luminancia) * 255.0
+    # Brilho médio (0-255) no espaço da página (RGB ou cinza)
+    brilho_medio = luminancia_media(regiao)
     
     # Limiar: se brilho > 128, é claro (usar texto preto), senão usar branco
     cor_texto = 'preto' if brilho_medio > 128 else 'branco'
@@ -77,43 +81,27 @@ def obter_cor_contraste(cor_texto: str) -> Tuple[int, int, int]:
         return (255, 255, 255)  # RGB branco
 
 
-# ============================================================================
-# FUNÇÃO AUXILIAR: ENCONTRAR ARQUIVO DE FONTE
-# ============================================================================
-
-def encontrar_arquivo_fonte(nome_fonte: str = "PlusJakartaSans-Regular", fonts_dir: str = "./fonts") -> str:
-    """Procura pela fonte em vários locais"""
-    
-    locais_possiveis = [
-        f"{fonts_dir}/{nome_fonte}.ttf",
-        f"{fonts_dir}/{nome_fonte}.otf",
-        f"C:\\Windows\\Fonts\\{nome_fonte}.ttf",
-        f"/usr/share/fonts/truetype/{nome_fonte.lower()}/{nome_fonte}.ttf",
-        f"/Library/Fonts/{nome_fonte}.ttf",
-    ]
-    
-    for caminho in locais_possiveis:
-        if os.path.exists(caminho):
-            return caminho
-    
-    return None
-
-
 # ============================================================================
 # FUNÇÃO 1: OBTER COORDENADAS
 # ============================================================================
 
-def obter_coordenadas(pdf_path: str, placeholders_valores: Dict[str, str]) -> List[PlaceholderInfo]:
-    """Extrai coordenadas exatas de todos os placeholders no PDF"""
+def obter_coordenadas(pdf_path: Origem, placeholders_valores: Dict[str, str],
+                      analise: Optional[AnaliseTemplate] = None) -> List[PlaceholderInfo]:
+    """
+    Extrai coordenadas exatas de todos os placeholders no PDF
+
+    Os spans vêm da análise do template (ver analise_template): a camada de
+    texto só é extraída na primeira vez que o template aparece.
+    """
     
     print("\n" + "="*80)
     print("FUNÇÃO 1: OBTER COORDENADAS")
     print("="*80)
     
-    doc = fitz.open(pdf_path)
+    analise = analise or analisar_template(pdf_path)
     placeholders_encontrados = []
     
-    print(f"📄 PDF: {pdf_path} ({len(doc)} página(s))")
+    print(f"📄 PDF: {descrever_origem(pdf_path)} ({analise.paginas} página(s))")
     print(f"🔍 Procurando placeholders...\n")
     
     placeholders_limpos = {}
@@ -121,64 +109,41 @@ def obter_coordenadas(pdf_path: str, placeholders_valores: Dict[str, str]) -> Li
         chave_limpa = k.strip().strip('{}')
         placeholders_limpos[chave_limpa] = v
     
-    for page_num in range(len(doc)):
-        page = doc[page_num]
+    for page_num in range(analise.paginas):
         page_count = 0
         
-        try:
-            blocos = page.get_text("dict")["blocks"]
-        except:
-            print(f"  ⚠️  Página {page_num+1}: erro ao extrair blocos")
-            continue
-        
-        for bloco in blocos:
-            if "lines" not in bloco:
-                continue
+        for span in analise.spans_pagina(page_num):
+            texto = span["text"]
+            nome_limpo = re.search(r'{(.*?)}', texto).group(1).strip()
             
-            for linha in bloco["lines"]:
-                for span in linha["spans"]:
-                    texto = span["text"]
+            for chave_entrada, valor in placeholders_limpos.items():
+                if chave_entrada in nome_limpo or nome_limpo.startswith(chave_entrada):
+                    bbox = tuple(span["bbox"])
+                    
+                    ph = PlaceholderInfo(
+                        nome=texto,
+                        valor=valor,
+                        bbox=bbox,
+                        page=page_num,
+                        font=span["font"],
+                        size=span["size"],
+                        color=span["color"],
+                        livre=tuple(span["livre"])
+                    )
                     
-                    if '{' in texto and '}' in texto:
-                        match = re.search(r'{(.*?)}', texto)
-                        if not match:
-                            continue
-                        
-                        nome_completo = match.group(1)
-                        nome_limpo = nome_completo.strip()
-                        
-                        for chave_entrada, valor in placeholders_limpos.items():
-                            if chave_entrada in nome_limpo or nome_limpo.startswith(chave_entrada):
-                                bbox = span["bbox"]
-                                font = span.get("font", "Arial")
-                                size = span.get("size", 12.0)
-                                color = span.get("color", 0)
-                                
-                                ph = PlaceholderInfo(
-                                    nome=texto,
-                                    valor=valor,
-                                    bbox=bbox,
-                                    page=page_num,
-                                    font=font,
-                                    size=size,
-                                    color=color
-                                )
-                                
-                                placeholders_encontrados.append(ph)
-                                page_count += 1
-                                
-                                x0, y0, x1, y1 = bbox
-                                print(f"  ✓ Pág {page_num+1}: '{texto[:40]}{'...' if len(texto) > 40 else ''}'")
-                                print(f"    → Valor: '{valor}' | Bbox: ({x0:.1f}, {y0:.1f})")
-                                break
+                    placeholders_encontrados.append(ph)
+                    page_count += 1
+                    
+                    x0, y0, x1, y1 = bbox
+                    print(f"  ✓ Pág {page_num+1}: '{texto[:40]}{'...' if len(texto) > 40 else ''}'")
+                    print(f"    → Valor: '{valor}' | Bbox: ({x0:.1f}, {y0:.1f})")
+                    break
         
         if page_count > 0:
             print(f"\n  📊 Página {page_num+1}: {page_count} placeholder(s) encontrado(s)")
         else:
             print(f"  📊 Página {page_num+1}: nenhum placeholder")
     
-    doc.close()
-    
     print(f"\n✅ Total encontrado: {len(placeholders_encontrados)} placeholder(s)")
     print("="*80 + "\n")
     
@@ -189,35 +154,83 @@ def obter_coordenadas(pdf_path: str, placeholders_valores: Dict[str, str]) -> Li
 # FUNÇÃO 2: GERAR IMAGEM COM DESTAQUE
 # ============================================================================
 
-def gerar_imagem(pdf_path: str, placeholders_info: List[PlaceholderInfo], 
-                 dpi: int = 300, output_dir: str = "./output") -> Dict[int, np.ndarray]:
-    """Renderiza PDF em imagens com destaque dos placeholders"""
+def gerar_imagem(pdf_path: Origem, placeholders_info: List[PlaceholderInfo], 
+                 dpi: int = 300, sink: Optional[SinkArtefatos] = None,
+                 perfil_cor: str = "rgb",
+                 dpi_adaptativo: bool = True,
+                 todas_paginas: bool = False) -> Dict[int, PaginaRaster]:
+    """
+    Renderiza TODAS as páginas de uma vez (ver iterar_imagens)
+
+    Mantém todas as páginas em memória: o pipeline usa iterar_imagens.
+    """
+    return dict(iterar_imagens(pdf_path, placeholders_info, dpi, sink,
+                               perfil_cor, dpi_adaptativo, todas_paginas))
+
+
+def iterar_imagens(pdf_path: Origem, placeholders_info: List[PlaceholderInfo], 
+                   dpi: int = 300, sink: Optional[SinkArtefatos] = None,
+                   perfil_cor: str = "rgb",
+                   dpi_adaptativo: bool = True,
+                   todas_paginas: bool = False,
+                   tarefas: Optional[List[TarefaPagina]] = None) -> Iterator[Tuple[int, PaginaRaster]]:
+    """
+    Renderiza PDF em imagens com destaque dos placeholders, UMA página por vez
+
+    Gera (page_num, PaginaRaster) na ordem das páginas; a próxima só é
+    renderizada quando o consumidor pede (memória de uma página por vez)
+
+    Cada página vira um PaginaRaster: buffer único sobre o Pixmap,
+    alterado no lugar pelas funções 3, 4 e 5 (sem cópias de página inteira)
+
+    perfil_cor: "rgb" (padrão), "cinza", "1bit" ou "auto" (detectado por página;
+                pode binarizar páginas com logos e carimbos: só sob pedido)
+    dpi_adaptativo: escolhe o DPI de cada página pela menor fonte relevante
+                    (ver escolher_dpi); `dpi` passa a ser o limite superior
+    sink: destino dos artefatos de depuração (padrão: nulo). O destaque é
+          desenhado numa cópia e só quando o sink consome o artefato.
+    todas_paginas: por padrão só as páginas com placeholders são renderizadas;
+                   as demais seguem vetoriais para o PDF final (ver gerar_pdf)
+    tarefas: (page_num, dpi, perfil) já escolhidos (ver montar_tarefas): só
+             essas páginas, sem escolher o DPI de novo
+    """
     
     print("="*80)
     print("FUNÇÃO 2: GERAR IMAGEM COM DESTAQUE")
     print("="*80)
     
-    os.makedirs(output_dir, exist_ok=True)
+    sink = obter_sink(sink)
     
-    doc = fitz.open(pdf_path)
-    dpi_scale = dpi / 72.0
-    imagens = {}
+    doc = abrir_pdf(pdf_path)
+    total = 0
     
-    print(f"🖼️  Renderizando {len(doc)} página(s) em DPI {dpi}...\n")
+    paginas_com_placeholders = {p.page for p in placeholders_info}
+    paginas = [n for n in range(len(doc)) if todas_paginas or n in paginas_com_placeholders]
+    escolhidas = {}
+    if tarefas is not None:
+        escolhidas = {page_num: (dpi_pagina, perfil) for page_num, dpi_pagina, perfil in tarefas}
+        paginas = sorted(escolhidas)
     
-    for page_num in range(len(doc)):
+    modo_dpi = f"adaptativo (máx. {dpi})" if dpi_adaptativo else str(dpi)
+    print(f"🖼️  Renderizando {len(paginas)} de {len(doc)} página(s) em DPI {modo_dpi}...\n")
+    
+    for page_num in paginas:
         page = doc[page_num]
         
-        mat = fitz.Matrix(dpi_scale, dpi_scale)
-        pix = page.get_pixmap(matrix=mat, alpha=False)
-        img_pil = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        page_placeholders = [p for p in placeholders_info if p.page == page_num]
         
-        img_cv = cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
+        dpi_pagina, perfil_pagina = escolhidas.get(page_num, (dpi, perfil_cor))
+        if dpi_adaptativo and page_num not in escolhidas:
+            dpi_pagina = escolher_dpi(page, [p.size for p in page_placeholders], dpi)
+        dpi_scale = dpi_pagina / 72.0
         
-        page_placeholders = [p for p in placeholders_info if p.page == page_num]
+        pagina = renderizar_pagina(page, dpi_pagina, perfil_pagina)
+        img_rgb = pagina.pixels
         
-        print(f"📄 Página {page_num+1}: {len(page_placeholders)} placeholder(s)")
+        print(f"📄 Página {page_num+1}: {len(page_placeholders)} placeholder(s) | "
+              f"Perfil: {pagina.perfil} | DPI: {dpi_pagina}")
         
+        retangulos = []
         for ph in page_placeholders:
             x0, y0, x1, y1 = ph.bbox
             
@@ -226,48 +239,50 @@ def gerar_imagem(pdf_path: str, placeholders_info: List[PlaceholderInfo],
             x1_px = int(x1 * dpi_scale)
             y1_px = int(y1 * dpi_scale)
             
-            cv2.rectangle(img_cv, (x0_px, y0_px), (x1_px, y1_px), 
-                         (0, 255, 255), 1)
+            retangulos.append((x0_px, y0_px, x1_px, y1_px))
         
-        imagem_path = os.path.join(output_dir, f"page_{page_num+1}_destaque.png")
-        cv2.imwrite(imagem_path, img_cv)
+        # Destaque amarelo numa CÓPIA: o buffer da página segue limpo até o PDF
+        imagem_path = sink.registrar(f"page_{page_num+1}_destaque",
+                                     lambda: sobrepor_retangulos(img_rgb, retangulos))
         
-        imagens[page_num] = img_cv
+        if imagem_path:
+            print(f"  💾 Salvo: {imagem_path}")
+        print()
         
-        print(f"  💾 Salvo: {imagem_path}\n")
+        total += 1
+        yield page_num, pagina
     
     doc.close()
     
-    print(f"✅ Total de imagens: {len(imagens)}")
+    print(f"✅ Total de imagens: {total}")
     print("="*80 + "\n")
-    
-    return imagens
 
 
 # ============================================================================
 # FUNÇÃO 3: REMOVER TEXTOS COM INPAINTING
 # ============================================================================
 
-def remover_textos(imagem_input, placeholders_info: List[PlaceholderInfo],
+def remover_textos(imagem_input: ImagemRaster, placeholders_info: List[PlaceholderInfo],
                    page_num: int, dpi: int = 300,
-                   output_dir: str = "./output") -> Tuple[np.ndarray, Dict[str, tuple]]:
-    """Remove textos usando inpainting (algoritmo Telea)"""
+                   sink: Optional[SinkArtefatos] = None) -> Tuple[np.ndarray, Dict[str, tuple]]:
+    """
+    Remove textos usando inpainting (algoritmo Telea)
+
+    O buffer RGB recebido é alterado no lugar; só as regiões dos
+    placeholders (com borda de contexto) passam pelo OpenCV.
+    """
     
     print("="*80)
     print(f"FUNÇÃO 3: REMOVER TEXTOS (Página {page_num+1})")
     print("="*80)
     
-    os.makedirs(output_dir, exist_ok=True)
-    
-    if isinstance(imagem_input, str):
-        img = cv2.imread(imagem_input)
-    else:
-        img = imagem_input.copy()
+    sink = obter_sink(sink)
     
-    img_original = img.copy()
+    img = obter_pixels(imagem_input)
+    dpi = dpi_da_imagem(imagem_input, dpi)
     dpi_scale = dpi / 72.0
     
-    mask = np.zeros(img.shape[:2], dtype=np.uint8)
+    regioes = []
     
     page_placeholders = [p for p in placeholders_info if p.page == page_num]
     
@@ -289,25 +304,20 @@ def remover_textos(imagem_input, placeholders_info: List[PlaceholderInfo],
         x1_px = min(img.shape[1], x1_px + margin)
         y1_px = min(img.shape[0], y1_px + margin)
         
-        regiao = img_original[y0_px:y1_px, x0_px:x1_px]
-        if regiao.size > 0:
-            cor_media_bgr = cv2.mean(regiao)[:3]
-            cores_extraidas[ph.nome] = tuple(int(c) for c in cor_media_bgr)
-        else:
-            cores_extraidas[ph.nome] = (0, 0, 0)
+        cores_extraidas[ph.nome] = cor_media_rgb(img[y0_px:y1_px, x0_px:x1_px])
         
-        cv2.rectangle(mask, (x0_px, y0_px), (x1_px, y1_px), 255, -1)
+        regioes.append((x0_px, y0_px, x1_px + 1, y1_px + 1))
         
         print(f"  ✓ Máscara criada para: {ph.nome[:40]}...")
     
     print("\n  🔧 Executando inpainting Telea...")
-    img_inpainted = cv2.inpaint(img, mask, 3, cv2.INPAINT_TELEA)
+    img_inpainted = inpaint_regioes(img, regioes, 3)
     
-    imagem_path = os.path.join(output_dir, f"page_{page_num+1}_inpainted.png")
-    cv2.imwrite(imagem_path, img_inpainted)
+    imagem_path = sink.registrar(f"page_{page_num+1}_inpainted", lambda: img_inpainted)
     
     print(f"\n✅ Inpainting concluído")
-    print(f"💾 Salvo: {imagem_path}")
+    if imagem_path:
+        print(f"💾 Salvo: {imagem_path}")
     print("="*80 + "\n")
     
     return img_inpainted, cores_extraidas
@@ -317,9 +327,9 @@ def remover_textos(imagem_input, placeholders_info: List[PlaceholderInfo],
 # FUNÇÃO 4: INSERIR TEXTOS COM DETECÇÃO INTELIGENTE DE COR
 # ============================================================================
 
-def inserir_textos_inteligente(imagem_input, placeholders_info: List[PlaceholderInfo],
+def inserir_textos_inteligente(imagem_input: ImagemRaster, placeholders_info: List[PlaceholderInfo],
                                page_num: int, cores_extraidas: Dict[str, tuple],
-                               dpi: int = 300, output_dir: str = "./output",
+                               dpi: int = 300, sink: Optional[SinkArtefatos] = None,
                                fonts_dir: str = "./fonts") -> np.ndarray:
     """
     Insere textos dos placeholders com DETECÇÃO AUTOMÁTICA de cor
@@ -331,26 +341,18 @@ def inserir_textos_inteligente(imagem_input, placeholders_info: List[Placeholder
     print(f"FUNÇÃO 4: INSERIR TEXTOS COM DETECÇÃO INTELIGENTE (Página {page_num+1})")
     print("="*80)
     
-    os.makedirs(output_dir, exist_ok=True)
-    
-    if isinstance(imagem_input, str):
-        img = cv2.imread(imagem_input)
-    else:
-        img = imagem_input.copy()
+    sink = obter_sink(sink)
     
-    # Converter BGR (OpenCV) → RGB (PIL)
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    img_pil = Image.fromarray(img_rgb)
-    draw = ImageDraw.Draw(img_pil)
+    # Buffer RGB da página: o texto é desenhado no lugar (sem BGR ↔ RGB)
+    img = obter_pixels(imagem_input)
     
+    dpi = dpi_da_imagem(imagem_input, dpi)
     dpi_scale = dpi / 72.0
     
     page_placeholders = [p for p in placeholders_info if p.page == page_num]
     
     print(f"✍️  Inserindo {len(page_placeholders)} texto(s) com cor inteligente...\n")
     
-    fontes_carregadas = {}
-    
     for ph in page_placeholders:
         x0, y0, x1, y1 = ph.bbox
         
@@ -363,61 +365,36 @@ def inserir_textos_inteligente(imagem_input, placeholders_info: List[Placeholder
         
         font_size = max(8, int(ph.size * dpi_scale * 0.8))
         
-        chave_fonte = f"{ph.font}_{font_size}"
-        
-        if chave_fonte not in fontes_carregadas:
-            if "Bold" in ph.font:
-                fonte_ttf = "PlusJakartaSans-Bold"
-            elif "Medium" in ph.font:
-                fonte_ttf = "PlusJakartaSans-Medium"
-            elif "SemiBold" in ph.font:
-                fonte_ttf = "PlusJakartaSans-SemiBold"
-            else:
-                fonte_ttf = "PlusJakartaSans-Regular"
-            
-            caminho_fonte = None
-            
-            if os.path.exists(fonts_dir):
-                for arquivo in os.listdir(fonts_dir):
-                    if fonte_ttf.lower() in arquivo.lower() and arquivo.endswith(('.ttf', '.otf')):
-                        caminho_fonte = os.path.join(fonts_dir, arquivo)
-                        break
-            
-            if not caminho_fonte:
-                caminho_fonte = encontrar_arquivo_fonte(fonte_ttf, fonts_dir)
-            
-            if caminho_fonte:
-                try:
-                    fonte = ImageFont.truetype(caminho_fonte, font_size)
-                except:
-                    fonte = ImageFont.load_default()
-            else:
-                fonte = ImageFont.load_default()
-            
-            fontes_carregadas[chave_fonte] = fonte
-        else:
-            fonte = fontes_carregadas[chave_fonte]
+        # Fonte do span original (índice compartilhado); valor ajustado ao espaço livre
+        # até o texto/imagem vizinho: quebra se houver espaço abaixo, senão reduz e,
+        # no limite, reticências (o texto começa font_size abaixo do topo da caixa)
+        medidor = MedidorPIL.do_span(ph.font, fonts_dir)
+        largura_livre, altura_livre = ph.livre
+        ajuste = ajustar_texto(ph.valor, medidor, largura_livre * dpi_scale, font_size,
+                               tamanho_min=max(8, int(font_size * FATOR_TAMANHO_MINIMO)),
+                               altura_max=altura_livre * dpi_scale - font_size, max_linhas=None)
+        fonte = medidor.fonte(ajuste.tamanho)
         
         # Inserir texto com cor inteligente
-        draw.text(
-            (x0_px, y0_px + font_size),
-            ph.valor,
-            fill=cor_rgb,
-            font=fonte
-        )
+        for i, linha in enumerate(ajuste.linhas):
+            desenhar_texto(img, (x0_px, y0_px + font_size + int(i * ajuste.altura_linha)),
+                           linha, fonte, cor_rgb)
+        if ajuste.tamanho < font_size:
+            print(f"  ↘️  {ph.nome[:30]}: ajustado à caixa ({font_size / dpi_scale:.1f}pt → "
+                  f"{ajuste.tamanho / dpi_scale:.1f}pt"
+                  f"{', com reticências' if ajuste.truncado else ''})")
         
         cor_nome = "PRETO" if cor_texto == 'preto' else "BRANCO"
         print(f"  ✓ {ph.nome[:30]}... = '{ph.valor}'")
         print(f"    → Brilho fundo: {brilho:.0f} | Cor: {cor_nome}")
     
-    # Converter de volta para BGR (OpenCV)
-    img_final = cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
+    img_final = img
     
-    imagem_path = os.path.join(output_dir, f"page_{page_num+1}_final_inteligente.png")
-    cv2.imwrite(imagem_path, img_final)
+    imagem_path = sink.registrar(f"page_{page_num+1}_final_inteligente", lambda: img_final)
     
     print(f"\n✅ Textos inseridos com detecção inteligente de cor")
-    print(f"💾 Salvo: {imagem_path}")
+    if imagem_path:
+        print(f"💾 Salvo: {imagem_path}")
     print("="*80 + "\n")
     
     return img_final
@@ -427,124 +404,255 @@ def inserir_textos_inteligente(imagem_input, placeholders_info: List[Placeholder
 # FUNÇÃO 5: GERAR PDF (CORRIGIDA - PyMuPDF 1.24+)
 # ============================================================================
 
-def gerar_pdf(imagens_dict: Dict[int, np.ndarray],
-              output_pdf: str = "./output/Contrato_Final.pdf") -> bool:
+def _copiar_paginas_vetoriais(doc: fitz.Document, origem: fitz.Document,
+                              inicio: int, fim: int) -> None:
+    """Páginas [inicio, fim) sem placeholders: copiadas do original, vetoriais e sem rasterizar"""
+    for page_num in range(inicio, fim):
+        doc.insert_pdf(origem, from_page=page_num, to_page=page_num)
+        print(f"  ↪ Página {page_num+1} copiada do original (vetorial)")
+
+
+def gerar_pdf(imagens: Union[Dict[int, ImagemRaster], Iterable[Tuple[int, ImagemRaster]]],
+              output_pdf: Destino = "./output/Contrato_Final.pdf",
+              perfil_saida: str = SAIDA_SEM_PERDAS,
+              pdf_origem: Optional[Origem] = None) -> Optional[RelatorioCodificacao]:
     """
     Converte imagens em PDF (Corrigido para PyMuPDF 1.24+)
     
     🔧 CORREÇÃO: Usando método compatível com versão recente do PyMuPDF
+    
+    perfil_saida: "sem_perdas", "jpeg" ou "mrc" (ver codificador_pdf)
+    output_pdf: caminho, stream ou função que recebe os bytes; None = só memória
+    imagens: {page_num: imagem} ou (page_num, imagem) em ordem crescente de
+             página; cada página é codificada assim que chega e o buffer dela
+             pode ser liberado (ver processar_paginas)
+    pdf_origem: PDF original; páginas ausentes de `imagens` são copiadas
+                dele como estão (vetoriais, sem rasterizar)
+    Returns: relatório com tempo de codificação, tamanho e os bytes do PDF,
+             ou None em caso de erro
     """
     
     print("="*80)
     print("FUNÇÃO 5: GERAR PDF")
     print("="*80)
     
-    os.makedirs(os.path.dirname(output_pdf) or ".", exist_ok=True)
-    
     try:
+        tempo_codificacao = 0.0
         doc = fitz.open()
         
-        print(f"📄 Convertendo {len(imagens_dict)} imagem(s) em PDF...\n")
+        origem = abrir_pdf(pdf_origem) if pdf_origem is not None else None
+        if isinstance(imagens, dict):
+            imagens = sorted(imagens.items())
+        proxima = 0  # primeira página do original ainda não escrita
         
-        for page_num in sorted(imagens_dict.keys()):
-            img_cv = imagens_dict[page_num]
-            
-            # Converter BGR → RGB
-            img_rgb = cv2.cvtColor(img_cv, cv2.COLOR_BGR2RGB)
-            
-            # Converter para PIL Image
-            img_pil = Image.fromarray(img_rgb)
-            
-            # Converter para numpy array
-            img_array = np.asarray(img_pil)
-            
-            # 🔧 CORREÇÃO: Método compatível com PyMuPDF 1.24+
-            # Usar fitz.Pixmap com construtor mais simples
-            height, width, channels = img_array.shape
-            
-            # Criar Pixmap do array RGB
-            pix = fitz.Pixmap(fitz.csRGB, (0, 0, width, height), img_array.tobytes())
+        print(f"📄 Convertendo imagens em PDF à medida que ficam prontas (perfil: {perfil_saida})...\n")
+        
+        for page_num, imagem in imagens:
+            if origem is not None:
+                _copiar_paginas_vetoriais(doc, origem, proxima, page_num)
+            proxima = page_num + 1
             
-            # Criar página com tamanho da imagem
-            page = doc.new_page(width=width, height=height)
+            inicio = time.perf_counter()
             
-            # Inserir imagem
-            page.insert_image(page.rect, pixmap=pix)
+            # Página criada com o tamanho original e codificada conforme os perfis
+            # de cor e de saída (Flate, JPEG ou MRC), direto do buffer da página
+            page = inserir_pagina_raster(doc, imagem, perfil_saida)
+            tempo_codificacao += time.perf_counter() - inicio
+            width, height = int(page.rect.width), int(page.rect.height)
             
-            print(f"  ✓ Página {page_num+1} inserida ({width}×{height}px)")
+            print(f"  ✓ Página {page_num+1} inserida ({width}×{height}pt)")
         
-        # Salvar PDF
-        doc.save(output_pdf, garbage=4, deflate=True)
-        doc.close()
+        if origem is not None:
+            _copiar_paginas_vetoriais(doc, origem, proxima, len(origem))
+            origem.close()
         
-        tamanho_mb = os.path.getsize(output_pdf) / 1024 / 1024
+        # PDF montado em memória; gravar é opcional (destino)
+        inicio = time.perf_counter()
+        total_paginas = len(doc)
+        dados = doc.tobytes(garbage=4, deflate=True)
+        doc.close()
+        tempo_codificacao += time.perf_counter() - inicio
+        persistir(dados, output_pdf)
+        
+        relatorio = RelatorioCodificacao(
+            perfil=perfil_saida,
+            paginas=total_paginas,
+            tempo_codificacao=tempo_codificacao,
+            tamanho_bytes=len(dados),
+            dados=dados
+        )
         
         print(f"\n✅ PDF gerado com sucesso!")
-        print(f"📄 {output_pdf}")
-        print(f"   Tamanho: {tamanho_mb:.2f} MB")
+        if isinstance(output_pdf, str):
+            print(f"📄 {output_pdf}")
+        print(f"   {relatorio.resumo()}")
         print("="*80 + "\n")
         
-        return True
+        return relatorio
         
     except Exception as e:
         print(f"\n❌ Erro ao gerar PDF: {e}")
         import traceback
         traceback.print_exc()
-        return False
+        return None
 
 
 # ============================================================================
 # FUNÇÃO AUXILIAR: PIPELINE COMPLETO COM DETECÇÃO INTELIGENTE
 # ============================================================================
 
-def processar_pdf_inteligente(pdf_path: str, placeholders_valores: Dict[str, str],
-                              output_pdf: str = "./output/Contrato_Final.pdf",
-                              dpi: int = 300, fonts_dir: str = "./fonts"):
-    """Executa o pipeline completo com detecção inteligente de cor"""
+def editar_pagina(placeholders_info: List[PlaceholderInfo], fonts_dir: str,
+                  pagina: PaginaRaster, sink: Optional[SinkArtefatos] = None) -> None:
+    """Funções 3 e 4 numa página renderizada (buffer alterado no lugar)"""
+    _, cores = remover_textos(pagina, placeholders_info, pagina.page_num, pagina.dpi, sink)
+    inserir_textos_inteligente(pagina, placeholders_info, pagina.page_num, cores, pagina.dpi,
+                               sink=sink, fonts_dir=fonts_dir)
+
+
+def processar_paginas(pdf_path: Origem, placeholders_info: List[PlaceholderInfo],
+                      dpi: int = 300, fonts_dir: str = "./fonts",
+                      perfil_cor: str = "rgb", dpi_adaptativo: bool = True,
+                      sink: Optional[SinkArtefatos] = None,
+                      workers: Optional[int] = 1,
+                      campos_fixos: Optional[Sequence[str]] = None,
+                      cache_paginas: bool = False,
+                      paginas: Optional[Set[int]] = None,
+                      analise: Optional[AnaliseTemplate] = None) -> Iterator[Tuple[int, PaginaRaster]]:
+    """
+    Funções 2, 3 e 4 por página: (page_num, página pronta) na ordem do PDF
+
+    A página é renderizada só quando o consumidor (gerar_pdf) pede a
+    próxima, e é liberada depois de codificada: o pico de memória não
+    cresce com o número de páginas.
+
+    workers: processos editando páginas ao mesmo tempo (None = um por
+             núcleo; 1 = sequencial). Os pixels voltam por memória
+             compartilhada (ver paginas_paralelas); artefatos de depuração
+             exigem o modo sequencial.
+    campos_fixos: campos preenchidos uma vez por template e valores (ex.:
+                  CAMPOS_CLINICA) e reaproveitados do cache de camadas; cada
+                  chamada só preenche os demais (ver camadas_preenchimento)
+    cache_paginas: páginas cujos valores não mudaram saem do cache de
+                   páginas prontas (ver cache_paginas); as páginas entregues
+                   passam a ser somente leitura
+    paginas: só estas páginas (padrão: todas as que têm placeholders)
+    analise: a do template (ver analise_template); DPIs e chaves de cache
+             saem dela, sem abrir o PDF nem refazer o hash
+    """
+    sink_consome = obter_sink(sink).consome
+    if workers != 1 and sink_consome:
+        print("⚠️  Artefatos de depuração exigem processamento sequencial (workers=1)\n")
+        workers = 1
+    if cache_paginas and sink_consome:
+        print("⚠️  Artefatos de depuração exigem o pipeline completo: cache de páginas desligado\n")
+        cache_paginas = False
+
+    analise = analise or analisar_template(pdf_path)
+
+    if cache_paginas:
+        tarefas = montar_tarefas(pdf_path, placeholders_info, dpi, perfil_cor, dpi_adaptativo,
+                                 analise)
+        produzir = lambda faltando: processar_paginas(
+            pdf_path, placeholders_info, dpi, fonts_dir, perfil_cor, dpi_adaptativo,
+            sink, workers, campos_fixos, paginas=faltando, analise=analise)
+        yield from paginas_com_cache(analise.hash_template, placeholders_info, tarefas,
+                                     produzir, __name__, fonts_dir, sorted(campos_fixos or ()))
+        return
+
+    selecionados = placeholders_info
+    if paginas is not None:
+        selecionados = [p for p in placeholders_info if p.page in paginas]
+
+    if campos_fixos:
+        # Camada fixa montada com TODAS as páginas: a mesma chave serve a qualquer subconjunto
+        fixos, variaveis = separar_camadas(placeholders_info, campos_fixos)
+        tarefas = montar_tarefas(pdf_path, placeholders_info, dpi, perfil_cor, dpi_adaptativo,
+                                 analise)
+        chave = chave_camada(analise.hash_template, fixos, tarefas, __name__, fonts_dir)
+        yield from paginas_em_camadas(pdf_path, tarefas,
+                                      partial(editar_pagina, fixos, fonts_dir),
+                                      partial(editar_pagina, variaveis, fonts_dir, sink=sink),
+                                      {p.page for p in variaveis}, chave, workers,
+                                      paginas=paginas)
+        return
+
+    if workers != 1:
+        tarefas = montar_tarefas(pdf_path, selecionados, dpi, perfil_cor, dpi_adaptativo,
+                                 analise)
+        yield from processar_em_paralelo(pdf_path, tarefas,
+                                         partial(editar_pagina, selecionados, fonts_dir),
+                                         workers)
+        return
+
+    # DPIs da análise do template: a página não é lida de novo para escolhê-los
+    tarefas = montar_tarefas(pdf_path, selecionados, dpi, perfil_cor, dpi_adaptativo, analise)
+    for page_num, pagina in iterar_imagens(pdf_path, selecionados, dpi,
+                                           sink=sink, perfil_cor=perfil_cor,
+                                           dpi_adaptativo=dpi_adaptativo,
+                                           tarefas=tarefas):
+        editar_pagina(selecionados, fonts_dir, pagina, sink)
+        yield page_num, pagina
+
+
+def processar_pdf_inteligente(pdf_path: Origem, placeholders_valores: Dict[str, str],
+                              output_pdf: Destino = "./output/Contrato_Final.pdf",
+                              dpi: int = 300, fonts_dir: str = "./fonts",
+                              perfil_cor: str = "rgb", dpi_adaptativo: bool = True,
+                              perfil_saida: str = SAIDA_SEM_PERDAS,
+                              sink: Optional[SinkArtefatos] = None,
+                              workers: Optional[int] = 1,
+                              campos_fixos: Optional[Sequence[str]] = None,
+                              cache_paginas: bool = False) -> Optional[bytes]:
+    """
+    Executa o pipeline completo com detecção inteligente de cor
+    
+    pdf_path: caminho, bytes ou stream do template
+    output_pdf: destino opcional (caminho, stream ou função); None = só memória
+    workers: processos editando páginas em paralelo (None = um por núcleo;
+             1 = sequencial); o PDF é montado na ordem das páginas
+    campos_fixos: campos da camada fixa, preenchida uma vez por template e
+                  valores (ex.: CAMPOS_CLINICA); None = tudo a cada chamada
+    cache_paginas: só renderiza as páginas cujos valores mudaram desde um
+                   preenchimento anterior (aditivos, reemissões)
+    Returns: bytes do PDF final, ou None se nada foi gerado
+    """
+    
+    pdf_path = normalizar_origem(pdf_path)  # streams lidos uma única vez
     
     print("\n" + "🚀 "*35)
     print("PIPELINE COMPLETO - PDF PROCESSOR V2 COM DETECÇÃO INTELIGENTE")
     print("🚀 "*35 + "\n")
     
-    placeholders_info = obter_coordenadas(pdf_path, placeholders_valores)
+    # Análise do template (spans e DPIs) do cache: um hash do template por chamada
+    analise = analisar_template(pdf_path)
+    placeholders_info = obter_coordenadas(pdf_path, placeholders_valores, analise)
     
     if not placeholders_info:
         print("❌ Nenhum placeholder encontrado!")
-        return False
+        return None
     
-    imagens_com_destaque = gerar_imagem(pdf_path, placeholders_info, dpi)
-    
-    imagens_finais = {}
-    
-    for page_num in sorted(imagens_com_destaque.keys()):
-        img_com_destaque = imagens_com_destaque[page_num]
-        
-        page_placeholders = [p for p in placeholders_info if p.page == page_num]
-        
-        if not page_placeholders:
-            print(f"\n⚠️  Página {page_num+1}: sem placeholders (copiando original)")
-            imagens_finais[page_num] = img_com_destaque
-        else:
-            img_inpainted, cores = remover_textos(
-                img_com_destaque, placeholders_info, page_num, dpi
-            )
-            
-            img_final = inserir_textos_inteligente(
-                img_inpainted, placeholders_info, page_num, cores, dpi, 
-                fonts_dir=fonts_dir
-            )
-            
-            imagens_finais[page_num] = img_final
+    # Funções 2 → 5 em fluxo: cada página é renderizada, editada e codificada
+    # antes da próxima; só as páginas com placeholders são renderizadas e as
+    # demais são copiadas vetoriais do original por gerar_pdf (pdf_origem)
+    paginas = processar_paginas(pdf_path, placeholders_info, dpi,
+                                fonts_dir=fonts_dir, perfil_cor=perfil_cor,
+                                dpi_adaptativo=dpi_adaptativo, sink=sink,
+                                workers=workers, campos_fixos=campos_fixos,
+                                cache_paginas=cache_paginas, analise=analise)
     
-    sucesso = gerar_pdf(imagens_finais, output_pdf)
+    relatorio = gerar_pdf(paginas, output_pdf,
+                          perfil_saida=perfil_saida, pdf_origem=pdf_path)
+    sucesso = relatorio is not None
     
     print("✅ "*35)
     if sucesso:
         print("PROCESSAMENTO CONCLUÍDO COM SUCESSO!")
-        print(f"📄 Arquivo final: {output_pdf}")
+        if isinstance(output_pdf, str):
+            print(f"📄 Arquivo final: {output_pdf}")
+        print(f"📦 {relatorio.resumo()}")
         print("🧠 Com detecção inteligente de cor (preto em fundos claros, branco em escuros)")
     else:
         print("PROCESSAMENTO FALHOU!")
     print("✅ "*35 + "\n")
     
-    return sucesso
+    return relatorio.dados if sucesso else None
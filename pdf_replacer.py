@@ -13,16 +13,14 @@ Uso:
 """
 
 import re
-import PyPDF2
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from io import BytesIO
 from typing import Dict, List, Tuple
 import logging
 
-logging.basicConfig(level=logging.INFO)
+from entrada_saida_pdf import Origem, Destino, abrir_binario, normalizar_origem, persistir
+
+# PyPDF2 e ReportLab são importados nos métodos que os usam (ver benchmark_importacao)
+
 logger = logging.getLogger(__name__)
 
 
@@ -57,14 +55,14 @@ class PDFPlaceholderReplacer:
         'DD/MM/AAAA': 'Data completa',
     }
     
-    def __init__(self, template_path: str):
+    def __init__(self, template_path: Origem):
         """
         Inicializa replacer com template PDF
         
         Args:
-            template_path: Caminho do arquivo PDF template
+            template_path: Caminho, bytes ou stream do PDF template
         """
-        self.template_path = template_path
+        self.template_path = normalizar_origem(template_path)
         self.pattern = re.compile(r'\{([^}]+)\}')
     
     def extract_placeholders(self) -> Dict[str, int]:
@@ -74,8 +72,10 @@ class PDFPlaceholderReplacer:
         Returns:
             Dict com placeholder: quantidade_de_ocorrências
         """
+        import PyPDF2
+        
         try:
-            with open(self.template_path, 'rb') as f:
+            with abrir_binario(self.template_path) as f:
                 reader = PyPDF2.PdfReader(f)
                 text = ""
                 for page in reader.pages:
@@ -115,7 +115,7 @@ class PDFPlaceholderReplacer:
         
         return is_valid, list(missing), list(extras)
     
-    def replace_and_get_pdf(self, data: Dict[str, str], output_path: str = None) -> bytes:
+    def replace_and_get_pdf(self, data: Dict[str, str], output_path: Destino = None) -> bytes:
         """
         Substitui placeholders e retorna PDF em bytes
         
@@ -123,7 +123,7 @@ class PDFPlaceholderReplacer:
         
         Args:
             data: Dict com {placeholder: valor_real}
-            output_path: (opcional) onde salvar o PDF
+            output_path: (opcional) caminho, stream ou função que recebe o PDF
         
         Returns:
             PDF em bytes (pronto para S3, email, etc)
@@ -136,9 +136,13 @@ class PDFPlaceholderReplacer:
             logger.warning(f"Campos faltando: {missing}")
             logger.warning(f"Campos extras (ignorados): {extras}")
         
+        import PyPDF2
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import letter
+        
         try:
             # 1. Carregar PDF original
-            with open(self.template_path, 'rb') as f:
+            with abrir_binario(self.template_path) as f:
                 reader = PyPDF2.PdfReader(f)
                 writer = PyPDF2.PdfWriter()
                 
@@ -180,8 +184,7 @@ class PDFPlaceholderReplacer:
                 
                 # 7. Salvar em arquivo se path fornecido
                 if output_path:
-                    with open(output_path, 'wb') as f:
-                        f.write(result_bytes)
+                    persistir(result_bytes, output_path)
                     logger.info(f"PDF salvo em: {output_path}")
                 
                 return result_bytes
@@ -268,6 +271,7 @@ class DatabaseToDataMapper:
 # ============================================================================
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     
     print("\n" + "="*70)
     print("EXEMPLO 1: Extrair placeholders do template")
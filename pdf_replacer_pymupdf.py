@@ -6,12 +6,18 @@ Instalação:
 pip install PyMuPDF
 """
 
-import fitz  # PyMuPDF
 from io import BytesIO
 import re
 import logging
 
-logging.basicConfig(level=logging.INFO)
+from entrada_saida_pdf import Origem, Destino, abrir_pdf, normalizar_origem, persistir
+from ajuste_texto import (MedidorBase14, ajustar_texto, caixa_livre, obstaculos_pagina,
+                          FATOR_TAMANHO_MINIMO)
+from atualizacao_incremental import DocumentoIncremental
+
+# PyMuPDF é importado no primeiro uso (abrir_pdf e métodos abaixo): importar
+# este módulo custa só o próprio módulo (ver benchmark_importacao)
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,12 +30,12 @@ class PDFPlaceholderReplacerMuPDF:
     - Este método (PyMuPDF): Encontra automaticamente onde está cada placeholder
     """
     
-    def __init__(self, template_path: str):
+    def __init__(self, template_path: Origem):
         """
         Args:
-            template_path: Caminho do template PDF
+            template_path: Caminho, bytes ou stream do template PDF
         """
-        self.template_path = template_path
+        self.template_path = normalizar_origem(template_path)
         self.pattern = re.compile(r'\{([^}]+)\}')
     
     def extract_placeholders(self) -> dict:
@@ -40,7 +46,7 @@ class PDFPlaceholderReplacerMuPDF:
             {placeholder_name: [lista de rects(x0, y0, x1, y1)]}
         """
         try:
-            doc = fitz.open(self.template_path)
+            doc = abrir_pdf(self.template_path)
             placeholders = {}
             
             for page_num, page in enumerate(doc):
@@ -103,24 +109,29 @@ class PDFPlaceholderReplacerMuPDF:
     def replace_and_get_pdf(
         self, 
         data: dict, 
-        output_path: str = None,
+        output_path: Destino = None,
         font_name: str = "helv",
         font_size: int = 10,
-        text_color: tuple = (0, 0, 0)
+        text_color: tuple = (0, 0, 0),
+        incremental: bool = False
     ) -> bytes:
         """
         Substitui placeholders por valores reais com posicionamento automático
         
         Args:
             data: Dicionário {placeholder: valor}
-            output_path: (opcional) onde salvar
+            output_path: (opcional) caminho, stream ou função que recebe os bytes
             font_name: Nome da fonte ("helv", "times-roman", etc)
             font_size: Tamanho da fonte em pontos
             text_color: Tupla RGB (0-1) ex: (0, 0, 0) = preto
+            incremental: grava o preenchimento como atualização incremental
+                         anexada aos bytes intactos do template (ver
+                         atualizacao_incremental.ArmazemDeltas)
         
         Returns:
             PDF em bytes
         """
+        import fitz  # PyMuPDF
         
         # Validar dados
         is_valid, missing, extras = self.validate_data(data)
@@ -128,9 +139,12 @@ class PDFPlaceholderReplacerMuPDF:
         if not is_valid:
             logger.warning(f"Campos faltando: {missing}")
         
+        edicao = DocumentoIncremental(self.template_path) if incremental else None
         try:
-            doc = fitz.open(self.template_path)
+            doc = edicao.doc if edicao else abrir_pdf(self.template_path)
             placeholders = self.extract_placeholders()
+            medidor = MedidorBase14(font_name)
+            obstaculos = {}  # página → palavras e imagens, lidas antes de qualquer edição
             
             # Processar cada placeholder
             for placeholder_name, positions in placeholders.items():
@@ -145,6 +159,8 @@ class PDFPlaceholderReplacerMuPDF:
                 for pos_info in positions:
                     page_num = pos_info['page']
                     page = doc[page_num]
+                    if page_num not in obstaculos:
+                        obstaculos[page_num] = obstaculos_pagina(page)
                     
                     # 1. Remover o placeholder (cobrir com branco)
                     rect = fitz.Rect(
@@ -167,14 +183,25 @@ class PDFPlaceholderReplacerMuPDF:
                     x = rect.x0
                     y = rect.y0 + (rect.height * 0.75)  # Ajuste vertical
                     
-                    page.insert_text(
-                        (x, y),
-                        value,
-                        fontsize=font_size,
-                        fontname=font_name,
-                        color=text_color,
+                    # Valor longo: quebra se houver espaço livre abaixo, senão reduz
+                    # (e, no limite, reticências) até o texto/imagem vizinho da linha
+                    largura_livre, altura_livre = caixa_livre(
+                        tuple(rect), (page.rect.width, page.rect.height), obstaculos[page_num])
+                    ajuste = ajustar_texto(
+                        value, medidor, largura_livre, font_size,
+                        tamanho_min=font_size * FATOR_TAMANHO_MINIMO,
+                        altura_max=altura_livre, max_linhas=None
                     )
                     
+                    for i, linha in enumerate(ajuste.linhas):
+                        page.insert_text(
+                            (x, y + i * ajuste.altura_linha),
+                            linha,
+                            fontsize=ajuste.tamanho,
+                            fontname=font_name,
+                            color=text_color,
+                        )
+                    
                     logger.info(
                         f"✓ Substituído {placeholder_text} por '{value}' "
                         f"na página {page_num}"
@@ -185,13 +212,14 @@ class PDFPlaceholderReplacerMuPDF:
             # doc.write(output)
             # output.seek(0)
             # result_bytes = output.getvalue()
-            result_bytes = doc.write()
-            
-            doc.close()
+            if edicao:
+                result_bytes = edicao.finalizar()
+            else:
+                result_bytes = doc.write()
+                doc.close()
             
             if output_path:
-                with open(output_path, 'wb') as f:
-                    f.write(result_bytes)
+                persistir(result_bytes, output_path)
                 logger.info(f"PDF salvo em: {output_path}")
             
             return result_bytes
@@ -199,11 +227,17 @@ class PDFPlaceholderReplacerMuPDF:
         except Exception as e:
             logger.error(f"Erro ao gerar PDF: {e}")
             raise
+        
+        finally:
+            if edicao:
+                edicao.fechar()
     
     def list_available_fonts(self) -> list:
         """
         Lista todas as fontes disponíveis no PyMuPDF
         """
+        import fitz  # PyMuPDF
+        
         return fitz.get_fontnames()
 
 
@@ -263,6 +297,7 @@ class DatabaseToDataMapperMuPDF:
 # ============================================================================
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     
     print("\n" + "="*80)
     print("EXEMPLO 1: Listar placeholders encontrados no PDF")
@@ -353,15 +388,15 @@ if __name__ == "__main__":
     print(f"\nRecomendado usar: 'helv' (Helvetica) ou 'times-roman'")
 
 
-# ============================================================================
-# IMPORTANTE: COMPARAÇÃO COM ABORDAGEM ANTERIOR
-# ============================================================================
+    # ============================================================================
+    # IMPORTANTE: COMPARAÇÃO COM ABORDAGEM ANTERIOR
+    # ============================================================================
 
-print("\n" + "="*80)
-print("POR QUE AGORA FUNCIONA MELHOR")
-print("="*80)
+    print("\n" + "="*80)
+    print("POR QUE AGORA FUNCIONA MELHOR")
+    print("="*80)
 
-print("""
+    print("""
 ❌ ABORDAGEM ANTERIOR (PyPDF2 + ReportLab):
    ├─ Exigia mapeamento manual de posições
    ├─ Coordenadas (100, 750) tinham que ser descobertas manualmente
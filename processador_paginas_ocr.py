@@ -0,0 +1,364 @@
+# processador_paginas_ocr.py
+# Base comum dos processadores por OCR (keras-ocr e Tesseract)
+# - DPI por página pela camada de texto e renderização em fluxo (PyMuPDF)
+# - fluxo página a página: renderiza → limpa → reinsere valores → codifica
+# Cada motor implementa só a detecção e a limpeza (limpar_pagina, limpar_em_fluxo)
+
+import os
+from io import BytesIO
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+from entrada_saida_pdf import Origem, Destino, normalizar_origem, persistir
+from indice_fontes import obter_indice
+
+# PyMuPDF (pagina_raster, codificador_pdf) é importado no primeiro uso:
+# importar este módulo não carrega o PyMuPDF nem o OpenCV (ver benchmark_importacao)
+
+
+def workers_paginas(workers: Optional[int], paginas: int) -> int:
+    """Workers pedidos ou um por núcleo, sem passar do número de páginas"""
+    return max(1, workers or min(paginas, os.cpu_count() or 1))
+
+
+class PlaceholderMetadata:
+    """Armazena metadados de um placeholder detectado"""
+    def __init__(self, text: str, x: int, y: int, width: int, height: int,
+                 font_size: int, color: Tuple[int,int,int], confidence: float):
+        self.text = text
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.font_size = font_size
+        self.color = color
+        self.confidence = confidence
+
+    def to_dict(self):
+        return {
+            'text': self.text,
+            'x': self.x,
+            'y': self.y,
+            'width': self.width,
+            'height': self.height,
+            'font_size': self.font_size,
+            'color': self.color,
+            'confidence': self.confidence
+        }
+
+
+class ProcessadorPaginasOCR:
+    """
+    Renderização, reinserção de valores e montagem do PDF dos processadores OCR
+
+    As subclasses implementam `limpar_em_fluxo` (detectar e remover os
+    placeholders das páginas, na ordem) e `detectar_hibrido`.
+    """
+
+    def __init__(self, pdf_path: Origem, dpi: int = 300, dpi_adaptativo: bool = True,
+                 ocr_duas_etapas: bool = True, deteccao_hibrida: bool = True):
+        """
+        Args:
+            pdf_path: caminho, bytes ou stream do PDF de entrada
+            dpi: resolução para conversão (300 = alta qualidade)
+            dpi_adaptativo: DPI por página a partir da camada de texto do PDF;
+                            `dpi` passa a ser o limite superior
+            ocr_duas_etapas: chaves localizadas na página reduzida e OCR só
+                             nos recortes (ver ocr_regioes); False = página inteira
+            deteccao_hibrida: camada de texto do PDF onde existir, OCR só nas
+                              páginas escaneadas/imagens (ver deteccao_hibrida)
+        """
+        self.pdf_path = normalizar_origem(pdf_path)  # caminho ou bytes
+        self.dpi = dpi
+        self.dpi_adaptativo = dpi_adaptativo
+        self.ocr_duas_etapas = ocr_duas_etapas
+        self.deteccao_hibrida = deteccao_hibrida
+        self.dpi_paginas = []  # DPI de cada página (vazio = self.dpi em todas)
+        self.pages_images = []  # Lista de PIL Images
+        self.pages_metadata = []  # Lista com metadados de cada página
+
+    def dpi_pagina(self, page_num: int) -> int:
+        """DPI usado na página (o de preparar_dpi, ou self.dpi)"""
+        return self.dpi_paginas[page_num] if self.dpi_paginas else self.dpi
+
+    def calcular_dpi_paginas(self) -> List[int]:
+        """
+        DPI de cada página pela menor fonte da camada de texto (ver escolher_dpi)
+
+        Returns:
+            Lista com um DPI por página, ou vazia quando o DPI adaptativo está
+            desligado ou o PDF não pode ser lido pelo PyMuPDF
+        """
+        if not self.dpi_adaptativo:
+            return []
+
+        try:
+            from pagina_raster import dpi_por_pagina
+            return dpi_por_pagina(self.pdf_path, self.dpi)
+        except Exception as e:
+            print(f"  ⚠️  DPI adaptativo indisponível ({e}); usando DPI={self.dpi}")
+            return []
+
+    def preparar_dpi(self) -> List[int]:
+        """Calcula o DPI de cada página antes da renderização"""
+        self.dpi_paginas = self.calcular_dpi_paginas()
+
+        if len(set(self.dpi_paginas)) > 1:
+            print(f"  🎯 DPI por página: {self.dpi_paginas}")
+        elif self.dpi_paginas and self.dpi_paginas[0] != self.dpi:
+            print(f"  🎯 DPI adaptativo: {self.dpi_paginas[0]}")
+        return self.dpi_paginas
+
+    def iterar_paginas(self) -> Iterator[Tuple[int, Image.Image]]:
+        """
+        (número, imagem PIL) de cada página, renderizada pelo PyMuPDF só
+        quando pedida (ver pagina_raster.iterar_paginas)
+
+        A imagem RGB é copiada do Pixmap uma vez (ver como_imagem_pil) e a
+        página é liberada em seguida; usa os DPIs de preparar_dpi (chamado
+        aqui se ainda não foi).
+        """
+        from pagina_raster import iterar_paginas
+
+        if self.dpi_adaptativo and not self.dpi_paginas:
+            self.preparar_dpi()
+        for pagina in iterar_paginas(self.pdf_path, self.dpi_paginas or self.dpi):
+            yield pagina.page_num, pagina.como_imagem_pil()
+
+    def converter_pdf_para_imagens(self) -> List[Image.Image]:
+        """
+        Converte TODAS as páginas do PDF em imagens PIL (todas em memória)
+
+        Para documentos grandes prefira processar_em_fluxo, que mantém só
+        as páginas em processamento.
+
+        Returns:
+            Lista de imagens PIL (RGB)
+        """
+        print(f"📄 Convertendo PDF para imagens... DPI={self.dpi}")
+
+        try:
+            images = [imagem for _, imagem in self.iterar_paginas()]
+
+            self.pages_images = images
+            print(f"✅ {len(images)} página(s) convertida(s)")
+            return images
+
+        except Exception as e:
+            print(f"❌ Erro ao converter PDF: {e}")
+            return []
+
+    def metadados_hibridos(self, por_pagina: list, confianca: float
+                           ) -> List[List[PlaceholderMetadata]]:
+        """Placeholders do DetectorHibrido (pt) → PlaceholderMetadata no DPI de cada página"""
+        resultado = []
+        for i, detectados in enumerate(por_pagina):
+            dpi = self.dpi_pagina(i)
+            pagina = []
+            for p in detectados:
+                x, y, w, h = p.em_pixels(dpi)
+                pagina.append(PlaceholderMetadata(
+                    text=p.texto,
+                    x=x, y=y,
+                    width=w, height=h,
+                    font_size=max(8, int(round(p.tamanho * dpi / 72))),
+                    color=p.cor_rgb,
+                    confidence=confianca
+                ))
+            resultado.append(pagina)
+        return resultado
+
+    def detectar_hibrido(self) -> Optional[List[List[PlaceholderMetadata]]]:
+        """Placeholders por página pela camada de texto + OCR; None se indisponível"""
+        raise NotImplementedError
+
+    def limpar_em_fluxo(self, detectados: Optional[List[List[PlaceholderMetadata]]] = None,
+                        workers: int = 1
+                        ) -> Iterator[Tuple[Image.Image, List[PlaceholderMetadata]]]:
+        """(imagem limpa, placeholders) de cada página, na ordem das páginas"""
+        raise NotImplementedError
+
+    def reinserer_valores(self, imagens_limpas: List[Image.Image],
+                         placeholders_valores: Dict[str, str]) -> List[Image.Image]:
+        """
+        Reinsere os valores nos placeholders removidos
+
+        Args:
+            imagens_limpas: Lista de imagens sem placeholders
+            placeholders_valores: Dict {"{placeholder}": "valor"}
+
+        Returns:
+            Lista de imagens com valores inseridos
+        """
+        print("\n" + "="*60)
+        print("REINSERINDO VALORES")
+        print("="*60)
+
+        return [
+            self.inserir_valores_pagina(imagem_limpa, metadata_page, placeholders_valores)
+            for imagem_limpa, metadata_page in zip(imagens_limpas, self.pages_metadata)
+        ]
+
+    def inserir_valores_pagina(self, imagem_limpa: Image.Image, metadata_page: Dict,
+                               placeholders_valores: Dict[str, str]) -> Image.Image:
+        """
+        Desenha os valores de uma página
+
+        Args:
+            imagem_limpa: Página sem placeholders (não é alterada)
+            metadata_page: {'page': n, 'placeholders': [...]} da página
+            placeholders_valores: Dict {"{placeholder}": "valor"}
+
+        Returns:
+            Cópia da página com os valores inseridos
+        """
+        print(f"\n📝 Página {metadata_page['page'] + 1}: Inserindo valores...")
+
+        imagem_final = imagem_limpa.copy()
+        draw = ImageDraw.Draw(imagem_final)
+
+        for placeholder_info in metadata_page['placeholders']:
+            placeholder_key = placeholder_info['text']
+
+            # Procurar o valor
+            if placeholder_key in placeholders_valores:
+                valor = placeholders_valores[placeholder_key]
+
+                x = placeholder_info['x']
+                y = placeholder_info['y']
+                font_size = placeholder_info['font_size']
+                color = tuple(placeholder_info['color'])
+
+                # Fonte do índice compartilhado (Arial do sistema ou a família padrão)
+                fonte = obter_indice().fonte_pil("Arial", 400, False, font_size)
+
+                # Desenhar texto
+                draw.text(
+                    (x, y),
+                    valor,
+                    fill=color,
+                    font=fonte
+                )
+
+                print(f"  ✓ {placeholder_key} → '{valor}'")
+            else:
+                print(f"  ⚠️  Valor não informado para {placeholder_key}")
+
+        return imagem_final
+
+    def salvar_pdf(self, imagens: List[Image.Image],
+                   caminho_saida: Destino = None) -> Optional[bytes]:
+        """
+        Reconstrói PDF a partir das imagens (em memória)
+
+        Args:
+            imagens: Lista de imagens PIL
+            caminho_saida: destino opcional (caminho, stream ou função)
+
+        Returns:
+            bytes do PDF, ou None em caso de erro
+        """
+        print("\n" + "="*60)
+        print("RECONSTRUINDO PDF")
+        print("="*60)
+
+        try:
+            # Converter para RGB se necessário
+            imagens_rgb = [
+                img.convert('RGB') if img.mode != 'RGB' else img
+                for img in imagens
+            ]
+
+            # Salvar como PDF
+            if self.dpi_paginas:
+                # Cada página com o próprio DPI → tamanho original preservado
+                from codificador_pdf import imagens_para_pdf
+                pdf_bytes = imagens_para_pdf(imagens_rgb, self.dpi_paginas, qualidade=95)
+            else:
+                buffer = BytesIO()
+                imagens_rgb[0].save(
+                    buffer,
+                    format='PDF',
+                    save_all=True,
+                    append_images=imagens_rgb[1:] if len(imagens_rgb) > 1 else [],
+                    quality=95
+                )
+                pdf_bytes = buffer.getvalue()
+
+            persistir(pdf_bytes, caminho_saida)
+
+            tamanho_mb = len(pdf_bytes) / 1024 / 1024
+            if isinstance(caminho_saida, str):
+                print(f"✅ PDF salvo: {caminho_saida}")
+            print(f"   Tamanho: {tamanho_mb:.2f} MB")
+            return pdf_bytes
+
+        except Exception as e:
+            print(f"❌ Erro ao salvar PDF: {e}")
+            return None
+
+    def processar_em_fluxo(self, placeholders_valores: Dict[str, str],
+                           caminho_saida: Destino = None,
+                           workers: Optional[int] = None) -> Optional[bytes]:
+        """
+        Renderiza → detecta → remove → reinsere → codifica, página a página
+
+        Cada página vira JPEG no PDF de saída antes de a próxima ser
+        renderizada além da janela: o pico de memória é de `workers` páginas,
+        não do documento inteiro. As páginas mantêm o tamanho original
+        (pixels × 72 / DPI).
+
+        Args:
+            placeholders_valores: Dict {"{placeholder}": "valor"}
+            caminho_saida: destino opcional (caminho, stream ou função)
+            workers: páginas processadas ao mesmo tempo (None = uma por núcleo;
+                     1 = uma página por vez)
+
+        Returns:
+            bytes do PDF gerado, ou None em caso de erro
+        """
+        import fitz  # PyMuPDF: o PDF de saída é montado página a página
+        from codificador_pdf import adicionar_pagina_jpeg
+
+        print("\n" + "="*60)
+        print("PROCESSANDO PÁGINAS EM FLUXO")
+        print("="*60)
+
+        try:
+            self.preparar_dpi()
+            detectados = self.detectar_hibrido() if self.deteccao_hibrida else None
+            paginas = len(detectados or self.dpi_paginas) or (os.cpu_count() or 1)
+
+            self.pages_images = []
+            self.pages_metadata = []
+            doc = fitz.open()
+            try:
+                for i, (imagem_limpa, placeholders) in enumerate(
+                        self.limpar_em_fluxo(detectados, workers_paginas(workers, paginas))):
+                    metadata_page = {'page': i, 'placeholders': [p.to_dict() for p in placeholders]}
+                    self.pages_metadata.append(metadata_page)
+
+                    imagem_final = self.inserir_valores_pagina(
+                        imagem_limpa, metadata_page, placeholders_valores)
+                    adicionar_pagina_jpeg(doc, imagem_final, self.dpi_pagina(i), qualidade=95)
+                    print(f"  ✅ Página {i + 1} codificada ({len(placeholders)} placeholder(s))")
+
+                if not self.pages_metadata:
+                    print("❌ Erro: Nenhuma página renderizada")
+                    return None
+                pdf_bytes = doc.tobytes(garbage=4, deflate=True)
+            finally:
+                doc.close()
+
+            persistir(pdf_bytes, caminho_saida)
+
+            tamanho_mb = len(pdf_bytes) / 1024 / 1024
+            if isinstance(caminho_saida, str):
+                print(f"✅ PDF salvo: {caminho_saida}")
+            print(f"   Tamanho: {tamanho_mb:.2f} MB")
+            return pdf_bytes
+
+        except Exception as e:
+            print(f"❌ Erro ao processar PDF: {e}")
+            return None
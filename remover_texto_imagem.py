@@ -3,12 +3,17 @@
 import cv2
 import numpy as np
 from PIL import Image
-import pytesseract
 
-def remover_placeholders_com_inpaint(caminho_imagem, caminho_saida):
+from motor_ocr import obter_motor_ocr
+from ocr_regioes import encontrar_regioes_candidatas, ocr_tesseract_regioes
+
+def remover_placeholders_com_inpaint(caminho_imagem, caminho_saida, duas_etapas=True):
     """
     Remove placeholders {xxx} da imagem mantendo o fundo intacto
     Usa OCR para detectar onde estão os placeholders
+    
+    duas_etapas: chaves localizadas na imagem reduzida e OCR só nos recortes
+                 (False = OCR da imagem inteira)
     """
     
     # 1. Carregar imagem
@@ -23,11 +28,16 @@ def remover_placeholders_com_inpaint(caminho_imagem, caminho_saida):
     # 2. Converter para escala de cinza
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     
-    # 3. Detectar texto (pytesseract)
+    # 3. Detectar texto (Tesseract via motor_ocr)
     print("🔍 Detectando placeholders com OCR...")
     try:
-        # Usar pytesseract com detecção de caixas
-        dados = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
+        # Tesseract com detecção de caixas
+        if duas_etapas:
+            regioes = encontrar_regioes_candidatas(gray)
+            print(f"  🔍 {len(regioes)} região(ões) candidata(s)")
+            dados = ocr_tesseract_regioes(gray, regioes)
+        else:
+            dados = obter_motor_ocr().image_to_data(gray)
         
         # Criar máscara para remover
         mask = np.zeros(gray.shape, dtype=np.uint8)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hospedeiro ÚNICO do keras-ocr (detector + reconhecedor carregados uma vez)
+
+- Em processo: `obter_hospedeiro()` devolve o singleton do processo; todos os
+  PDFPlaceholderProcessor compartilham o mesmo modelo.
+- Entre processos: um daemon em socket Unix serve vários workers; só o
+  primeiro deploy paga os ~30 s de carga do modelo.
+
+Pedidos simultâneos são agrupados em lotes (`pipeline.recognize([...])`) e o
+hospedeiro expõe profundidade de fila e tamanho dos lotes.
+
+Uso:
+    python servidor_keras_ocr.py --socket /tmp/keras_ocr.sock      # daemon
+    python servidor_keras_ocr.py --socket /tmp/keras_ocr.sock --metricas
+
+Workers usam o daemon quando KERAS_OCR_SOCKET aponta para o socket
+(ver pipeline_compartilhado).
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+# Socket usado pelos workers quando definido (senão: modelo no próprio processo)
+VARIAVEL_SOCKET = "KERAS_OCR_SOCKET"
+
+# Imagens por chamada ao pipeline (limita memória da GPU/CPU por lote)
+TAMANHO_MAX_LOTE = 32
+
+# Espera por outros pedidos antes de fechar um lote (ms)
+ESPERA_LOTE_MS = 20
+
+
+# ============================================================================
+# HOSPEDEIRO (EM PROCESSO)
+# ============================================================================
+
+class HospedeiroKerasOCR:
+    """
+    Pipeline keras-ocr carregado uma vez e servido em lotes por uma thread
+
+    `recognize(imagens)` tem a mesma assinatura de `keras_ocr.pipeline.Pipeline`:
+    o hospedeiro substitui o pipeline em qualquer chamador.
+    """
+
+    def __init__(self, tamanho_max_lote: int = TAMANHO_MAX_LOTE,
+                 espera_lote_ms: float = ESPERA_LOTE_MS):
+        self.tamanho_max_lote = tamanho_max_lote
+        self.espera_lote = espera_lote_ms / 1000
+        self._pipeline = None
+        self._trava_carga = threading.Lock()
+        self._fila: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._trava = threading.Lock()
+        self._metricas = {
+            "pedidos": 0,
+            "imagens": 0,
+            "lotes": 0,
+            "maior_lote": 0,
+            "maior_fila": 0,
+            "segundos_carga": None,
+            "segundos_reconhecimento": 0.0,
+        }
+
+    # ------------------------------------------------------------------ modelo
+
+    def carregar(self):
+        """Carrega detector e reconhecedor (uma vez por processo)"""
+        with self._trava_carga:
+            if self._pipeline is None:
+                print("📚 Carregando pipeline keras-ocr (primeira vez demora ~30s)...")
+                inicio = time.perf_counter()
+                from keras_ocr import pipeline  # TensorFlow: carregado só aqui
+                self._pipeline = pipeline.Pipeline()
+                self._metricas["segundos_carga"] = time.perf_counter() - inicio
+                print(f"✅ Pipeline carregado em {self._metricas['segundos_carga']:.1f}s")
+        return self._pipeline
+
+    @property
+    def carregado(self) -> bool:
+        return self._pipeline is not None
+
+    # ------------------------------------------------------------------ pedidos
+
+    def recognize(self, imagens: Sequence[np.ndarray]) -> List[list]:
+        """Predições [(texto, caixa 4x2)] por imagem; bloqueia até o lote sair"""
+        imagens = list(imagens)
+        if not imagens:
+            return []
+        futuro: Future = Future()
+        with self._trava:
+            self._metricas["pedidos"] += 1
+            self._metricas["imagens"] += len(imagens)
+            self._fila.put((imagens, futuro))
+            self._metricas["maior_fila"] = max(self._metricas["maior_fila"], self._fila.qsize())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._servir_lotes,
+                                                name="keras-ocr-lotes", daemon=True)
+                self._thread.start()
+        return futuro.result()
+
+    def _proximo_lote(self) -> List[tuple]:
+        """Primeiro pedido (bloqueante) + os que chegarem dentro da janela do lote"""
+        lote = [self._fila.get()]
+        total = len(lote[0][0])
+        limite = time.monotonic() + self.espera_lote
+        while total < self.tamanho_max_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                pedido = self._fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            lote.append(pedido)
+            total += len(pedido[0])
+        return lote
+
+    def _servir_lotes(self) -> None:
+        while True:
+            lote = self._proximo_lote()
+            imagens = [img for pedido, _ in lote for img in pedido]
+            try:
+                pipeline = self.carregar()
+                inicio = time.perf_counter()
+                predicoes = pipeline.recognize(imagens)
+                duracao = time.perf_counter() - inicio
+            except BaseException as e:
+                for _, futuro in lote:
+                    futuro.set_exception(e)
+                continue
+
+            with self._trava:
+                self._metricas["lotes"] += 1
+                self._metricas["maior_lote"] = max(self._metricas["maior_lote"], len(imagens))
+                self._metricas["segundos_reconhecimento"] += duracao
+
+            inicio = 0
+            for pedido, futuro in lote:
+                futuro.set_result(list(predicoes[inicio:inicio + len(pedido)]))
+                inicio += len(pedido)
+
+    # ------------------------------------------------------------------ métricas
+
+    def metricas(self) -> Dict[str, object]:
+        """Contadores acumulados + fila atual e tamanho médio dos lotes"""
+        with self._trava:
+            m = dict(self._metricas)
+        m["fila"] = self._fila.qsize()
+        m["lote_medio"] = m["imagens"] / m["lotes"] if m["lotes"] else 0.0
+        m["carregado"] = self.carregado
+        return m
+
+
+_hospedeiro: Optional[HospedeiroKerasOCR] = None
+_trava_hospedeiro = threading.Lock()
+
+
+def obter_hospedeiro() -> HospedeiroKerasOCR:
+    """Singleton do processo (o modelo só é carregado no primeiro reconhecimento)"""
+    global _hospedeiro
+    with _trava_hospedeiro:
+        if _hospedeiro is None:
+            _hospedeiro = HospedeiroKerasOCR()
+        return _hospedeiro
+
+
+# ============================================================================
+# PROTOCOLO DO SOCKET (cabeçalho JSON + buffers crus, sem pickle)
+# ============================================================================
+
+def _enviar(conexao: socket.socket, cabecalho: dict, buffers: Sequence[bytes] = ()) -> None:
+    dados = json.dumps(cabecalho).encode("utf-8")
+    conexao.sendall(struct.pack("!I", len(dados)) + dados)
+    for buffer in buffers:
+        conexao.sendall(buffer)
+
+
+def _receber_exato(conexao: socket.socket, tamanho: int) -> bytes:
+    partes = bytearray()
+    while len(partes) < tamanho:
+        parte = conexao.recv(min(tamanho - len(partes), 1 << 20))
+        if not parte:
+            raise ConnectionError("conexão encerrada no meio da mensagem")
+        partes += parte
+    return bytes(partes)
+
+
+def _receber(conexao: socket.socket) -> dict:
+    (tamanho,) = struct.unpack("!I", _receber_exato(conexao, 4))
+    return json.loads(_receber_exato(conexao, tamanho).decode("utf-8"))
+
+
+class _TratadorPedido(socketserver.BaseRequestHandler):
+    """Um pedido por conexão: `reconhecer` (imagens) ou `metricas`"""
+
+    def handle(self) -> None:
+        hospedeiro: HospedeiroKerasOCR = self.server.hospedeiro
+        try:
+            pedido = _receber(self.request)
+            if pedido.get("comando") == "metricas":
+                _enviar(self.request, {"ok": True, "metricas": hospedeiro.metricas()})
+                return
+
+            imagens = []
+            for forma, tipo in zip(pedido["formas"], pedido["tipos"]):
+                tamanho = int(np.prod(forma)) * np.dtype(tipo).itemsize
+                buffer = _receber_exato(self.request, tamanho)
+                imagens.append(np.frombuffer(buffer, dtype=tipo).reshape(forma))
+
+            predicoes = hospedeiro.recognize(imagens)
+            _enviar(self.request, {"ok": True, "predicoes": [
+                [[texto, np.asarray(caixa).tolist()] for texto, caixa in pagina]
+                for pagina in predicoes
+            ]})
+        except Exception as e:
+            try:
+                _enviar(self.request, {"ok": False, "erro": f"{type(e).__name__}: {e}"})
+            except OSError:
+                pass
+
+
+class _ServidorUnix(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def servir(caminho_socket: str, pre_carregar: bool = True) -> None:
+    """Daemon: modelo carregado na partida, pedidos de vários workers em lotes"""
+    hospedeiro = obter_hospedeiro()
+    if pre_carregar:
+        hospedeiro.carregar()
+
+    if os.path.exists(caminho_socket):
+        os.remove(caminho_socket)
+    servidor = _ServidorUnix(caminho_socket, _TratadorPedido)
+    servidor.hospedeiro = hospedeiro
+    os.chmod(caminho_socket, 0o600)  # só o usuário dos workers
+    print(f"🟢 keras-ocr servindo em {caminho_socket}")
+    try:
+        servidor.serve_forever()
+    finally:
+        servidor.server_close()
+        if os.path.exists(caminho_socket):
+            os.remove(caminho_socket)
+
+
+# ============================================================================
+# CLIENTE (WORKERS)
+# ============================================================================
+
+class ClienteKerasOCR:
+    """Mesma interface do pipeline (`recognize`), atendida pelo daemon"""
+
+    def __init__(self, caminho_socket: str, timeout: Optional[float] = None):
+        self.caminho_socket = caminho_socket
+        self.timeout = timeout
+
+    def _conectar(self) -> socket.socket:
+        conexao = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conexao.settimeout(self.timeout)
+        conexao.connect(self.caminho_socket)
+        return conexao
+
+    def recognize(self, imagens: Sequence[np.ndarray]) -> List[list]:
+        imagens = [np.ascontiguousarray(img) for img in imagens]
+        if not imagens:
+            return []
+        with self._conectar() as conexao:
+            _enviar(conexao, {
+                "comando": "reconhecer",
+                "formas": [list(img.shape) for img in imagens],
+                "tipos": [img.dtype.str for img in imagens],
+            }, [memoryview(img).cast("B") for img in imagens])
+            resposta = _receber(conexao)
+        if not resposta.get("ok"):
+            raise RuntimeError(f"servidor keras-ocr: {resposta.get('erro')}")
+        return [
+            [(texto, np.asarray(caixa, dtype=np.float32)) for texto, caixa in pagina]
+            for pagina in resposta["predicoes"]
+        ]
+
+    def metricas(self) -> Dict[str, object]:
+        with self._conectar() as conexao:
+            _enviar(conexao, {"comando": "metricas"})
+            resposta = _receber(conexao)
+        if not resposta.get("ok"):
+            raise RuntimeError(f"servidor keras-ocr: {resposta.get('erro')}")
+        return resposta["metricas"]
+
+
+def pipeline_compartilhado():
+    """
+    Daemon (se KERAS_OCR_SOCKET aponta para um socket existente) ou o
+    hospedeiro do processo: ambos com `recognize(imagens)`
+    """
+    caminho = os.environ.get(VARIAVEL_SOCKET)
+    if caminho and os.path.exists(caminho):
+        return ClienteKerasOCR(caminho)
+    return obter_hospedeiro()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Servidor keras-ocr compartilhado")
+    parser.add_argument("--socket", default=os.environ.get(VARIAVEL_SOCKET, "/tmp/keras_ocr.sock"))
+    parser.add_argument("--metricas", action="store_true",
+                        help="mostrar as métricas do daemon em execução")
+    parser.add_argument("--sem-pre-carga", action="store_true",
+                        help="carregar o modelo só no primeiro pedido")
+    args = parser.parse_args()
+
+    if args.metricas:
+        print(json.dumps(ClienteKerasOCR(args.socket).metricas(), indent=2))
+        return 0
+
+    servir(args.socket, pre_carregar=not args.sem_pre_carga)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# tests/conftest.py
+# Fixtures compartilhadas: templates PDF sintéticos gerados em memória
+# (os testes não dependem dos templates reais em templates/)
+
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+FONTS_DIR = os.path.join(RAIZ, "fonts")
+
+# Placeholders do template sintético, por página (a página 2 não tem nenhum)
+TEXTOS_TEMPLATE = {
+    0: ["Contratada: {nome_da_medica_ou_clinica}", "CNPJ: {cpfcnpjmedicacli}",
+        "Paciente: {nome_paciente}"],
+    1: ["Cláusula sem campos variáveis."],
+    2: ["Data: {dd}", "Valor: {valor}"],
+}
+
+VALORES = {
+    "nome_da_medica_ou_clinica": "Clínica Exemplo",
+    "cpfcnpjmedicacli": "12.345.678/0001-90",
+    "nome_paciente": "Maria Souza",
+    "dd": "19",
+    "valor": "R$ 1.500,00",
+}
+
+
+def criar_template(textos=TEXTOS_TEMPLATE, tamanho: float = 12) -> bytes:
+    """PDF A5 com uma linha de texto por item, em Helvetica"""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    for page_num in sorted(textos):
+        page = doc.new_page(width=420, height=595)
+        page.draw_rect(fitz.Rect(20, 20, 400, 60), color=(0.1, 0.3, 0.7),
+                       fill=(0.85, 0.9, 1.0))
+        for i, texto in enumerate(textos[page_num]):
+            page.insert_text((40, 100 + 30 * i), texto, fontsize=tamanho, fontname="helv")
+    dados = doc.tobytes()
+    doc.close()
+    return dados
+
+
+@pytest.fixture
+def template() -> bytes:
+    return criar_template()
+
+
+@pytest.fixture
+def valores() -> dict:
+    return dict(VALORES)
+
+
+@pytest.fixture(autouse=True)
+def caches_isolados(tmp_path, monkeypatch):
+    """Caches em disco dentro de tmp_path e caches do processo vazios a cada teste"""
+    import cache_layout
+    import cache_paginas
+    import camadas_preenchimento
+
+    monkeypatch.setattr(cache_layout, "DIRETORIO_CACHE", str(tmp_path / "cache_layouts"))
+    monkeypatch.setattr(cache_layout, "_caches", {})
+    monkeypatch.setattr(cache_paginas, "_cache", None)
+    monkeypatch.setattr(camadas_preenchimento, "_cache", None)
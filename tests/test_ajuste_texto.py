@@ -0,0 +1,80 @@
+import pytest
+
+from ajuste_texto import (RETICENCIAS, MedidorBase14, MedidorFitz, MedidorPIL, ajustar_texto,
+                          caixa_livre, largura_texto, limpar_cache_medidas,
+                          quebrar_linhas, reticenciar)
+from conftest import FONTS_DIR
+
+LONGO = "Clínica de Dermatologia e Estética Avançada Doutora Ana Beatriz Tavares Ltda"
+
+
+@pytest.fixture(params=["pil", "fitz", "base14"])
+def medidor(request):
+    limpar_cache_medidas()
+    return {
+        "pil": MedidorPIL(fonts_dir=FONTS_DIR),
+        "fitz": MedidorFitz.do_span("PlusJakartaSans-Bold", FONTS_DIR),
+        "base14": MedidorBase14(),
+    }[request.param]
+
+
+def test_medida_em_cache_igual_a_direta(medidor):
+    for tamanho in (9, 10.5, 12):
+        esperado = medidor.medir(LONGO, tamanho)
+        assert largura_texto(LONGO, medidor, tamanho) == pytest.approx(esperado, rel=0.02)
+        assert largura_texto(LONGO, medidor, tamanho) == pytest.approx(esperado, rel=0.02)
+
+
+def test_texto_curto_mantem_tamanho(medidor):
+    ajustado = ajustar_texto("Ana", medidor, 200, 12, tamanho_min=8)
+    assert (ajustado.linhas, ajustado.tamanho, ajustado.truncado) == (["Ana"], 12, False)
+
+
+def test_reduz_ate_caber_sem_passar_do_minimo(medidor):
+    largura = largura_texto(LONGO, medidor, 12) * 0.85
+    ajustado = ajustar_texto(LONGO, medidor, largura, 12, tamanho_min=12 * 0.7)
+    assert ajustado.texto == LONGO and not ajustado.truncado
+    assert 12 * 0.7 <= ajustado.tamanho < 12
+    assert largura_texto(LONGO, medidor, ajustado.tamanho) <= largura
+
+
+def test_quebra_em_linhas_que_cabem(medidor):
+    largura = largura_texto(LONGO, medidor, 12) / 2.5
+    ajustado = ajustar_texto(LONGO, medidor, largura, 12, max_linhas=4)
+    assert ajustado.texto == LONGO and len(ajustado.linhas) > 1
+    assert all(largura_texto(l, medidor, ajustado.tamanho) <= largura for l in ajustado.linhas)
+
+
+def test_reticencias_no_menor_tamanho(medidor):
+    largura = largura_texto(LONGO, medidor, 12) / 3
+    ajustado = ajustar_texto(LONGO, medidor, largura, 12, tamanho_min=10)
+    assert ajustado.truncado and ajustado.tamanho == 10
+    assert ajustado.linhas[-1].endswith(RETICENCIAS)
+    assert largura_texto(ajustado.linhas[-1], medidor, 10) <= largura
+    assert reticenciar("Ana", medidor, 10, largura) == "Ana"
+
+
+def test_palavra_maior_que_a_linha_e_partida():
+    medidor = MedidorBase14()
+    linhas = quebrar_linhas("x" * 60, medidor, 10, 50)
+    assert "".join(linhas) == "x" * 60
+    assert all(largura_texto(l, medidor, 10) <= 50 for l in linhas)
+
+
+def test_caixa_livre_ate_a_margem():
+    assert caixa_livre((100, 100, 150, 112), (595, 842)) == (595 - 36 - 100, 842 - 36 - 100)
+    assert caixa_livre((500, 100, 590, 112), (595, 842))[0] == 90
+
+
+def test_caixa_livre_para_no_vizinho_da_linha_e_no_de_baixo():
+    placeholder = (100, 100, 150, 112)
+    vizinhos = [
+        (40, 100, 95, 112),      # rótulo à esquerda: não limita
+        (300, 101, 340, 113),    # próximo campo da linha
+        (0, 0, 595, 842),        # fundo que cobre a página: não limita
+        (60, 130, 120, 142),     # linha de baixo, dentro da largura livre
+        (400, 110, 450, 122),    # linha de baixo de outro campo, fora da largura
+    ]
+    largura, altura = caixa_livre(placeholder, (595, 842), vizinhos)
+    assert largura == 300 - 4 - 100
+    assert altura == 130 - 4 - 100
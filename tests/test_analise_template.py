@@ -0,0 +1,42 @@
+import fitz  # PyMuPDF
+import pytest
+
+from analise_template import MOTOR_ANALISE, analisar_template
+from cache_layout import CacheLayout
+from pagina_raster import escolher_dpi
+
+
+def test_spans_e_dpi_iguais_aos_da_pagina(template):
+    analise = analisar_template(template)
+    assert analise.paginas == 3
+    assert [s["text"] for s in analise.spans_pagina(2)] == ["Data: {dd}", "Valor: {valor}"]
+    assert analise.spans_pagina(1) == []
+
+    with fitz.open(stream=template, filetype="pdf") as doc:
+        for page_num, page in enumerate(doc):
+            for tamanhos, dpi_max in [((), 300), ((12,), 300), ((6,), 600), ((12,), 150)]:
+                assert analise.dpi_pagina(page_num, tamanhos, dpi_max) == \
+                    escolher_dpi(page, tamanhos, dpi_max)
+
+
+def test_analise_persistida(template, tmp_path):
+    primeira = analisar_template(template, CacheLayout(str(tmp_path), MOTOR_ANALISE))
+    # Outro processo: só o JSON no disco
+    segunda = analisar_template(template, CacheLayout(str(tmp_path), MOTOR_ANALISE))
+    assert segunda == primeira
+
+
+def test_espaco_livre_ate_o_vizinho_da_linha():
+    doc = fitz.open()
+    page = doc.new_page(width=420, height=595)
+    page.insert_text((40, 100), "{celpaciente}", fontsize=12, fontname="helv")
+    page.insert_text((200, 100), "{enderecopaciente2}", fontsize=12, fontname="helv")
+    page.insert_text((40, 160), "Cláusula 1", fontsize=12, fontname="helv")
+    template = doc.tobytes()
+    doc.close()
+
+    celular, endereco = [span["livre"] for span in analisar_template(template).spans_pagina(0)]
+    assert celular[0] == pytest.approx(200 - 4 - 40, abs=1)
+    assert endereco[0] == pytest.approx(420 - 36 - 200, abs=1)
+    # Livre até a linha de baixo (a cláusula fica de fora da largura do endereço)
+    assert 40 < celular[1] < 60 and endereco[1] > 400
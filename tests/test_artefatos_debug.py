@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+
+from artefatos_debug import SINK_NULO, SinkDisco, SinkMemoria, obter_sink, sobrepor_retangulos
+from conftest import FONTS_DIR, VALORES
+import pdf_processor_v2_com_fonte_completo_CORRIGIDO as v2
+
+VALORES_CHAVES = {"{" + k + "}": v for k, v in VALORES.items()}
+
+
+def test_sink_nulo_nao_chama_o_produtor():
+    assert obter_sink(None) is SINK_NULO
+    assert SINK_NULO.registrar("x", lambda: 1 / 0) is None
+
+
+def test_sink_memoria_guarda_copia_e_gera_png():
+    pixels = np.zeros((4, 5, 3), np.uint8)
+    pixels[..., 0] = 200
+    sink = SinkMemoria()
+    assert sink.registrar("pagina", lambda: pixels) == "pagina"
+    pixels[...] = 0
+
+    decodificado = cv2.imdecode(np.frombuffer(sink.como_png("pagina"), np.uint8),
+                                cv2.IMREAD_COLOR)
+    assert decodificado[0, 0].tolist() == [0, 0, 200]  # BGR
+
+
+def test_sink_disco_grava_png(tmp_path):
+    caminho = SinkDisco(str(tmp_path)).registrar("pagina", lambda: np.full((3, 3), 9, np.uint8))
+    assert caminho == str(tmp_path / "pagina.png")
+    assert cv2.imread(caminho, cv2.IMREAD_GRAYSCALE).tolist() == [[9] * 3] * 3
+
+
+def test_sobrepor_retangulos_nao_altera_a_pagina():
+    pixels = np.full((20, 20), 255, np.uint8)
+    destaque = sobrepor_retangulos(pixels, [(2, 2, 10, 10)])
+    assert pixels.min() == 255
+    assert destaque[2, 2] == 225  # amarelo em cinza
+
+
+def test_pipeline_com_sink_igual_ao_sem_sink(template):
+    placeholders = v2.obter_coordenadas(template, VALORES_CHAVES)
+    sem_sink = {n: p.pixels.copy()
+                for n, p in v2.processar_paginas(template, placeholders, 150, FONTS_DIR)}
+
+    sink = SinkMemoria()
+    com_sink = {n: p.pixels.copy()
+                for n, p in v2.processar_paginas(template, placeholders, 150, FONTS_DIR,
+                                                 sink=sink)}
+
+    assert {n: np.array_equal(com_sink[n], sem_sink[n]) for n in sem_sink} == {0: True, 2: True}
+    assert {"page_1_destaque", "page_1_inpainted", "page_3_final"} <= set(sink.artefatos)
+    assert np.array_equal(sink.artefatos["page_3_final"], sem_sink[2])
@@ -0,0 +1,58 @@
+import tempfile
+
+import fitz  # PyMuPDF
+import pytest
+
+from atualizacao_incremental import ArmazemDeltas, DocumentoIncremental, extrair_delta
+
+
+def _preencher(template) -> bytes:
+    with DocumentoIncremental(template) as edicao:
+        edicao.doc[2].insert_text((200, 100), "19/10/2026", fontsize=12, fontname="helv")
+        return edicao.finalizar()
+
+
+def test_atualizacao_incremental_preserva_o_template(template):
+    pdf = _preencher(template)
+    assert pdf.startswith(template)
+    assert len(extrair_delta(pdf, template)) < len(template)
+    with fitz.open(stream=pdf, filetype="pdf") as doc:
+        assert "19/10/2026" in doc[2].get_text()
+
+
+def test_delta_ida_e_volta(template, tmp_path):
+    pdf = _preencher(template)
+    armazem = ArmazemDeltas(str(tmp_path))
+
+    nome = armazem.salvar(pdf, template, "contrato-1")
+    assert armazem.ler(nome) == pdf
+    assert armazem.tamanho(nome) < len(template)
+
+    # PDF que não estende o template: guardado inteiro
+    outro = armazem.salvar(b"%PDF-1.7 documento novo", template)
+    assert armazem.ler(outro) == b"%PDF-1.7 documento novo"
+
+
+@pytest.mark.parametrize("nome", ["../x", "a/b", "..", "/tmp/x", "a\\b"])
+def test_nome_fora_do_armazem_rejeitado(template, tmp_path, nome):
+    armazem = ArmazemDeltas(str(tmp_path / "armazem"))
+    with pytest.raises(ValueError):
+        armazem.salvar(_preencher(template), template, nome)
+    with pytest.raises(ValueError):
+        armazem.ler(nome)
+    assert not (tmp_path / "x.delta").exists()
+
+
+def test_nome_vazio_so_na_gravacao(template, tmp_path):
+    """Sem nome, salvar usa o hash do conteúdo; ler exige um nome"""
+    armazem = ArmazemDeltas(str(tmp_path))
+    assert armazem.salvar(_preencher(template), template, "")
+    with pytest.raises(ValueError):
+        armazem.ler("")
+
+
+def test_template_invalido_nao_deixa_temporario(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    with pytest.raises(Exception):
+        DocumentoIncremental(b"isto nao e um PDF")
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,23 @@
+import hashlib
+import os
+
+from cache_layout import CacheLayout, hash_documento
+
+
+def test_hash_de_caminho_acompanha_o_arquivo(tmp_path):
+    caminho = tmp_path / "template.pdf"
+    caminho.write_bytes(b"versao 1")
+    assert hash_documento(str(caminho)) == hashlib.sha256(b"versao 1").hexdigest()
+    assert hash_documento(b"versao 1") == hash_documento(str(caminho))
+
+    # Mesmo tamanho, outro conteúdo: o mtime novo invalida o hash guardado
+    caminho.write_bytes(b"versao 2")
+    estado = os.stat(caminho)
+    os.utime(caminho, ns=(estado.st_atime_ns, estado.st_mtime_ns + 1_000_000_000))
+    assert hash_documento(str(caminho)) == hashlib.sha256(b"versao 2").hexdigest()
+
+
+def test_layout_persistido(tmp_path):
+    CacheLayout(str(tmp_path), "teste").salvar("abc", {"campos": [1, 2]})
+    assert CacheLayout(str(tmp_path), "teste").obter("abc") == {"campos": [1, 2]}
+    assert CacheLayout(str(tmp_path), "outro").obter("abc") is None
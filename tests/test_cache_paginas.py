@@ -0,0 +1,62 @@
+import numpy as np
+
+from conftest import FONTS_DIR, VALORES
+import pdf_processor_v2_com_fonte_completo_CORRIGIDO as v2
+
+
+def _placeholders(template, **trocas):
+    valores = {"{" + k + "}": v for k, v in {**VALORES, **trocas}.items()}
+    return v2.obter_coordenadas(template, valores)
+
+
+def _renderizadas(monkeypatch):
+    """Páginas renderizadas pelo pipeline, na ordem"""
+    paginas = []
+    renderizar = v2.renderizar_pagina
+
+    def contar(page, *args, **kwargs):
+        paginas.append(page.number)
+        return renderizar(page, *args, **kwargs)
+
+    monkeypatch.setattr(v2, "renderizar_pagina", contar)
+    return paginas
+
+
+def _paginas(template, placeholders, **opcoes):
+    return {n: pagina.pixels.copy()
+            for n, pagina in v2.processar_paginas(template, placeholders, 200, FONTS_DIR, **opcoes)}
+
+
+def test_cache_igual_ao_pipeline_sem_cache(template):
+    placeholders = _placeholders(template)
+    sem_cache = _paginas(template, placeholders)
+    primeira = _paginas(template, placeholders, cache_paginas=True)
+    acerto = _paginas(template, placeholders, cache_paginas=True)
+
+    assert sorted(sem_cache) == sorted(primeira) == sorted(acerto) == [0, 2]
+    for page_num in sem_cache:
+        assert np.array_equal(primeira[page_num], sem_cache[page_num])
+        assert np.array_equal(acerto[page_num], sem_cache[page_num])
+
+
+def test_so_a_pagina_alterada_e_renderizada(template, monkeypatch):
+    _paginas(template, _placeholders(template), cache_paginas=True)
+    renderizadas = _renderizadas(monkeypatch)
+
+    _paginas(template, _placeholders(template), cache_paginas=True)
+    assert renderizadas == []
+
+    aditivo = _placeholders(template, dd="20")
+    paginas = _paginas(template, aditivo, cache_paginas=True)
+    assert renderizadas == [2]
+    assert np.array_equal(paginas[2], _paginas(template, aditivo)[2])
+
+
+def test_dpi_das_tarefas_sem_reler_a_pagina(template, monkeypatch):
+    placeholders = _placeholders(template)
+    esperados = {n: pagina.dpi for n, pagina in v2.iterar_imagens(template, placeholders, 300)}
+
+    monkeypatch.setattr(v2, "escolher_dpi", lambda *args, **kwargs: 1 / 0)
+    obtidos = {n: pagina.dpi for n, pagina in v2.processar_paginas(template, placeholders, 300,
+                                                                   FONTS_DIR)}
+    assert obtidos == esperados == {0: 200, 2: 200}
@@ -0,0 +1,47 @@
+import numpy as np
+
+import analise_template
+from camadas_preenchimento import CAMPOS_CLINICA, e_campo_fixo, separar_camadas
+from conftest import FONTS_DIR, VALORES
+import pdf_processor_v2_com_fonte_inteligente_IMG2PDF as v2
+
+VALORES_CHAVES = {"{" + k + "}": v for k, v in VALORES.items()}
+
+
+def _paginas(template, placeholders, **opcoes):
+    return {n: pagina.pixels.copy()
+            for n, pagina in v2.processar_paginas(template, placeholders, 200, FONTS_DIR, **opcoes)}
+
+
+def test_campo_fixo_pelo_nome_exato():
+    assert e_campo_fixo("CNPJ: {cpfcnpjmedicacli}")
+    assert e_campo_fixo("{ nome_da_medica_ou_clinica }")
+    assert not e_campo_fixo("{cpfcnpjmedicacli_testemunha}")
+    assert not e_campo_fixo("{nome_paciente}")
+    assert e_campo_fixo("{nome_paciente}", ["{nome_paciente}"])
+
+
+def test_separar_camadas(template):
+    placeholders = v2.obter_coordenadas(template, VALORES_CHAVES)
+    fixos, variaveis = separar_camadas(placeholders)
+    assert [p.nome for p in fixos] == ["Contratada: {nome_da_medica_ou_clinica}",
+                                       "CNPJ: {cpfcnpjmedicacli}"]
+    assert [p.page for p in variaveis] == [0, 2, 2]
+
+
+def test_camada_em_cache_igual_ao_preenchimento_unico(template, monkeypatch):
+    analise = analise_template.analisar_template(template)
+    placeholders = v2.obter_coordenadas(template, VALORES_CHAVES, analise)
+    unico = _paginas(template, placeholders, analise=analise)
+    primeira = _paginas(template, placeholders, campos_fixos=CAMPOS_CLINICA, analise=analise)
+
+    # Acerto da camada: nenhuma extração de texto nem escolha de DPI
+    monkeypatch.setattr(analise_template, "_analisar", lambda origem: 1 / 0)
+    analise = analise_template.analisar_template(template)
+    placeholders = v2.obter_coordenadas(template, VALORES_CHAVES, analise)
+    segunda = _paginas(template, placeholders, campos_fixos=CAMPOS_CLINICA, analise=analise)
+
+    assert sorted(unico) == sorted(primeira) == sorted(segunda) == [0, 2]
+    for page_num in unico:
+        assert np.array_equal(primeira[page_num], unico[page_num])
+        assert np.array_equal(segunda[page_num], unico[page_num])
@@ -0,0 +1,64 @@
+from io import BytesIO
+
+import fitz  # PyMuPDF
+import numpy as np
+import pytest
+from PIL import Image
+
+from codificador_pdf import (SAIDA_JPEG, SAIDA_MRC, SAIDA_SEM_PERDAS, codificar_para_img2pdf,
+                             inserir_pagina_raster)
+from pagina_raster import renderizar_pagina
+
+
+def _pagina(template, perfil="rgb", dpi=100):
+    with fitz.open(stream=template, filetype="pdf") as doc:
+        return renderizar_pagina(doc[0], dpi, perfil)
+
+
+def _imagem_unica(pdf_doc) -> np.ndarray:
+    (info,) = pdf_doc[0].get_images()
+    pix = fitz.Pixmap(pdf_doc, info[0])
+    return np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.width, pix.n).squeeze()
+
+
+@pytest.mark.parametrize("perfil", ["rgb", "cinza"])
+def test_sem_perdas_preserva_pixels_e_tamanho(template, perfil):
+    pagina = _pagina(template, perfil)
+    with fitz.open() as doc:
+        page = inserir_pagina_raster(doc, pagina, SAIDA_SEM_PERDAS)
+        assert (page.rect.width, page.rect.height) == pytest.approx((420, 595), abs=0.5)
+        assert np.array_equal(_imagem_unica(doc), pagina.pixels)
+
+
+def test_1bit_em_ccitt_g4(template):
+    pagina = _pagina(template, "1bit")
+    with fitz.open() as doc:
+        inserir_pagina_raster(doc, pagina, SAIDA_JPEG)  # 1 bit ignora o perfil de saída
+        (info,) = doc[0].get_images()
+        assert "CCITTFaxDecode" in doc.xref_get_key(info[0], "Filter")[1]
+        assert np.array_equal(_imagem_unica(doc) > 0, pagina.mascara_1bit())
+
+
+@pytest.mark.parametrize("perfil_saida", [SAIDA_JPEG, SAIDA_MRC])
+def test_perfis_com_perdas_mantem_o_tamanho(template, perfil_saida):
+    with fitz.open() as doc:
+        page = inserir_pagina_raster(doc, _pagina(template), perfil_saida)
+        assert (page.rect.width, page.rect.height) == pytest.approx((420, 595), abs=0.5)
+        assert doc[0].get_images()
+
+
+def test_perfil_de_saida_invalido(template):
+    with fitz.open() as doc, pytest.raises(ValueError):
+        inserir_pagina_raster(doc, _pagina(template), "webp")
+
+
+def test_img2pdf_recebe_dpi_nos_metadados(template):
+    pagina = _pagina(template, dpi=150)
+    dados, extensao = codificar_para_img2pdf(pagina)
+    imagem = Image.open(BytesIO(dados))
+    assert extensao == "png"
+    assert round(imagem.info["dpi"][0]) == 150
+    assert np.array_equal(np.asarray(imagem), pagina.pixels)
+
+    assert codificar_para_img2pdf(pagina, SAIDA_MRC)[1] == "jpg"
+    assert codificar_para_img2pdf(_pagina(template, "1bit"))[1] == "tif"
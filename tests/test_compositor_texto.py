@@ -0,0 +1,51 @@
+import numpy as np
+from PIL import Image, ImageDraw
+
+from compositor_texto import AtlasGlifos, compor_texto
+from conftest import FONTS_DIR
+from indice_fontes import obter_indice
+
+
+def _fonte(tamanho=32):
+    return obter_indice(FONTS_DIR).fonte_pil("PlusJakartaSans", 400, False, tamanho)
+
+
+def _pelo_pil(texto, fonte, cor, forma=(60, 400, 3)):
+    img = Image.fromarray(np.full(forma, 255, np.uint8))
+    ImageDraw.Draw(img).text((10, 10), texto, fill=cor, font=fonte)
+    return np.asarray(img)
+
+
+def _caixa_tinta(pixels):
+    linhas, colunas = np.nonzero(pixels.min(axis=-1) < 128 if pixels.ndim == 3 else pixels < 128)
+    return linhas.min(), linhas.max(), colunas.min(), colunas.max()
+
+
+def test_atlas_igual_ao_pil():
+    fonte, texto = _fonte(), "Contrato AV Tá 12/2026"
+    pixels = np.full((60, 400, 3), 255, np.uint8)
+    assert compor_texto(pixels, (10, 10), texto, fonte, (20, 40, 160), AtlasGlifos())
+
+    esperado = _pelo_pil(texto, fonte, (20, 40, 160))
+    assert np.allclose(_caixa_tinta(pixels), _caixa_tinta(esperado), atol=1)
+    assert np.abs(pixels.astype(int) - esperado).mean() < 2
+
+
+def test_glifos_rasterizados_uma_vez():
+    atlas = AtlasGlifos()
+    pixels = np.full((60, 400), 255, np.uint8)
+    compor_texto(pixels, (10, 10), "abcabc", _fonte(), 0, atlas)
+    faltas = atlas.faltas
+    compor_texto(pixels, (10, 10), "cab", _fonte(), 0, atlas)
+    assert atlas.faltas == faltas == 3
+    assert atlas.acertos > 0
+
+
+def test_cinza_borda_e_casos_do_pil():
+    pixels = np.full((20, 30), 255, np.uint8)
+    # Cor RGB numa página em cinza, texto cortado na borda
+    assert compor_texto(pixels, (20, -5), "WWW", _fonte(), (0, 0, 0))
+    assert pixels.min() < 128
+    # Marcas combinantes e fontes bitmap ficam com o PIL
+    assert not compor_texto(pixels, (0, 0), "á", _fonte(), 0)
+    assert not compor_texto(pixels, (0, 0), "abc", object(), 0)
@@ -0,0 +1,93 @@
+import io
+
+import fitz  # PyMuPDF
+
+from cache_layout import CacheLayout
+from conftest import criar_template
+from deteccao_hibrida import MODO_OCR, MODO_TEXTO, DetectorHibrido, placeholders_camada_texto
+
+
+def _escaneado(template) -> bytes:
+    """Template com cada página virando imagem (sem camada de texto)"""
+    doc = fitz.open()
+    with fitz.open(stream=template, filetype="pdf") as origem:
+        for page in origem:
+            doc.new_page(width=page.rect.width, height=page.rect.height).insert_image(
+                page.rect, pixmap=page.get_pixmap(dpi=100))
+    dados = doc.tobytes()
+    doc.close()
+    return dados
+
+
+def test_camada_de_texto_sem_ocr(template, tmp_path):
+    chamadas = []
+    detector = DetectorHibrido(ocr=lambda imagem: chamadas.append(imagem) or [],
+                               cache=CacheLayout(str(tmp_path), "teste"))
+    por_pagina = detector.detectar(template)
+
+    assert not chamadas
+    assert [d.modo for d in detector.decisoes] == [MODO_TEXTO] * 3
+    assert [p.texto for p in por_pagina[0]] == [
+        "{nome_da_medica_ou_clinica}", "{cpfcnpjmedicacli}", "{nome_paciente}"]
+    assert [len(pagina) for pagina in por_pagina] == [3, 0, 2]
+    assert por_pagina[2][0].tamanho == 12
+
+
+def test_caixa_so_do_placeholder_sem_o_rotulo(template):
+    """'Paciente: {nome_paciente}': o rótulo não é apagado junto com o placeholder"""
+    with fitz.open(stream=template, filetype="pdf") as doc:
+        page = doc[0]
+        (rotulo,) = page.search_for("Paciente:")
+        (esperada,) = page.search_for("{nome_paciente}")
+        paciente = placeholders_camada_texto(page)[2]
+
+    assert paciente.bbox == tuple(esperada)
+    assert paciente.bbox[0] >= rotulo.x1
+
+
+def test_varios_placeholders_no_mesmo_span():
+    template = criar_template({0: ["De {dd} a {dd} de {mes}"]})
+    with fitz.open(stream=template, filetype="pdf") as doc:
+        encontrados = placeholders_camada_texto(doc[0])
+
+    assert [p.texto for p in encontrados] == ["{dd}", "{dd}", "{mes}"]
+    assert encontrados[0].bbox[2] <= encontrados[1].bbox[0]
+
+
+def test_origem_em_stream(template, tmp_path):
+    detector = DetectorHibrido(cache=CacheLayout(str(tmp_path), "teste"))
+    assert detector.detectar(io.BytesIO(template)) == detector.detectar(template)
+
+
+def test_cache_devolve_o_mesmo_layout(template, tmp_path):
+    cache = CacheLayout(str(tmp_path), "teste")
+    primeira = DetectorHibrido(cache=cache).detectar(template)
+
+    detector = DetectorHibrido(ocr=lambda imagem: 1 / 0, cache=CacheLayout(str(tmp_path), "teste"))
+    assert detector.detectar(template) == primeira
+    assert [d.modo for d in detector.decisoes] == [MODO_TEXTO] * 3
+
+
+def test_pagina_escaneada_vai_para_o_ocr(template):
+    def ocr(imagem):
+        # Caixa em pixels da imagem renderizada em dpi_ocr=144 → metade em pt
+        return [("{nome_paciente}", 80, 200, 100, 20)]
+
+    detector = DetectorHibrido(dpi_ocr=144, ocr=ocr, usar_cache=False)
+    por_pagina = detector.detectar(_escaneado(template))
+
+    assert detector.decisoes[0].modo == MODO_OCR
+    (encontrado,) = por_pagina[0]
+    assert encontrado.origem == MODO_OCR
+    assert encontrado.bbox == (40.0, 100.0, 90.0, 110.0)
+
+
+def test_ocr_das_regioes_em_varias_threads(template):
+    """Pixels extraídos antes do pool; só o OCR roda em paralelo, na ordem das páginas"""
+    detector = DetectorHibrido(dpi_ocr=72, ocr=lambda imagem: [("{dd}", 0, 0, 10, 10)],
+                               usar_cache=False, workers=2)
+    por_pagina = detector.detectar(_escaneado(template))
+
+    assert [d.modo for d in detector.decisoes] == [MODO_OCR] * 3
+    assert [[(p.texto, p.pagina) for p in pagina] for pagina in por_pagina] == [
+        [("{dd}", 0)], [("{dd}", 1)], [("{dd}", 2)]]
@@ -0,0 +1,62 @@
+import pathlib
+from io import BytesIO
+
+import fitz  # PyMuPDF
+import pytest
+
+from conftest import FONTS_DIR, VALORES
+from entrada_saida_pdf import abrir_pdf, descrever_origem, normalizar_origem, persistir
+import pdf_processor_v2_com_fonte_completo_CORRIGIDO as v2
+
+
+def test_normalizar_origem():
+    assert normalizar_origem("a.pdf") == "a.pdf"
+    assert normalizar_origem(pathlib.Path("a.pdf")) == "a.pdf"
+    assert normalizar_origem(bytearray(b"%PDF")) == b"%PDF"
+    assert normalizar_origem(memoryview(b"%PDF")) == b"%PDF"
+
+    stream = BytesIO(b"%PDF")
+    assert normalizar_origem(stream) == b"%PDF"
+    assert normalizar_origem(stream) == b""  # lido uma única vez
+
+    with pytest.raises(TypeError):
+        normalizar_origem(42)
+
+
+def test_abrir_pdf_de_caminho_bytes_e_stream(template, tmp_path):
+    caminho = tmp_path / "template.pdf"
+    caminho.write_bytes(template)
+    for origem in (str(caminho), caminho, template, BytesIO(template)):
+        with abrir_pdf(origem) as doc:
+            assert len(doc) == 3
+    assert descrever_origem(template).endswith("KB em memória>")
+
+
+def test_persistir_em_cada_destino(tmp_path):
+    persistir(b"pdf", None)
+
+    caminho = tmp_path / "novo" / "saida.pdf"
+    persistir(b"pdf", str(caminho))
+    assert caminho.read_bytes() == b"pdf"
+
+    stream = BytesIO()
+    persistir(b"pdf", stream)
+    assert stream.getvalue() == b"pdf"
+
+    recebidos = []
+    persistir(b"pdf", recebidos.append)
+    assert recebidos == [b"pdf"]
+
+    with pytest.raises(TypeError):
+        persistir(b"pdf", 42)
+
+
+def test_motor_em_memoria(template):
+    valores = {"{" + k + "}": v for k, v in VALORES.items()}
+    destino = BytesIO()
+    dados = v2.processar_pdf_completo(BytesIO(template), valores, destino, dpi=100,
+                                      fonts_dir=FONTS_DIR)
+
+    assert dados == destino.getvalue()
+    with fitz.open(stream=dados, filetype="pdf") as doc:
+        assert len(doc) == 3
@@ -0,0 +1,72 @@
+import io
+
+import fitz  # PyMuPDF
+
+from conftest import FONTS_DIR, VALORES, criar_template
+from formulario_acroform import compilar_template, preencher_template
+
+
+def test_compilar_validar_e_preencher(template):
+    compilado = compilar_template(template, FONTS_DIR)
+    assert compilado.placeholders == sorted(VALORES)
+    assert compilado.validar({"{dd}": "19"}) == (False, sorted(set(VALORES) - {"dd"}), [])
+    assert compilado.validar({**VALORES, "extra": "x"})[0]
+
+    pdf = compilado.preencher(VALORES)
+    with fitz.open(stream=pdf, filetype="pdf") as doc:
+        assert not list(doc[0].widgets())
+        texto = doc[0].get_text() + doc[2].get_text()
+    for valor in VALORES.values():
+        assert valor in texto
+    assert "{" not in texto
+
+
+def test_formulario_editavel(template):
+    pdf = compilar_template(template, FONTS_DIR).preencher(VALORES, achatar=False)
+    with fitz.open(stream=pdf, filetype="pdf") as doc:
+        campos = {w.field_name: w.field_value for w in doc[2].widgets()}
+    assert campos == {"dd": "19", "valor": "R$ 1.500,00"}
+
+
+def test_cache_separado_por_diretorio_de_fontes(template, tmp_path):
+    compilado = compilar_template(template, FONTS_DIR)
+    assert compilar_template(template, FONTS_DIR) is compilado
+
+    outro = compilar_template(template, str(tmp_path / "sem_fontes"))
+    assert outro is not compilado
+    assert outro.fonts_dir == str(tmp_path / "sem_fontes")
+
+
+def test_template_alterado_no_disco_recompila(tmp_path):
+    caminho = tmp_path / "template.pdf"
+    caminho.write_bytes(criar_template())
+    assert "dd" in compilar_template(str(caminho), FONTS_DIR).placeholders
+
+    caminho.write_bytes(criar_template({0: ["Cliente: {nome_cliente}"]}))
+    assert compilar_template(str(caminho), FONTS_DIR).placeholders == ["nome_cliente"]
+
+
+def test_origem_em_stream(template):
+    compilado = compilar_template(io.BytesIO(template), FONTS_DIR)
+    assert compilado is compilar_template(template, FONTS_DIR)
+
+    pdf = preencher_template(io.BytesIO(template), VALORES, fonts_dir=FONTS_DIR)
+    with fitz.open(stream=pdf, filetype="pdf") as doc:
+        assert VALORES["dd"] in doc[2].get_text()
+
+
+def test_valor_longo_nao_invade_o_campo_vizinho():
+    template = criar_template({0: ["Paciente: {nome_paciente}           CPF: {cpf}",
+                                   "Endereço: {endereco}"]})
+    longo = "Maria Aparecida dos Santos Oliveira Figueiredo de Albuquerque Neta"
+    pdf = compilar_template(template, FONTS_DIR).preencher({"nome_paciente": longo, "cpf": "1"})
+    with fitz.open(stream=pdf, filetype="pdf") as doc:
+        palavras = doc[0].get_text("words")
+
+    (cpf,) = [p for p in palavras if p[4] == "CPF:"]
+    (endereco,) = [p for p in palavras if p[4] == "Endereço:"]
+    valor = [p for p in palavras if p[4] in longo.split() or p[4].endswith("…")]
+    assert valor and all(p[2] <= cpf[0] for p in valor)
+    # Espaço livre até a linha de baixo: quebra em vez de encolher, sem invadi-la
+    assert len({round(p[3]) for p in valor}) == 2
+    assert all(p[3] <= endereco[1] + 1 for p in valor)
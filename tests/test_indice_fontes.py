@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from conftest import FONTS_DIR
+from indice_fontes import FontIndex, chave_familia, interpretar_nome_fonte, ler_face, obter_indice
+
+
+@pytest.fixture
+def indice() -> FontIndex:
+    return FontIndex(diretorios=(FONTS_DIR,), fontes_sistema=())
+
+
+@pytest.mark.parametrize("nome, esperado", [
+    ("ABCDEF+PlusJakartaSans-SemiBold", ("PlusJakartaSans", 600, False)),
+    ("Arial,BoldItalic", ("Arial", 700, True)),
+    ("ArialBold", ("Arial", 700, False)),
+    ("Helvetica", ("Helvetica", 400, False)),
+])
+def test_interpretar_nome_fonte(nome, esperado):
+    assert interpretar_nome_fonte(nome) == esperado
+
+
+def test_face_lida_das_tabelas_da_fonte():
+    face = ler_face(os.path.join(FONTS_DIR, "static", "PlusJakartaSans-SemiBoldItalic.ttf"))
+    assert (chave_familia(face.familia), face.peso, face.italico) == ("plusjakartasans", 600, True)
+    assert not face.variavel
+
+    variavel = ler_face(os.path.join(FONTS_DIR, "PlusJakartaSans-VariableFont_wght.ttf"))
+    assert variavel.variavel
+    assert variavel.valores_eixos(1000) == [800.0]  # limitado ao eixo wght
+
+
+def test_resolver_face_mais_proxima(indice):
+    assert indice.resolver("PlusJakartaSans", 700, False).caminho.endswith("-Bold.ttf")
+    assert indice.resolver("Plus Jakarta Sans", 650, True).peso == 700
+    # Família desconhecida: a padrão
+    assert chave_familia(indice.resolver("Arial", 400, False).familia) == "plusjakartasans"
+    assert FontIndex(diretorios=(), fontes_sistema=()).resolver("Arial") is None
+
+
+def test_fontes_carregadas_uma_vez(indice):
+    assert indice.fonte_para_span("PlusJakartaSans-Bold", 12) is \
+        indice.fonte_pil("PlusJakartaSans", 700, False, 12)
+    assert indice.fonte_fitz("PlusJakartaSans", 400, False).name == "Plus Jakarta Sans Regular"
+    assert FontIndex(diretorios=(), fontes_sistema=()).fonte_fitz("Arial").name == "Helvetica"
+
+
+def test_indice_unico_por_diretorio():
+    assert obter_indice(FONTS_DIR) is obter_indice(FONTS_DIR + os.sep)
+    assert obter_indice(FONTS_DIR) is not obter_indice(os.path.dirname(FONTS_DIR))
@@ -0,0 +1,51 @@
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+from conftest import TEXTOS_TEMPLATE
+from motor_ocr import para_cinza
+from ocr_regioes import (RegiaoCandidata, agrupar_recortes, encontrar_regioes_candidatas,
+                         montar_mosaico)
+
+
+def _pagina_cinza(template, page_num, dpi=200) -> np.ndarray:
+    with fitz.open(stream=template, filetype="pdf") as doc:
+        pix = doc[page_num].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        return np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.stride)[:, :pix.width].copy()
+
+
+def test_grupo_que_cresce_absorve_grupo_anterior():
+    # A e B não se tocam; C sobrepõe A e, depois de A crescer, A passa a sobrepor B
+    regioes = [RegiaoCandidata(0, 0, 10, 10), RegiaoCandidata(0, 20, 10, 10),
+               RegiaoCandidata(5, 5, 3, 20)]
+    assert agrupar_recortes(regioes, 100, 100, margem=0) == [(0, 0, 10, 30)]
+
+
+def test_recortes_separados_ficam_separados():
+    regioes = [RegiaoCandidata(0, 0, 10, 10), RegiaoCandidata(50, 0, 10, 10)]
+    assert agrupar_recortes(regioes, 100, 100, margem=0) == [(0, 0, 10, 10), (50, 0, 60, 10)]
+
+
+def test_regioes_candidatas_uma_por_placeholder(template):
+    for page_num, textos in TEXTOS_TEMPLATE.items():
+        esperadas = sum(texto.count("{") for texto in textos)
+        regioes = encontrar_regioes_candidatas(_pagina_cinza(template, page_num))
+        assert len(regioes) == esperadas
+
+
+def test_mosaico_empilha_recortes():
+    cinza = np.full((100, 100), 255, dtype=np.uint8)
+    cinza[40:60, 40:60] = 0  # recorte escuro: invertido no mosaico
+    mosaico, topos = montar_mosaico(cinza, [(0, 0, 30, 10), (40, 40, 60, 60)], espaco=5)
+    assert mosaico.shape == (10 + 20 + 5 * 3, 30 + 10)
+    assert topos == [5, 20]
+    assert mosaico[20:40, 5:25].min() == 255
+
+
+def test_para_cinza_pil_e_array():
+    rgb = np.zeros((4, 6, 3), dtype=np.uint8)
+    rgb[..., 0] = 255
+    assert para_cinza(rgb).shape == (4, 6)
+    assert para_cinza(rgb)[0, 0] == 76  # 0.299 × 255
+    assert np.array_equal(para_cinza(Image.fromarray(rgb)), np.full((4, 6), 76, np.uint8))
+    assert para_cinza(rgb[:, ::2]).flags.c_contiguous
@@ -0,0 +1,87 @@
+import gc
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from conftest import criar_template
+from pagina_raster import (PaginaRaster, dpi_por_pagina, escolher_dpi, renderizar_pagina,
+                           spans_texto)
+
+
+def _renderizar(template, dpi=72):
+    with fitz.open(stream=template, filetype="pdf") as doc:
+        return renderizar_pagina(doc[0], dpi)
+
+
+def test_pixels_sobrevivem_a_pagina(template):
+    """O array sozinho mantém o Pixmap vivo (antes: leitura de memória liberada)"""
+    esperado = _renderizar(template).pixels.copy()
+
+    pixels = _renderizar(template).pixels
+    gc.collect()
+    # Pixmaps novos reaproveitariam a memória liberada
+    lixo = [fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 420, 595), False) for _ in range(4)]
+    for pix in lixo:
+        pix.clear_with(0)
+
+    assert np.array_equal(pixels, esperado)
+    assert np.array_equal(pixels[10:50, 10:50], esperado[10:50, 10:50])
+
+
+def test_pixels_sao_view_do_pixmap(template):
+    pagina = _renderizar(template)
+    pagina.pixels[0, 0] = (1, 2, 3)
+    assert pagina.compartilhado
+    assert pagina.pixmap.pixel(0, 0) == (1, 2, 3)
+
+
+def test_copia_independente(template):
+    pagina = _renderizar(template)
+    copia = pagina.copia()
+    copia.pixels[...] = 0
+    assert copia.pixels.shape == pagina.pixels.shape
+    assert pagina.pixels.max() > 0
+
+
+def test_cinza_sem_canal():
+    pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 7, 5), False)
+    pagina = PaginaRaster(pix, perfil="cinza")
+    assert pagina.pixels.shape == (5, 7)
+
+
+def test_spans_texto_iguais_ao_modo_dict(template):
+    with fitz.open(stream=template, filetype="pdf") as doc:
+        page = doc[0]
+        esperados = [span["text"] for bloco in page.get_text("dict")["blocks"]
+                     for linha in bloco.get("lines", []) for span in linha["spans"]]
+        assert [span["text"] for span in spans_texto(page)] == esperados
+
+
+def test_escolher_dpi_pela_menor_fonte():
+    # 27 px/em para 12pt → 162 DPI → passo de 200
+    with fitz.open(stream=criar_template(tamanho=12), filetype="pdf") as doc:
+        assert escolher_dpi(doc[0], dpi_max=300) == 200
+        assert escolher_dpi(doc[0], dpi_max=150) == 150
+    with fitz.open(stream=criar_template(tamanho=20), filetype="pdf") as doc:
+        assert escolher_dpi(doc[0], spans=spans_texto(doc[0])) == 100
+
+
+def test_dpi_por_pagina(template):
+    assert dpi_por_pagina(template) == [200, 200, 200]
+
+
+def test_imagem_pil_cinza_sem_copia_e_rgb_copiada(template):
+    with fitz.open(stream=template, filetype="pdf") as doc:
+        cinza = renderizar_pagina(doc[0], 72, "cinza")
+        rgb = renderizar_pagina(doc[0], 72)
+
+    imagem_cinza, imagem_rgb = cinza.como_imagem_pil(), rgb.como_imagem_pil()
+    cinza.pixels[0, 0] = 7
+    rgb.pixels[0, 0] = (7, 7, 7)
+    assert imagem_cinza.getpixel((0, 0)) == 7
+    assert imagem_rgb.getpixel((0, 0)) != (7, 7, 7)
+
+    # A imagem em cinza mantém o Pixmap vivo sozinha
+    del cinza
+    gc.collect()
+    assert imagem_cinza.getpixel((0, 0)) == 7
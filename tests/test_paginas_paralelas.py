@@ -0,0 +1,31 @@
+from functools import partial
+
+import numpy as np
+
+from conftest import FONTS_DIR, VALORES
+from paginas_paralelas import montar_tarefas, processar_em_paralelo, processar_em_sequencia
+import pdf_processor_v2_com_fonte_inteligente_IMG2PDF as v2
+
+VALORES_CHAVES = {"{" + k + "}": v for k, v in VALORES.items()}
+
+
+def test_montar_tarefas_so_paginas_com_placeholders(template):
+    placeholders = v2.obter_coordenadas(template, VALORES_CHAVES)
+    assert montar_tarefas(template, placeholders, 300, "cinza") == [(0, 200, "cinza"),
+                                                                     (2, 200, "cinza")]
+    assert montar_tarefas(template, placeholders, 150, dpi_adaptativo=False) == [
+        (0, 150, "rgb"), (2, 150, "rgb")]
+
+
+def test_paralelo_igual_ao_sequencial(template):
+    placeholders = v2.obter_coordenadas(template, VALORES_CHAVES)
+    tarefas = montar_tarefas(template, placeholders, 200)
+    editor = partial(v2.editar_pagina, placeholders, FONTS_DIR)
+
+    sequencia = list(processar_em_sequencia(template, tarefas, editor))
+    paralelo = list(processar_em_paralelo(template, tarefas, editor, workers=2))
+
+    assert [n for n, _ in paralelo] == [n for n, _ in sequencia] == [0, 2]
+    for (_, esperada), (_, obtida) in zip(sequencia, paralelo):
+        assert (obtida.dpi, obtida.perfil) == (esperada.dpi, esperada.perfil)
+        assert np.array_equal(obtida.pixels, esperada.pixels)
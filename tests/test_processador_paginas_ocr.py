@@ -0,0 +1,33 @@
+import fitz  # PyMuPDF
+import pytest
+
+from conftest import VALORES
+from processador_paginas_ocr import ProcessadorPaginasOCR, workers_paginas
+import pdf_placeholder_processor
+import pdf_placeholder_processor_pytesseract
+
+VALORES_CHAVES = {"{" + k + "}": v for k, v in VALORES.items()}
+
+
+def test_workers_paginas():
+    assert workers_paginas(1, 10) == 1
+    assert workers_paginas(4, 2) == 4
+    assert 1 <= workers_paginas(None, 2) <= 2
+
+
+@pytest.mark.parametrize("modulo", [pdf_placeholder_processor,
+                                    pdf_placeholder_processor_pytesseract])
+def test_fluxo_pela_camada_de_texto(template, modulo):
+    """Template com camada de texto: detecção híbrida sem OCR, tamanho das páginas mantido"""
+    processador = modulo.PDFPlaceholderProcessor(template)
+    assert isinstance(processador, ProcessadorPaginasOCR)
+
+    pdf = processador.processar_em_fluxo(VALORES_CHAVES, workers=1)
+
+    assert [len(m["placeholders"]) for m in processador.pages_metadata] == [3, 0, 2]
+    with fitz.open(stream=pdf, filetype="pdf") as saida, \
+            fitz.open(stream=template, filetype="pdf") as original:
+        assert len(saida) == len(original)
+        for gerada, origem in zip(saida, original):
+            assert gerada.rect.width == pytest.approx(origem.rect.width, abs=1)
+            assert gerada.rect.height == pytest.approx(origem.rect.height, abs=1)